@@ -0,0 +1,319 @@
+"""
+Chế độ dòng lệnh không giao diện: lập lộ trình hàng loạt từ file JSONL
+
+Mỗi dòng đầu vào là một truy vấn JSON:
+
+    {"id": "q1", "start": "hk1", "mandatory": ["bd1"], "optional": ["hk3"],
+     "limit_km": 10, "engine": "auto"}
+
+Chỉ "optional" hoặc "mandatory" là bắt buộc phải có một. Mỗi kết quả được ghi
+ra một dòng JSON ngay khi giải xong (không theo thứ tự đầu vào):
+
+    {"id": "q1", "path": [...], "distance_km": 6.3, "exceeded": [],
+     "latency_ms": 4.1}
+
+Module này không import tkinter hay PIL nên chạy được trên máy chủ không có
+màn hình:
+
+    python batch_cli.py queries.jsonl -o results.jsonl --workers 8 --stats
+"""
+import argparse
+import json
+import math
+import sys
+import time
+
+from data_model import LocationData, DistanceMatrix
+from data_store import open_store
+from parallel_search import default_workers
+from path_finder import BATCH_ENGINES, PathFinder
+from tsp_solvers import INF
+
+
+# Số truy vấn đọc vào mỗi lượt gửi cho solve_batch
+DEFAULT_CHUNK_SIZE = 256
+
+
+def parse_query(line, line_number, location_data, engine="auto", time_budget=None):
+    """
+    Đọc một dòng JSONL thành tham số của PathFinder.solve_batch
+
+    Args:
+        line: Nội dung dòng
+        line_number: Số thứ tự dòng (dùng làm id khi truy vấn không có id)
+        location_data: LocationData để kiểm tra ID địa điểm
+        engine: Bộ giải khi truy vấn không ghi rõ engine
+        time_budget: Thời gian tối đa khi truy vấn không ghi rõ time_budget
+
+    Returns:
+        tuple: (query_id, query dict)
+
+    Raises:
+        ValueError: Nếu dòng không hợp lệ
+    """
+    try:
+        record = json.loads(line)
+    except json.JSONDecodeError as error:
+        raise ValueError(f"JSON không hợp lệ: {error.msg}") from None
+    return query_from_record(record, line_number, location_data, engine,
+                             time_budget)
+
+
+def _non_negative(record, field, default=None):
+    """Giá trị của một trường số không âm trong truy vấn (None nếu null / không có)"""
+    value = record.get(field, default)
+    if value is None:
+        return None
+    # bool là int trong Python; NaN không thỏa value >= 0
+    if isinstance(value, bool) or not isinstance(value, (int, float)) \
+            or not value >= 0:
+        raise ValueError(f"{field} phải là số không âm hoặc null: {value!r}")
+    return value
+
+
+def _is_location_id(value):
+    """ID địa điểm hợp lệ trong truy vấn: chuỗi hoặc số nguyên (không phải bool)"""
+    return isinstance(value, (str, int)) and not isinstance(value, bool)
+
+
+def _location_ids(record, field):
+    """Danh sách ID địa điểm của một trường truy vấn ([] nếu null / không có)"""
+    value = record.get(field)
+    if value is None:
+        return []
+    if not isinstance(value, list) or not all(map(_is_location_id, value)):
+        raise ValueError(f"{field} phải là danh sách ID địa điểm: {value!r}")
+    return list(value)
+
+
+def query_from_record(record, default_id, location_data, engine="auto",
+                      time_budget=None):
+    """
+    Chuyển một truy vấn JSON đã đọc thành tham số của PathFinder
+
+    Args:
+        record: Object JSON của truy vấn
+        default_id: id dùng khi truy vấn không có id
+        location_data, engine, time_budget: Như parse_query
+
+    Returns:
+        tuple: (query_id, query dict)
+
+    Raises:
+        ValueError: Nếu truy vấn không hợp lệ
+    """
+    if not isinstance(record, dict):
+        raise ValueError("Mỗi truy vấn phải là một object JSON")
+
+    query_id = record.get("id", default_id)
+    start_location = record.get("start")
+    if start_location is not None and not _is_location_id(start_location):
+        raise ValueError(f"start phải là ID địa điểm: {start_location!r}")
+    mandatory_locations = _location_ids(record, "mandatory")
+    optional_locations = _location_ids(record, "optional")
+
+    # Điểm bắt đầu luôn được coi là điểm bắt buộc, như trên giao diện
+    if start_location is not None and start_location not in mandatory_locations:
+        mandatory_locations.insert(0, start_location)
+    selected_locations = list(dict.fromkeys(mandatory_locations + optional_locations))
+    if not selected_locations:
+        raise ValueError("Truy vấn không có địa điểm nào")
+
+    locations = location_data.get_all_locations()
+    unknown = [loc for loc in selected_locations if loc not in locations]
+    if unknown:
+        raise ValueError(f"Không có địa điểm: {', '.join(map(str, unknown))}")
+
+    engine = record.get("engine", engine)
+    if engine not in BATCH_ENGINES:
+        raise ValueError(f"Bộ giải không hợp lệ: {engine} "
+                         f"(dùng {', '.join(BATCH_ENGINES)})")
+
+    return query_id, {
+        "selected_locations": selected_locations,
+        "start_location": start_location,
+        "mandatory_locations": mandatory_locations,
+        "limit_km": _non_negative(record, "limit_km"),
+        "engine": engine,
+        "time_budget": _non_negative(record, "time_budget", time_budget),
+    }
+
+
+def percentile(sorted_values, fraction):
+    """Phân vị theo hạng gần nhất của một list đã sắp xếp (0 nếu rỗng)"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(len(sorted_values) * fraction))
+    return sorted_values[rank - 1]
+
+
+class BatchRunner:
+    """Đọc truy vấn theo từng lượt, giải bằng solve_batch và ghi kết quả"""
+
+    def __init__(self, path_finder, output, engine="auto", time_budget=None,
+                 chunk_size=DEFAULT_CHUNK_SIZE):
+        """
+        Args:
+            path_finder: PathFinder dùng chung cho mọi truy vấn
+            output: File text để ghi kết quả JSONL
+            engine: Bộ giải mặc định cho truy vấn không ghi rõ engine
+            time_budget: Thời gian tối đa mặc định cho bộ giải heuristic (giây)
+            chunk_size: Số truy vấn mỗi lượt
+        """
+        self.path_finder = path_finder
+        self.output = output
+        self.engine = engine
+        self.time_budget = time_budget
+        self.chunk_size = chunk_size
+        self.latencies = []
+        self.errors = 0
+        self.unique = 0
+        self.cache_hits = 0
+        self.elapsed = 0.0
+
+    def run(self, lines):
+        """
+        Xử lý toàn bộ các dòng đầu vào
+
+        Args:
+            lines: Iterable các dòng JSONL (dòng trống được bỏ qua)
+        """
+        started = time.perf_counter()
+        chunk = []
+        for line_number, line in enumerate(lines, 1):
+            if not line.strip():
+                continue
+            chunk.append((line_number, line))
+            if len(chunk) >= self.chunk_size:
+                self._run_chunk(chunk)
+                chunk = []
+        if chunk:
+            self._run_chunk(chunk)
+        self.elapsed = time.perf_counter() - started
+
+    def _run_chunk(self, chunk):
+        ids, queries = [], []
+        for line_number, line in chunk:
+            try:
+                query_id, query = parse_query(line, line_number,
+                                              self.path_finder.location_data,
+                                              self.engine, self.time_budget)
+            except ValueError as error:
+                self.errors += 1
+                self._write({"id": line_number, "error": str(error)})
+                continue
+            ids.append(query_id)
+            queries.append(query)
+
+        # Độ trễ của mỗi truy vấn là thời gian chuẩn bị + giải riêng nó (các
+        # truy vấn giống nhau dùng chung một lần giải), không tính thời gian
+        # chờ các truy vấn khác trong lượt
+        for query_index, (path, total_distance, exceeded) in \
+                self.path_finder.solve_batch(queries):
+            latency = self.path_finder.last_batch_info["elapsed"][query_index]
+            self.latencies.append(latency)
+            self._write({
+                "id": ids[query_index],
+                "path": path,
+                "distance_km": round(total_distance, 3)
+                               if total_distance < INF else None,
+                "exceeded": exceeded,
+                "latency_ms": round(latency * 1000, 3),
+            })
+
+        batch_info = self.path_finder.last_batch_info
+        self.unique += batch_info.get("unique", 0)
+        self.cache_hits += batch_info.get("cache_hits", 0)
+
+    def _write(self, record):
+        self.output.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self.output.flush()
+
+    def stats(self):
+        """
+        Thống kê lần chạy
+
+        Returns:
+            dict: queries, errors, unique, cache_hits, elapsed_s,
+                  throughput_qps, p50_ms, p95_ms, p99_ms
+        """
+        latencies = sorted(self.latencies)
+        return {
+            "queries": len(latencies) + self.errors,
+            "errors": self.errors,
+            "unique": self.unique,
+            "cache_hits": self.cache_hits,
+            "elapsed_s": round(self.elapsed, 3),
+            "throughput_qps": round(len(latencies) / self.elapsed, 2)
+                              if self.elapsed > 0 else 0.0,
+            "p50_ms": round(percentile(latencies, 0.50) * 1000, 3),
+            "p95_ms": round(percentile(latencies, 0.95) * 1000, 3),
+            "p99_ms": round(percentile(latencies, 0.99) * 1000, 3),
+        }
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        description="Lập lộ trình du lịch Hà Nội hàng loạt từ file JSONL")
+    parser.add_argument("input", nargs="?", default="-",
+                        help="File JSONL truy vấn (mặc định: stdin)")
+    parser.add_argument("-o", "--output", default="-",
+                        help="File JSONL kết quả (mặc định: stdout)")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Số tiến trình giải song song (0 = số lõi CPU)")
+    parser.add_argument("--engine", choices=BATCH_ENGINES, default="auto",
+                        help="Bộ giải cho truy vấn không ghi rõ engine")
+    parser.add_argument("--time-budget", type=float, default=None,
+                        help="Thời gian tối đa cho bộ giải heuristic (giây)")
+    parser.add_argument("--backend", choices=DistanceMatrix.BACKENDS,
+                        default="dict", help="Backend ma trận khoảng cách")
+    parser.add_argument("--data", metavar="FILE",
+                        help="Kho dữ liệu địa điểm / khoảng cách (.json, "
+                             ".sqlite, .db, .fpds - xem data_store), mặc định "
+                             "bộ dữ liệu Hà Nội")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE,
+                        help="Số truy vấn mỗi lượt gửi cho bộ giải")
+    parser.add_argument("--stats", action="store_true",
+                        help="In thống kê thông lượng và độ trễ ra stderr")
+    parser.add_argument("--hierarchy", metavar="FILE",
+                        help="Dùng contraction hierarchy lưu ở FILE (dựng nếu "
+                             "chưa có hoặc đã cũ) thay vì bảng mọi cặp")
+    parser.add_argument("--table", metavar="FILE",
+                        help="Mở bảng khoảng cách lưu ở FILE bằng mmap (tính và "
+                             "ghi nếu chưa có hoặc đã cũ); nhiều tiến trình dùng "
+                             "chung một file")
+    return parser
+
+
+def main(argv=None):
+    """Entry point chế độ dòng lệnh"""
+    args = build_parser().parse_args(argv)
+    workers = args.workers if args.workers > 0 else default_workers()
+
+    store = open_store(args.data) if args.data else None
+    path_finder = PathFinder(LocationData(store), DistanceMatrix(args.backend, store),
+                             workers=workers,
+                             use_hierarchy=args.hierarchy is not None,
+                             hierarchy_file=args.hierarchy,
+                             table_file=args.table)
+    source = sys.stdin if args.input == "-" else open(args.input, encoding="utf-8")
+    output = (sys.stdout if args.output == "-"
+              else open(args.output, "w", encoding="utf-8"))
+    try:
+        runner = BatchRunner(path_finder, output, args.engine, args.time_budget,
+                             max(1, args.chunk_size))
+        runner.run(source)
+    finally:
+        path_finder.close()
+        if source is not sys.stdin:
+            source.close()
+        if output is not sys.stdout:
+            output.close()
+
+    if args.stats:
+        print(json.dumps(runner.stats()), file=sys.stderr)
+    return 1 if runner.errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,9 @@
+"""
+Bộ benchmark của bộ tìm đường trên các thành phố tổng hợp
+
+    python -m benchmarks --quick --output results.json
+    python -m benchmarks --baseline baseline.json --max-regression 20
+"""
+from benchmarks.city import make_city
+from benchmarks.suite import (FULL_GRID, QUICK_GRID, build_cases, compare,
+                              run_case, run_suite)
@@ -0,0 +1,83 @@
+"""
+Chạy bộ benchmark từ dòng lệnh (từ thư mục Find_path):
+
+    python -m benchmarks --quick --output results.json
+    python -m benchmarks --baseline baseline.json --max-regression 20
+    python -m benchmarks --quick --output baseline.json   # tạo mốc mới
+
+Thoát với mã 1 nếu có case chậm hơn mốc quá --max-regression phần trăm.
+"""
+import argparse
+import json
+import sys
+
+from benchmarks.suite import (FULL_GRID, QUICK_GRID, build_cases, compare,
+                              run_case, run_suite)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks",
+        description="Benchmark bộ tìm đường trên thành phố tổng hợp")
+    parser.add_argument("--quick", action="store_true",
+                        help="Lưới tham số nhỏ (vài giây)")
+    parser.add_argument("--filter", default="",
+                        help="Chỉ chạy các case có tên chứa chuỗi này")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Ghi kết quả ra file JSON")
+    parser.add_argument("--baseline", help="File JSON kết quả mốc để so sánh")
+    parser.add_argument("--max-regression", type=float, default=20.0,
+                        help="Phần trăm chậm đi tối đa cho phép so với mốc")
+    parser.add_argument("--min-seconds", type=float, default=0.001,
+                        help="Bỏ qua chênh lệch nhỏ hơn số giây này")
+    parser.add_argument("--confirm", type=int, default=2,
+                        help="Số lần đo lại case chậm đi trước khi báo lỗi")
+    args = parser.parse_args(argv)
+
+    cases = [case for case in build_cases(QUICK_GRID if args.quick else FULL_GRID)
+             if args.filter in case["name"]]
+
+    def progress(case, result):
+        print(f"{case['name']:<40} {result['seconds'] * 1000:10.2f} ms",
+              file=sys.stderr)
+
+    current = run_suite(cases, args.repeats, args.seed, progress)
+
+    regressions = []
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(current, baseline, args.max_regression,
+                              args.min_seconds)
+        # Đo lại các case chậm đi và giữ lần nhanh nhất để loại nhiễu của máy
+        by_name = {case["name"]: case for case in cases}
+        for _ in range(args.confirm):
+            if not regressions:
+                break
+            for name, _, _, _ in regressions:
+                result = run_case(by_name[name], args.repeats, args.seed)
+                if result["seconds"] < current["results"][name]["seconds"]:
+                    current["results"][name] = result
+            regressions = compare(current, baseline, args.max_regression,
+                                  args.min_seconds)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(current, f, indent=2, ensure_ascii=False)
+
+    if not args.baseline:
+        return 0
+    for name, before, after, change in regressions:
+        print(f"CHẬM ĐI {name}: {before * 1000:.2f} ms -> {after * 1000:.2f} ms "
+              f"(+{change:.1f}%)", file=sys.stderr)
+    if regressions:
+        print(f"{len(regressions)} case chậm hơn mốc quá {args.max_regression:g}%",
+              file=sys.stderr)
+        return 1
+    print("Không có case nào chậm hơn mốc", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
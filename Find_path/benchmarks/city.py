@@ -0,0 +1,99 @@
+"""
+Sinh thành phố tổng hợp có thể tái lập theo seed
+
+Thành phố có cùng dạng dữ liệu với LocationData / DistanceMatrix của ứng dụng:
+mỗi địa điểm có tên, quận, tọa độ x/y trên bản đồ; mỗi cạnh là quãng đường (km)
+giữa 2 địa điểm.
+"""
+import math
+import random
+
+from data_model import LocationData, DistanceMatrix
+from data_store import MemoryStore
+
+
+# Kích thước bản đồ (pixel), giống canvas của ứng dụng
+MAP_WIDTH = 1000
+MAP_HEIGHT = 700
+
+# Số km ứng với 1 pixel trên bản đồ tổng hợp
+KM_PER_PIXEL = 0.02
+
+# Đường thực tế dài hơn đường chim bay một hệ số ngẫu nhiên trong khoảng này
+DETOUR_RANGE = (1.1, 1.4)
+
+# Số hàng xóm gần nhất được nối khi sinh cạnh thưa
+SPARSE_NEIGHBOURS = 3
+
+DENSITIES = ("sparse", "dense")
+
+
+def make_city(size, districts=4, density="sparse", seed=0, backend="dict"):
+    """
+    Sinh một thành phố tổng hợp
+
+    Địa điểm được rải quanh tâm của từng quận. Với density="sparse" mỗi điểm
+    nối tới SPARSE_NEIGHBOURS điểm gần nhất và tới điểm gần nhất trong các
+    điểm sinh trước nó (nên đồ thị luôn liên thông); với "dense" mọi cặp điểm
+    đều có cạnh.
+
+    Args:
+        size: Số địa điểm
+        districts: Số quận
+        density: "sparse" hoặc "dense"
+        seed: Seed của bộ sinh ngẫu nhiên
+        backend: Backend của DistanceMatrix
+
+    Returns:
+        tuple: (LocationData, DistanceMatrix)
+    """
+    if density not in DENSITIES:
+        raise ValueError(f"Mật độ không hợp lệ: {density}")
+
+    rng = random.Random(seed)
+    centers = [(rng.uniform(0.15, 0.85) * MAP_WIDTH,
+                rng.uniform(0.15, 0.85) * MAP_HEIGHT) for _ in range(districts)]
+    spread = min(MAP_WIDTH, MAP_HEIGHT) / (2 * math.sqrt(districts))
+
+    locations = {}
+    points = []
+    for i in range(size):
+        district = i % districts
+        center_x, center_y = centers[district]
+        x = min(MAP_WIDTH, max(0, round(rng.gauss(center_x, spread))))
+        y = min(MAP_HEIGHT, max(0, round(rng.gauss(center_y, spread))))
+        loc_id = f"q{district}_{i}"
+        locations[loc_id] = {
+            "name": f"Địa điểm {i}",
+            "district": f"Quận {district + 1}",
+            "description": "Địa điểm tổng hợp",
+            "x": x, "y": y,
+            "image": "",
+        }
+        points.append((loc_id, x, y))
+
+    def road_length(a, b):
+        straight = math.hypot(a[1] - b[1], a[2] - b[2]) * KM_PER_PIXEL
+        return round(max(straight, 0.1) * rng.uniform(*DETOUR_RANGE), 2)
+
+    distances = {}
+    if density == "dense":
+        for i, a in enumerate(points):
+            for b in points[i + 1:]:
+                distances[(a[0], b[0])] = road_length(a, b)
+    else:
+        for i, a in enumerate(points):
+            by_distance = sorted(
+                (math.hypot(a[1] - b[1], a[2] - b[2]), j)
+                for j, b in enumerate(points) if j != i)
+            neighbours = {j for _, j in by_distance[:SPARSE_NEIGHBOURS]}
+            earlier = [(d, j) for d, j in by_distance if j < i]
+            if earlier:
+                neighbours.add(earlier[0][1])
+            for j in sorted(neighbours):
+                edge = (points[min(i, j)][0], points[max(i, j)][0])
+                if edge not in distances:
+                    distances[edge] = road_length(a, points[j])
+
+    store = MemoryStore(locations, distances)
+    return LocationData(store), DistanceMatrix(backend, store)
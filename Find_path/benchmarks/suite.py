@@ -0,0 +1,235 @@
+"""
+Các phép đo của bộ benchmark và so sánh với kết quả mốc (baseline)
+
+Mỗi phép đo (case) là một dict tham số có "name" duy nhất. Thời gian của một
+case là tổng thời gian chạy QUERIES_PER_CASE truy vấn ngẫu nhiên (seed theo tên
+case), lấy nhỏ nhất qua các lần lặp để giảm nhiễu. Phần chuẩn bị (sinh thành
+phố, dựng đồ thị / bảng khoảng cách, tính giới hạn km) không được tính giờ.
+"""
+import platform
+import random
+import statistics
+import sys
+import time
+import zlib
+
+from benchmarks.city import make_city
+from path_finder import POINT_TO_POINT_METHODS, PathFinder
+
+
+RESULTS_FORMAT = 1
+
+# Số truy vấn ngẫu nhiên trong mỗi case
+QUERIES_PER_CASE = 3
+
+# Các lưới tham số. "tightness" là tỉ lệ giới hạn km so với quãng đường của
+# lời giải không giới hạn (None = không giới hạn): nhỏ hơn 1 thì phải bỏ điểm
+# tùy chọn / không khả thi. Bài toán lộ trình chạy trên bảng khoảng cách ngắn
+# nhất nên chỉ đo với đồ thị thưa; mật độ cạnh chỉ ảnh hưởng dijkstra / bảng.
+FULL_GRID = {
+    "sizes": (25, 50, 100, 200),
+    "densities": ("sparse", "dense"),
+    "selections": (6, 9, 12),
+    "mandatory_ratios": (0.0, 0.5),
+    "tightness": (None, 0.8, 0.5),
+    "feasibility_tightness": (None, 1.1, 0.9, 0.5),
+}
+
+QUICK_GRID = {
+    "sizes": (25, 60),
+    "densities": ("sparse", "dense"),
+    "selections": (6, 9),
+    "mandatory_ratios": (0.0, 0.5),
+    "tightness": (None, 0.6),
+    "feasibility_tightness": (None, 1.1, 0.9),
+}
+
+
+def _fmt(value):
+    return "none" if value is None else f"{value:g}"
+
+
+def build_cases(grid):
+    """
+    Liệt kê các case từ một lưới tham số
+
+    Returns:
+        list: Các dict case theo thứ tự chạy
+    """
+    cases = []
+    for size in grid["sizes"]:
+        for density in grid["densities"]:
+            cases.append({"name": f"table/n{size}/{density}", "kind": "table",
+                          "size": size, "density": density})
+            for method in POINT_TO_POINT_METHODS:
+                if method == "ch" and density != "sparse":
+                    continue  # CH dành cho đồ thị thưa, dựng rất chậm khi dày
+                cases.append({"name": f"{method}/n{size}/{density}",
+                              "kind": "dijkstra", "method": method,
+                              "size": size, "density": density})
+        for selection in grid["selections"]:
+            for ratio in grid["mandatory_ratios"]:
+                for tightness in grid["tightness"]:
+                    cases.append({
+                        "name": f"tsp/n{size}/k{selection}/m{_fmt(ratio)}"
+                                f"/t{_fmt(tightness)}",
+                        "kind": "tsp", "size": size, "density": "sparse",
+                        "selection": selection, "mandatory_ratio": ratio,
+                        "tightness": tightness,
+                    })
+            for tightness in grid["feasibility_tightness"]:
+                cases.append({
+                    "name": f"feasibility/n{size}/k{selection}/t{_fmt(tightness)}",
+                    "kind": "feasibility", "size": size, "density": "sparse",
+                    "selection": selection, "tightness": tightness,
+                })
+    return cases
+
+
+def _city_finder(case, seed):
+    location_data, distance_matrix = make_city(
+        case["size"], districts=max(2, case["size"] // 25),
+        density=case["density"], seed=seed)
+    # Tắt bộ nhớ đệm kết quả để mỗi lần lặp đều giải lại thật
+    return PathFinder(location_data, distance_matrix, route_cache_size=0)
+
+
+def _prepare(case, path_finder, rng):
+    """Sinh các truy vấn của case, trả về list hàm không tham số cần đo"""
+    ids = list(path_finder.location_data.get_all_locations())
+    kind = case["kind"]
+
+    if kind == "table":
+        # PathFinder mới: đo cả dựng đồ thị CSR lẫn bảng khoảng cách
+        return [lambda: PathFinder(path_finder.location_data,
+                                   path_finder.distance_matrix)
+                .get_shortest_path_table()]
+
+    if kind == "dijkstra":
+        graph = path_finder.build_graph()
+        pairs = [rng.sample(ids, 2) for _ in range(QUERIES_PER_CASE * 10)]
+        method = case.get("method", "dijkstra")
+        if method == "astar":
+            path_finder.astar_heuristic(graph, 0)  # hiệu chỉnh, dựng mốc trước
+        elif method == "ch":
+            path_finder.get_contraction_hierarchy()  # dựng trước
+        return [lambda a=a, b=b: path_finder.dijkstra(graph, a, b, method)
+                for a, b in pairs]
+
+    path_finder.get_shortest_path_table()
+    tightness = case["tightness"]
+    calls = []
+    for _ in range(QUERIES_PER_CASE):
+        selected = rng.sample(ids, min(case["selection"], len(ids)))
+        if kind == "feasibility":
+            limit_km = None
+            if tightness is not None:
+                _, reference, _ = path_finder.check_mandatory_feasibility(
+                    selected, None)
+                limit_km = reference * tightness
+            calls.append(lambda selected=selected, limit_km=limit_km:
+                         path_finder.check_mandatory_feasibility(selected,
+                                                                 limit_km))
+            continue
+
+        mandatory = selected[:max(1, round(len(selected) * case["mandatory_ratio"]))]
+        start = selected[0]
+        limit_km = None
+        if tightness is not None:
+            _, reference, _ = path_finder.find_shortest_path_tsp(
+                selected, start, list(mandatory), None, warm_start="off")
+            limit_km = reference * tightness
+        calls.append(lambda selected=selected, start=start, mandatory=mandatory,
+                     limit_km=limit_km:
+                     path_finder.find_shortest_path_tsp(
+                         selected, start, list(mandatory), limit_km,
+                         warm_start="off"))
+    return calls
+
+
+def run_case(case, repeats=5, seed=0):
+    """
+    Đo một case
+
+    Returns:
+        dict: Tham số của case cùng seconds (nhỏ nhất) và median (giây)
+    """
+    path_finder = _city_finder(case, seed)
+    rng = random.Random(zlib.crc32(f"{seed}:{case['name']}".encode()))
+    calls = _prepare(case, path_finder, rng)
+
+    timings = []
+    for _ in range(max(1, repeats)):
+        started = time.perf_counter()
+        for call in calls:
+            call()
+        timings.append(time.perf_counter() - started)
+
+    result = {key: value for key, value in case.items() if key != "name"}
+    result["seconds"] = min(timings)
+    result["median"] = statistics.median(timings)
+    return result
+
+
+def run_suite(cases, repeats=5, seed=0, progress=None):
+    """
+    Chạy các case
+
+    Args:
+        cases: Danh sách case từ build_cases
+        repeats: Số lần lặp mỗi case
+        seed: Seed sinh thành phố và truy vấn
+        progress: Hàm progress(case, result) gọi sau mỗi case (tùy chọn)
+
+    Returns:
+        dict: {"format", "meta", "results": {tên case: kết quả}}
+    """
+    results = {}
+    for case in cases:
+        results[case["name"]] = run_case(case, repeats, seed)
+        if progress is not None:
+            progress(case, results[case["name"]])
+    return {
+        "format": RESULTS_FORMAT,
+        "meta": {
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "repeats": repeats,
+            "seed": seed,
+        },
+        "results": results,
+    }
+
+
+def compare(current, baseline, max_regression=20.0, min_seconds=0.001):
+    """
+    So sánh kết quả với mốc
+
+    Một case bị coi là chậm đi khi chậm hơn mốc quá max_regression phần trăm
+    và quá min_seconds giây (bỏ qua nhiễu của các case rất nhanh). Case chỉ có
+    ở một bên được bỏ qua.
+
+    Args:
+        current, baseline: Kết quả dạng run_suite
+        max_regression: Phần trăm chậm đi tối đa cho phép
+        min_seconds: Chênh lệch tuyệt đối tối thiểu để tính là chậm đi
+
+    Returns:
+        list: Các bộ (tên case, giây mốc, giây hiện tại, phần trăm thay đổi)
+              bị chậm đi, sắp xếp theo phần trăm giảm dần
+    """
+    regressions = []
+    baseline_results = baseline.get("results", {})
+    for name, result in current.get("results", {}).items():
+        reference = baseline_results.get(name)
+        if reference is None:
+            continue
+        before, after = reference["seconds"], result["seconds"]
+        if before <= 0:
+            continue
+        change = (after - before) / before * 100
+        if change > max_regression and after - before > min_seconds:
+            regressions.append((name, before, after, change))
+    regressions.sort(key=lambda item: -item[3])
+    return regressions
@@ -0,0 +1,430 @@
+"""
+Module chứa contraction hierarchy (CH) cho đồ thị đường phố lớn
+
+Các điểm được "co" lần lượt theo thứ tự ưu tiên; khi co điểm v, mỗi cặp hàng
+xóm (u, w) mà đường ngắn nhất giữa chúng phải đi qua v được nối bằng một cạnh
+tắt (shortcut) dài d(u, v) + d(v, w) và ghi nhớ điểm giữa v. Sau đó mọi đường
+ngắn nhất đều đi "lên" theo thứ hạng rồi "xuống", nên truy vấn chỉ cần 2 lượt
+Dijkstra nhỏ trên các cạnh đi lên thay vì duyệt cả thành phố.
+"""
+import json
+import struct
+import zlib
+from array import array
+from heapq import heapify, heappop, heappush
+
+from graph import INF
+
+
+# Định dạng file: header (magic, phiên bản định dạng, số điểm, số cạnh đi lên,
+# độ dài danh sách ID, dấu vân tay đồ thị), danh sách ID dạng JSON rồi các mảng
+# rank, offsets, targets, weights, middles
+MAGIC = b"FPCH"
+FORMAT_VERSION = 1
+_HEADER = struct.Struct("<4sIIIII")
+
+# Số điểm tối đa được chốt trong một lượt tìm đường chứng (witness search);
+# nhỏ thì dựng nhanh hơn nhưng thêm cạnh tắt thừa (vẫn đúng)
+WITNESS_SETTLE_LIMIT = 60
+
+
+def graph_fingerprint(graph):
+    """
+    Dấu vân tay (CRC32) của CompactGraph, dùng để biết file CH đã cũ
+
+    Returns:
+        int: CRC32 của danh sách ID và các bộ đệm CSR
+    """
+    checksum = zlib.crc32(json.dumps(graph.ids, ensure_ascii=False).encode("utf-8"))
+    for buffer in (graph.offsets, graph.targets, graph.weights):
+        checksum = zlib.crc32(buffer.tobytes(), checksum)
+    return checksum
+
+
+class ContractionHierarchy:
+    """
+    Contraction hierarchy đã dựng
+
+    Mỗi cạnh (kể cả cạnh tắt) chỉ được lưu ở điểm có thứ hạng thấp hơn, theo
+    CSR giống CompactGraph: up_targets[up_offsets[i]:up_offsets[i + 1]] là các
+    điểm hạng cao hơn kề với i. middles[k] là điểm giữa của cạnh tắt k (-1 nếu
+    là cạnh gốc), dùng để bung cạnh tắt thành đường đi đầy đủ.
+    """
+
+    def __init__(self, ids, rank, up_offsets, up_targets, up_weights, middles,
+                 fingerprint=0):
+        """
+        Khởi tạo từ các mảng đã dựng (dùng build hoặc load thay vì gọi trực tiếp)
+
+        Args:
+            ids: Danh sách ID địa điểm, vị trí trong list là chỉ số
+            rank: array('i') thứ hạng co của từng điểm
+            up_offsets, up_targets, up_weights, middles: CSR các cạnh đi lên
+            fingerprint: graph_fingerprint của đồ thị gốc
+        """
+        self.ids = ids
+        self.index = {loc_id: i for i, loc_id in enumerate(ids)}
+        self.rank = rank
+        self.up_offsets = up_offsets
+        self.up_targets = up_targets
+        self.up_weights = up_weights
+        self.middles = middles
+        self.fingerprint = fingerprint
+
+    def __len__(self):
+        return len(self.ids)
+
+    @property
+    def shortcut_count(self):
+        """Số cạnh tắt đã thêm"""
+        return sum(1 for middle in self.middles if middle != -1)
+
+    @classmethod
+    def build(cls, graph, settle_limit=WITNESS_SETTLE_LIMIT):
+        """
+        Dựng CH từ CompactGraph
+
+        Thứ tự co theo "edge difference" (số cạnh tắt cần thêm - bậc + số hàng
+        xóm đã bị co), cập nhật lười: điểm lấy ra khỏi heap được tính lại ưu
+        tiên và đẩy lại nếu không còn nhỏ nhất. Dành cho đồ thị thưa như mạng
+        đường phố: với đồ thị gần đầy đủ (mọi cặp đều có cạnh) mỗi lần co tốn
+        O(bậc^2) lượt witness search nên dựng rất chậm.
+
+        Args:
+            graph: CompactGraph
+            settle_limit: Giới hạn của witness search
+
+        Returns:
+            ContractionHierarchy
+        """
+        n = len(graph)
+        # adjacency[v] = {hàng xóm chưa co: (độ dài, điểm giữa)}
+        adjacency = [{} for _ in range(n)]
+        for i in range(n):
+            for j, weight in graph.neighbors(i):
+                if j != i and weight < adjacency[i].get(j, (INF,))[0]:
+                    adjacency[i][j] = (weight, -1)
+
+        def shortcuts(v):
+            """Các cạnh tắt (u, w, độ dài) cần thêm nếu co v"""
+            neighbors = list(adjacency[v].items())
+            needed = []
+            for a, (u, (to_u, _)) in enumerate(neighbors[:-1]):
+                via = {w: to_u + to_w for w, (to_w, _) in neighbors[a + 1:]}
+                witness = _witness_search(adjacency, u, v, via, settle_limit)
+                needed.extend((u, w, length) for w, length in via.items()
+                              if witness.get(w, INF) > length)
+            return needed
+
+        deleted = [0] * n
+
+        def priority(v):
+            return len(shortcuts(v)) - len(adjacency[v]) + deleted[v]
+
+        heap = [(priority(v), v) for v in range(n)]
+        heapify(heap)
+        rank = array('i', [0] * n)
+        upward = [None] * n
+        contracted = bytearray(n)
+        order = 0
+
+        while heap:
+            _, v = heappop(heap)
+            if contracted[v]:
+                continue
+            current = priority(v)
+            if heap and current > heap[0][0]:
+                heappush(heap, (current, v))
+                continue
+
+            added = shortcuts(v)
+            rank[v] = order
+            order += 1
+            contracted[v] = 1
+            upward[v] = adjacency[v]
+            adjacency[v] = {}
+            for u in upward[v]:
+                del adjacency[u][v]
+                deleted[u] += 1
+            for u, w, length in added:
+                if length < adjacency[u].get(w, (INF,))[0]:
+                    adjacency[u][w] = (length, v)
+                    adjacency[w][u] = (length, v)
+
+        up_offsets = array('i', [0])
+        up_targets = array('i')
+        up_weights = array('d')
+        middles = array('i')
+        for v in range(n):
+            for u, (weight, middle) in upward[v].items():
+                up_targets.append(u)
+                up_weights.append(weight)
+                middles.append(middle)
+            up_offsets.append(len(up_targets))
+
+        return cls(list(graph.ids), rank, up_offsets, up_targets, up_weights,
+                   middles, graph_fingerprint(graph))
+
+    def save(self, path):
+        """Ghi CH ra file nhị phân"""
+        ids = json.dumps(self.ids, ensure_ascii=False).encode("utf-8")
+        with open(path, "wb") as f:
+            f.write(_HEADER.pack(MAGIC, FORMAT_VERSION, len(self.ids),
+                                 len(self.up_targets), len(ids), self.fingerprint))
+            f.write(ids)
+            for buffer in (self.rank, self.up_offsets, self.up_targets,
+                           self.up_weights, self.middles):
+                buffer.tofile(f)
+
+    @classmethod
+    def load(cls, path):
+        """
+        Đọc CH từ file do save ghi
+
+        Raises:
+            ValueError: File không phải CH hoặc khác phiên bản định dạng
+        """
+        with open(path, "rb") as f:
+            header = f.read(_HEADER.size)
+            if len(header) != _HEADER.size:
+                raise ValueError(f"File contraction hierarchy không hợp lệ: {path}")
+            magic, version, n, m, ids_length, fingerprint = _HEADER.unpack(header)
+            if magic != MAGIC or version != FORMAT_VERSION:
+                raise ValueError(f"File contraction hierarchy không hợp lệ: {path}")
+            ids = json.loads(f.read(ids_length).decode("utf-8"))
+
+            def read(typecode, count):
+                buffer = array(typecode)
+                buffer.fromfile(f, count)
+                return buffer
+
+            rank = read('i', n)
+            up_offsets = read('i', n + 1)
+            up_targets = read('i', m)
+            up_weights = read('d', m)
+            middles = read('i', m)
+        return cls(ids, rank, up_offsets, up_targets, up_weights, middles,
+                   fingerprint)
+
+    def _upward_search(self, source):
+        """Dijkstra trên các cạnh đi lên từ source: dict {chỉ số: khoảng cách}"""
+        offsets, targets, weights = self.up_offsets, self.up_targets, self.up_weights
+        distances = {source: 0}
+        settled = set()
+        heap = [(0, source)]
+        while heap:
+            distance, current = heappop(heap)
+            if current in settled:
+                continue
+            settled.add(current)
+            for k in range(offsets[current], offsets[current + 1]):
+                neighbor = targets[k]
+                candidate = distance + weights[k]
+                if candidate < distances.get(neighbor, INF):
+                    distances[neighbor] = candidate
+                    heappush(heap, (candidate, neighbor))
+        return distances
+
+    def _query(self, source, target):
+        """
+        Truy vấn 2 chiều theo chỉ số
+
+        Returns:
+            tuple: (distance, meeting, previous) - điểm gặp nhau (-1 nếu không
+                   tới được) và 2 dict cha của lượt từ source / từ target
+        """
+        offsets, targets, weights = self.up_offsets, self.up_targets, self.up_weights
+        distances = ({source: 0}, {target: 0})
+        previous = ({source: -1}, {target: -1})
+        settled = (set(), set())
+        heaps = ([(0, source)], [(0, target)])
+        best, meeting = INF, -1
+
+        while heaps[0] or heaps[1]:
+            if not heaps[1] or (heaps[0] and heaps[0][0][0] <= heaps[1][0][0]):
+                side = 0
+            else:
+                side = 1
+            distance, current = heappop(heaps[side])
+            if distance >= best:
+                # Mọi nhãn còn lại của phía này đều không cải thiện được best
+                heaps[side].clear()
+                continue
+            if current in settled[side]:
+                continue
+            settled[side].add(current)
+
+            through = distance + distances[1 - side].get(current, INF)
+            if through < best:
+                best, meeting = through, current
+
+            own, parents = distances[side], previous[side]
+            for k in range(offsets[current], offsets[current + 1]):
+                neighbor = targets[k]
+                candidate = distance + weights[k]
+                if candidate < own.get(neighbor, INF):
+                    own[neighbor] = candidate
+                    parents[neighbor] = current
+                    heappush(heaps[side], (candidate, neighbor))
+
+        return best, meeting, previous
+
+    def distance(self, loc1, loc2):
+        """Khoảng cách ngắn nhất giữa 2 địa điểm (INF nếu không tới được)"""
+        return self._query(self.index[loc1], self.index[loc2])[0]
+
+    def path(self, loc1, loc2):
+        """
+        Đường đi ngắn nhất đầy đủ (đã bung các cạnh tắt)
+
+        Returns:
+            tuple: (path, distance) - list ID và độ dài cộng theo chiều đi;
+                   ([], INF) nếu không tới được
+        """
+        _, meeting, previous = self._query(self.index[loc1], self.index[loc2])
+        if meeting == -1:
+            return [], INF
+
+        # Chuỗi điểm trên CH: source -> ... -> meeting -> ... -> target
+        chain = []
+        current = meeting
+        while current != -1:
+            chain.append(current)
+            current = previous[0][current]
+        chain.reverse()
+        current = previous[1][meeting]
+        while current != -1:
+            chain.append(current)
+            current = previous[1][current]
+
+        path = [chain[0]]
+        total = 0
+        for u, v in zip(chain, chain[1:]):
+            total = self._unpack(u, v, path, total)
+        return [self.ids[i] for i in path], total
+
+    def _edge(self, u, v):
+        """Vị trí trong CSR của cạnh (u, v) - lưu ở điểm có hạng thấp hơn"""
+        if self.rank[u] > self.rank[v]:
+            u, v = v, u
+        for k in range(self.up_offsets[u], self.up_offsets[u + 1]):
+            if self.up_targets[k] == v:
+                return k
+        raise KeyError((self.ids[u], self.ids[v]))
+
+    def _unpack(self, u, v, path, total):
+        """Nối các điểm của cạnh (u, v) đã bung vào path, trả về độ dài cộng dồn"""
+        stack = [(u, v)]
+        while stack:
+            a, b = stack.pop()
+            k = self._edge(a, b)
+            middle = self.middles[k]
+            if middle == -1:
+                path.append(b)
+                total += self.up_weights[k]
+            else:
+                stack.append((middle, b))
+                stack.append((a, middle))
+        return total
+
+    def many_to_many(self, sources, targets):
+        """
+        Bảng khoảng cách giữa 2 tập địa điểm
+
+        Mỗi điểm chỉ chạy một lượt tìm kiếm đi lên: kết quả từ các target được
+        ghi vào "xô" (bucket) tại từng điểm đã chạm tới, rồi lượt từ mỗi source
+        chỉ cần quét các xô trên không gian tìm kiếm của nó.
+
+        Args:
+            sources, targets: Các ID địa điểm
+
+        Returns:
+            list: rows[i][j] = khoảng cách từ sources[i] tới targets[j] (INF nếu
+                  không tới được)
+        """
+        buckets = {}
+        for j, loc_id in enumerate(targets):
+            for v, distance in self._upward_search(self.index[loc_id]).items():
+                buckets.setdefault(v, []).append((j, distance))
+
+        rows = []
+        for loc_id in sources:
+            row = [INF] * len(targets)
+            for v, distance in self._upward_search(self.index[loc_id]).items():
+                for j, to_target in buckets.get(v, ()):
+                    if distance + to_target < row[j]:
+                        row[j] = distance + to_target
+            rows.append(row)
+        return rows
+
+
+def _witness_search(adjacency, source, skip, via, settle_limit):
+    """
+    Dijkstra giới hạn từ source trên các điểm chưa co, không đi qua skip
+
+    Dừng khi đã chốt mọi điểm trong via, vượt độ dài lớn nhất trong via hoặc
+    quá settle_limit điểm. Nhãn tạm thời cũng là độ dài của một đường có thật
+    nên dùng được làm đường chứng.
+
+    Returns:
+        dict: {chỉ số: khoảng cách tìm được}
+    """
+    limit = max(via.values())
+    remaining = set(via)
+    distances = {source: 0}
+    heap = [(0, source)]
+    settled = 0
+    while heap and remaining:
+        distance, current = heappop(heap)
+        if distance > distances[current]:
+            continue
+        if distance > limit or settled >= settle_limit:
+            break
+        remaining.discard(current)
+        settled += 1
+        for neighbor, (weight, _) in adjacency[current].items():
+            if neighbor == skip:
+                continue
+            candidate = distance + weight
+            if candidate < distances.get(neighbor, INF):
+                distances[neighbor] = candidate
+                heappush(heap, (candidate, neighbor))
+    return distances
+
+
+class HierarchyTable:
+    """
+    Bảng khoảng cách trên CH, thay ShortestPathTable khi đồ thị quá lớn để
+    tính mọi cặp: chỉ tính các cặp được hỏi (distance / path / submatrix);
+    distance được lưu đệm vì bộ giải vét cạn hỏi lại cùng một cặp nhiều lần
+    """
+
+    def __init__(self, hierarchy):
+        """
+        Args:
+            hierarchy: ContractionHierarchy
+        """
+        self.hierarchy = hierarchy
+        self.ids = hierarchy.ids
+        self.index = hierarchy.index
+        self._distances = {}
+
+    def distance(self, loc1, loc2):
+        """Khoảng cách ngắn nhất giữa 2 địa điểm (INF nếu không tới được)"""
+        key = (loc1, loc2)
+        if key not in self._distances:
+            self._distances[key] = self.hierarchy.distance(loc1, loc2)
+        return self._distances[key]
+
+    def path(self, loc1, loc2):
+        """
+        Đường đi ngắn nhất đầy đủ
+
+        Returns:
+            list: Các địa điểm trên đường đi ([] nếu không tới được)
+        """
+        return self.hierarchy.path(loc1, loc2)[0]
+
+    def submatrix(self, stops):
+        """Ma trận khoảng cách giữa các điểm trong stops (many-to-many)"""
+        return self.hierarchy.many_to_many(stops, stops)
@@ -0,0 +1,336 @@
+"""
+Module chứa các kho lưu dữ liệu địa điểm và khoảng cách (store)
+
+LocationData / DistanceMatrix chỉ đọc dữ liệu từ kho khi dùng tới lần đầu và
+ghi lại bằng save(). Mọi kho có cùng giao diện:
+
+    load_locations() -> {ID: {"name", "district", "description", "x", "y", "image"}}
+    load_distances() -> {(loc1, loc2): km}
+    save(locations=None, distances=None)  # None = giữ nguyên phần đó
+
+Các kho: MemoryStore (dict trong bộ nhớ), JsonStore (file JSON, cũng là định
+dạng nhập), SQLiteStore và BinaryStore (file nhị phân gọn, đọc nhanh nhất với
+hàng trăm nghìn cạnh). Nhập hàng loạt từ CSV / JSON vào một kho từ dòng lệnh:
+
+    python data_store.py city.sqlite --locations pois.csv --edges roads.csv
+    python data_store.py city.fpds --json city.json
+"""
+import argparse
+import csv
+import json
+import os
+import sqlite3
+import struct
+import sys
+from array import array
+
+
+# Bộ dữ liệu Hà Nội đi kèm ứng dụng
+DEFAULT_DATA_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                 "data", "hanoi.json")
+
+# Các trường của một địa điểm (cột của file CSV địa điểm, ngoài cột "id")
+LOCATION_FIELDS = ("name", "district", "description", "x", "y", "image")
+
+# Định dạng file BinaryStore: header (magic, phiên bản định dạng, độ dài phần
+# JSON, số cạnh), phần JSON {"ids": [...], "locations": {...}} rồi 3 mảng
+# chỉ số điểm đầu, chỉ số điểm cuối ('i') và độ dài cạnh ('d')
+MAGIC = b"FPDS"
+FORMAT_VERSION = 1
+_HEADER = struct.Struct("<4sIII")
+
+
+def _number(text):
+    """Đọc tọa độ từ CSV: giữ số nguyên nếu không có phần thập phân"""
+    value = float(text)
+    return int(value) if value.is_integer() else value
+
+
+def read_csv(locations_path=None, edges_path=None):
+    """
+    Đọc địa điểm / cạnh từ file CSV (dòng đầu là tên cột)
+
+    File địa điểm có cột "id" và các cột LOCATION_FIELDS; file cạnh có các cột
+    "loc1", "loc2", "distance".
+
+    Returns:
+        tuple: (locations, distances) - phần không có file là dict rỗng
+    """
+    locations = {}
+    if locations_path:
+        with open(locations_path, encoding="utf-8-sig", newline="") as f:
+            for row in csv.DictReader(f):
+                locations[row["id"]] = {
+                    "name": row.get("name") or row["id"],
+                    "district": row.get("district") or "",
+                    "description": row.get("description") or "",
+                    "x": _number(row["x"]),
+                    "y": _number(row["y"]),
+                    "image": row.get("image") or "",
+                }
+    distances = {}
+    if edges_path:
+        with open(edges_path, encoding="utf-8-sig", newline="") as f:
+            for row in csv.DictReader(f):
+                distances[(row["loc1"], row["loc2"])] = float(row["distance"])
+    return locations, distances
+
+
+def read_json(path):
+    """
+    Đọc địa điểm và cạnh từ file JSON
+
+    Định dạng: {"locations": {ID: {...}}, "distances": [[loc1, loc2, km], ...]}
+
+    Returns:
+        tuple: (locations, distances)
+    """
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    distances = {(loc1, loc2): distance
+                 for loc1, loc2, distance in data.get("distances", [])}
+    return data.get("locations", {}), distances
+
+
+def write_json(path, locations, distances):
+    """Ghi địa điểm và cạnh ra file JSON theo định dạng của read_json"""
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"locations": locations,
+                   "distances": [[loc1, loc2, distance] for (loc1, loc2), distance
+                                 in distances.items()]},
+                  f, ensure_ascii=False)
+
+
+class MemoryStore:
+    """Kho trong bộ nhớ (dict), dùng cho dữ liệu sinh ra lúc chạy"""
+
+    def __init__(self, locations=None, distances=None):
+        self.locations = dict(locations or {})
+        self.distances = dict(distances or {})
+
+    def load_locations(self):
+        return dict(self.locations)
+
+    def load_distances(self):
+        return dict(self.distances)
+
+    def save(self, locations=None, distances=None):
+        if locations is not None:
+            self.locations = dict(locations)
+        if distances is not None:
+            self.distances = dict(distances)
+
+
+class JsonStore:
+    """Kho là một file JSON (định dạng của read_json)"""
+
+    def __init__(self, path):
+        self.path = path
+
+    def load_locations(self):
+        return read_json(self.path)[0]
+
+    def load_distances(self):
+        return read_json(self.path)[1]
+
+    def save(self, locations=None, distances=None):
+        if locations is None or distances is None:
+            old_locations, old_distances = (read_json(self.path)
+                                            if os.path.exists(self.path) else ({}, {}))
+            locations = old_locations if locations is None else locations
+            distances = old_distances if distances is None else distances
+        write_json(self.path, locations, distances)
+
+
+class SQLiteStore:
+    """
+    Kho SQLite: bảng locations (id, các trường LOCATION_FIELDS) và bảng
+    edges (loc1, loc2, distance), giữ thứ tự ghi
+
+    Mỗi lần đọc / ghi mở kết nối riêng nên dùng được từ nhiều luồng.
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+    def _connect(self):
+        connection = sqlite3.connect(self.path)
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS locations (id TEXT PRIMARY KEY, "
+            "name TEXT, district TEXT, description TEXT, x NUMERIC, y NUMERIC, "
+            "image TEXT)")
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS edges (loc1 TEXT, loc2 TEXT, "
+            "distance REAL, UNIQUE (loc1, loc2))")
+        return connection
+
+    def load_locations(self):
+        connection = self._connect()
+        try:
+            rows = connection.execute(
+                "SELECT id, " + ", ".join(LOCATION_FIELDS) +
+                " FROM locations ORDER BY rowid")
+            return {row[0]: dict(zip(LOCATION_FIELDS, row[1:])) for row in rows}
+        finally:
+            connection.close()
+
+    def load_distances(self):
+        connection = self._connect()
+        try:
+            rows = connection.execute(
+                "SELECT loc1, loc2, distance FROM edges ORDER BY rowid")
+            return {(loc1, loc2): distance for loc1, loc2, distance in rows}
+        finally:
+            connection.close()
+
+    def save(self, locations=None, distances=None):
+        connection = self._connect()
+        try:
+            with connection:
+                if locations is not None:
+                    connection.execute("DELETE FROM locations")
+                    connection.executemany(
+                        "INSERT INTO locations VALUES (?, ?, ?, ?, ?, ?, ?)",
+                        ((loc_id,) + tuple(loc_data.get(field)
+                                           for field in LOCATION_FIELDS)
+                         for loc_id, loc_data in locations.items()))
+                if distances is not None:
+                    connection.execute("DELETE FROM edges")
+                    connection.executemany(
+                        "INSERT INTO edges VALUES (?, ?, ?)",
+                        ((loc1, loc2, distance)
+                         for (loc1, loc2), distance in distances.items()))
+        finally:
+            connection.close()
+
+
+class BinaryStore:
+    """
+    Kho là một file nhị phân gọn: mỗi cạnh chỉ tốn 16 byte và được đọc bằng
+    array.fromfile, không phải phân tích văn bản
+
+    load_locations chỉ đọc phần đầu file, không đọc các mảng cạnh.
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+    def _read(self, with_edges):
+        """
+        Returns:
+            tuple: (meta, sources, targets, weights) - các mảng là None nếu
+                   with_edges=False
+
+        Raises:
+            ValueError: File không đúng định dạng / phiên bản
+        """
+        with open(self.path, "rb") as f:
+            header = f.read(_HEADER.size)
+            if len(header) != _HEADER.size:
+                raise ValueError(f"File dữ liệu không hợp lệ: {self.path}")
+            magic, version, meta_length, m = _HEADER.unpack(header)
+            if magic != MAGIC or version != FORMAT_VERSION:
+                raise ValueError(f"File dữ liệu không hợp lệ: {self.path}")
+            meta = json.loads(f.read(meta_length).decode("utf-8"))
+            if not with_edges:
+                return meta, None, None, None
+
+            def read(typecode):
+                buffer = array(typecode)
+                buffer.fromfile(f, m)
+                return buffer
+
+            return meta, read('i'), read('i'), read('d')
+
+    def load_locations(self):
+        return self._read(False)[0]["locations"]
+
+    def load_distances(self):
+        meta, sources, targets, weights = self._read(True)
+        ids = meta["ids"]
+        return {(ids[i], ids[j]): distance
+                for i, j, distance in zip(sources, targets, weights)}
+
+    def save(self, locations=None, distances=None):
+        if locations is None:
+            locations = self.load_locations() if os.path.exists(self.path) else {}
+        if distances is None:
+            distances = self.load_distances() if os.path.exists(self.path) else {}
+
+        index = {loc_id: i for i, loc_id in enumerate(locations)}
+        for edge in distances:
+            for loc_id in edge:
+                index.setdefault(loc_id, len(index))
+        meta = json.dumps({"ids": list(index), "locations": locations},
+                          ensure_ascii=False).encode("utf-8")
+        sources = array('i', (index[loc1] for loc1, _ in distances))
+        targets = array('i', (index[loc2] for _, loc2 in distances))
+        weights = array('d', distances.values())
+        with open(self.path, "wb") as f:
+            f.write(_HEADER.pack(MAGIC, FORMAT_VERSION, len(meta), len(weights)))
+            f.write(meta)
+            for buffer in (sources, targets, weights):
+                buffer.tofile(f)
+
+
+# Kho theo phần mở rộng của file (open_store)
+STORE_TYPES = {
+    ".json": JsonStore,
+    ".sqlite": SQLiteStore,
+    ".sqlite3": SQLiteStore,
+    ".db": SQLiteStore,
+    ".fpds": BinaryStore,
+}
+
+
+def open_store(path):
+    """
+    Mở kho theo phần mở rộng của file (xem STORE_TYPES)
+
+    Raises:
+        ValueError: Phần mở rộng không được hỗ trợ
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension not in STORE_TYPES:
+        raise ValueError(f"Không hỗ trợ file dữ liệu {path} "
+                         f"(dùng {', '.join(STORE_TYPES)})")
+    return STORE_TYPES[extension](path)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Nhập địa điểm / khoảng cách từ CSV hoặc JSON vào một kho dữ liệu")
+    parser.add_argument("output", help="File kho đích (.json, .sqlite, .db, .fpds)")
+    parser.add_argument("--locations", help="File CSV địa điểm")
+    parser.add_argument("--edges", help="File CSV cạnh")
+    parser.add_argument("--json", action="append", default=[],
+                        help="File JSON (dùng nhiều lần được)")
+    parser.add_argument("--merge", action="store_true",
+                        help="Gộp vào dữ liệu đang có trong file đích")
+    args = parser.parse_args(argv)
+
+    store = open_store(args.output)
+    locations, distances = {}, {}
+    if args.merge and os.path.exists(args.output):
+        locations, distances = store.load_locations(), store.load_distances()
+
+    sources = [read_json(path) for path in args.json]
+    if args.locations or args.edges:
+        sources.append(read_csv(args.locations, args.edges))
+    for new_locations, new_distances in sources:
+        locations.update(new_locations)
+        distances.update(new_distances)
+
+    unknown = {loc for edge in distances for loc in edge} - set(locations)
+    if unknown:
+        print(f"Cảnh báo: {len(unknown)} điểm có cạnh nhưng không có thông tin "
+              f"địa điểm", file=sys.stderr)
+
+    store.save(locations, distances)
+    print(f"Đã ghi {len(locations)} địa điểm, {len(distances)} cạnh vào {args.output}",
+          file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
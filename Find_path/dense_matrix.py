@@ -0,0 +1,156 @@
+"""
+Module chứa ma trận khoảng cách dày dùng NumPy (tùy chọn)
+
+NumPy không bắt buộc: khi chưa cài, HAS_NUMPY = False và mọi nơi khác vẫn
+dùng dict / Dijkstra như cũ.
+"""
+try:
+    import numpy as np
+except ImportError:  # NumPy là phụ thuộc tùy chọn
+    np = None
+
+
+HAS_NUMPY = np is not None
+
+INF = float("inf")
+
+
+def require_numpy():
+    """Báo lỗi rõ ràng khi chọn backend NumPy mà chưa cài NumPy"""
+    if np is None:
+        raise ImportError("Backend 'numpy' cần cài NumPy: pip install numpy")
+
+
+class DenseDistanceMatrix:
+    """
+    Ma trận khoảng cách đối xứng n x n theo chỉ số địa điểm
+
+    direct[i][j] là độ dài cạnh nối trực tiếp (INF nếu không nối, 0 trên
+    đường chéo). Khoảng cách ngắn nhất giữa mọi cặp được tính bằng
+    Floyd-Warshall vector hóa và lưu đệm.
+    """
+
+    def __init__(self, ids, direct):
+        """
+        Khởi tạo ma trận
+
+        Args:
+            ids: Danh sách ID địa điểm, vị trí trong list là chỉ số
+            direct: numpy array (n, n) độ dài cạnh trực tiếp
+        """
+        require_numpy()
+        self.ids = list(ids)
+        self.index = {loc_id: i for i, loc_id in enumerate(self.ids)}
+        self.direct = direct
+        self._shortest = None
+        self._successor = None
+
+    @classmethod
+    def from_edges(cls, ids, edges):
+        """
+        Dựng ma trận từ dict {(loc1, loc2): distance}
+
+        Args:
+            ids: Các ID địa điểm (thứ tự quyết định chỉ số)
+            edges: Dict cạnh, thứ tự 2 đầu mút không quan trọng
+
+        Returns:
+            DenseDistanceMatrix
+        """
+        require_numpy()
+        ids = list(ids)
+        index = {loc_id: i for i, loc_id in enumerate(ids)}
+        n = len(ids)
+
+        direct = np.full((n, n), INF)
+        np.fill_diagonal(direct, 0.0)
+        if edges:
+            rows = np.fromiter((index[loc1] for loc1, _ in edges), dtype=np.intp,
+                               count=len(edges))
+            cols = np.fromiter((index[loc2] for _, loc2 in edges), dtype=np.intp,
+                               count=len(edges))
+            weights = np.fromiter(edges.values(), dtype=float, count=len(edges))
+            # Cạnh khai báo 2 lần (a, b) và (b, a): giữ cạnh ngắn hơn như đồ thị
+            np.minimum.at(direct, (rows, cols), weights)
+            np.minimum.at(direct, (cols, rows), weights)
+
+        return cls(ids, direct)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def indices(self, loc_ids):
+        """Mảng chỉ số của một dãy ID địa điểm"""
+        return np.fromiter((self.index[loc_id] for loc_id in loc_ids),
+                           dtype=np.intp)
+
+    def get_distance(self, loc1, loc2):
+        """Độ dài cạnh trực tiếp (None nếu không nối trực tiếp)"""
+        i, j = self.index.get(loc1), self.index.get(loc2)
+        if i is None or j is None or i == j:
+            return None
+        distance = self.direct[i, j]
+        return None if distance == INF else float(distance)
+
+    def is_connected(self, loc1, loc2):
+        """Kiểm tra 2 địa điểm có kết nối trực tiếp không"""
+        return self.get_distance(loc1, loc2) is not None
+
+    def floyd_warshall(self):
+        """
+        Khoảng cách ngắn nhất giữa mọi cặp, Floyd-Warshall vector hóa O(n^3)
+
+        Mỗi bước k cập nhật cả ma trận bằng một phép broadcast
+        dist[i, k] + dist[k, j] thay vì 2 vòng lặp Python.
+
+        Returns:
+            tuple: (dist, successor) - numpy array; successor[i, j] là chỉ số
+                   điểm kế tiếp trên đường từ i đến j (-1 nếu không tới được)
+        """
+        if self._shortest is not None:
+            return self._shortest, self._successor
+
+        n = len(self.ids)
+        dist = self.direct.copy()
+        successor = np.where(dist < INF, np.arange(n)[np.newaxis, :], -1)
+
+        for k in range(n):
+            via = dist[:, k, np.newaxis] + dist[np.newaxis, k, :]
+            shorter = via < dist
+            if shorter.any():
+                dist = np.where(shorter, via, dist)
+                successor = np.where(shorter, successor[:, k, np.newaxis], successor)
+
+        self._shortest, self._successor = dist, successor
+        return dist, successor
+
+    def tour_cost(self, tour):
+        """
+        Tổng khoảng cách ngắn nhất của một lộ trình
+
+        Args:
+            tour: Dãy ID địa điểm theo thứ tự đi
+
+        Returns:
+            float: Tổng quãng đường (INF nếu có đoạn không tới được)
+        """
+        if len(tour) < 2:
+            return 0.0
+        return float(self.tour_costs(self.indices(tour)[np.newaxis, :])[0])
+
+    def tour_costs(self, tours):
+        """
+        Tổng quãng đường của nhiều lộ trình cùng lúc
+
+        Args:
+            tours: numpy array số nguyên (m, k), mỗi dòng là một lộ trình theo
+                   chỉ số
+
+        Returns:
+            numpy array (m,): Tổng khoảng cách ngắn nhất của từng lộ trình
+        """
+        dist, _ = self.floyd_warshall()
+        tours = np.asarray(tours, dtype=np.intp)
+        if tours.shape[1] < 2:
+            return np.zeros(tours.shape[0])
+        return dist[tours[:, :-1], tours[:, 1:]].sum(axis=1)
@@ -0,0 +1,367 @@
+"""
+Module chứa đồ thị dạng CSR (compressed sparse row) đánh chỉ số nguyên
+"""
+from array import array
+from heapq import heappop, heappush
+from math import hypot
+
+
+INF = float("inf")
+
+# astar so sánh ước lượng sau khi làm tròn tới số chữ số thập phân này (km):
+# các điểm cùng nằm trên đường ngắn nhất có ước lượng chỉ lệch nhau vài ulp,
+# làm tròn để chúng được xếp theo quãng đường đã đi thay vì theo sai số
+TIE_DIGITS = 9
+
+
+class CompactGraph:
+    """
+    Đồ thị vô hướng lưu gọn theo CSR
+
+    ID địa điểm được đổi thành chỉ số 0..n-1. Các cạnh kề của điểm i nằm ở
+    targets[offsets[i]:offsets[i + 1]] với trọng số tương ứng trong weights,
+    mỗi cạnh chỉ tốn 12 byte (array 'i' + array 'd') thay vì một tuple.
+    """
+
+    def __init__(self, ids, offsets, targets, weights):
+        """
+        Khởi tạo đồ thị
+
+        Args:
+            ids: Danh sách ID địa điểm, vị trí trong list là chỉ số
+            offsets: array('i') độ dài n + 1, vị trí bắt đầu cạnh của từng điểm
+            targets: array('i') chỉ số điểm đầu kia của từng cạnh
+            weights: array('d') độ dài từng cạnh
+        """
+        self.ids = ids
+        self.index = {loc_id: i for i, loc_id in enumerate(ids)}
+        self.offsets = offsets
+        self.targets = targets
+        self.weights = weights
+
+    @classmethod
+    def from_edges(cls, ids, edges):
+        """
+        Dựng đồ thị từ danh sách cạnh
+
+        Args:
+            ids: Các ID địa điểm (thứ tự quyết định chỉ số)
+            edges: Dict {(loc1, loc2): distance} hoặc iterable các bộ
+                   (loc1, loc2, distance); mỗi cạnh được thêm theo cả 2 chiều
+
+        Returns:
+            CompactGraph
+        """
+        ids = list(ids)
+        index = {loc_id: i for i, loc_id in enumerate(ids)}
+        if isinstance(edges, dict):
+            edges = ((loc1, loc2, distance)
+                     for (loc1, loc2), distance in edges.items())
+
+        sources = array('i')
+        targets = array('i')
+        weights = array('d')
+        for loc1, loc2, distance in edges:
+            i, j = index[loc1], index[loc2]
+            sources.extend((i, j))
+            targets.extend((j, i))
+            weights.extend((distance, distance))
+
+        # Đếm bậc rồi xếp cạnh theo điểm nguồn (giữ thứ tự thêm vào)
+        n = len(ids)
+        offsets = array('i', [0] * (n + 1))
+        for i in sources:
+            offsets[i + 1] += 1
+        for i in range(n):
+            offsets[i + 1] += offsets[i]
+
+        position = array('i', offsets[:-1])
+        sorted_targets = array('i', [0] * len(targets))
+        sorted_weights = array('d', [0.0] * len(weights))
+        for k, i in enumerate(sources):
+            slot = position[i]
+            sorted_targets[slot] = targets[k]
+            sorted_weights[slot] = weights[k]
+            position[i] = slot + 1
+
+        return cls(ids, offsets, sorted_targets, sorted_weights)
+
+    def __len__(self):
+        return len(self.ids)
+
+    @property
+    def edge_count(self):
+        """Số cạnh (vô hướng)"""
+        return len(self.targets) // 2
+
+    def index_of(self, loc_id):
+        """Chỉ số của một ID địa điểm"""
+        return self.index[loc_id]
+
+    def id_of(self, i):
+        """ID địa điểm của một chỉ số"""
+        return self.ids[i]
+
+    def neighbors(self, i):
+        """Các cạnh kề của điểm chỉ số i: list (chỉ số, độ dài)"""
+        start, end = self.offsets[i], self.offsets[i + 1]
+        return list(zip(self.targets[start:end], self.weights[start:end]))
+
+    def __getitem__(self, loc_id):
+        """Các cạnh kề theo ID (tương thích với adjacency list dạng dict)"""
+        return [(self.ids[j], weight)
+                for j, weight in self.neighbors(self.index[loc_id])]
+
+    def keys(self):
+        """Các ID địa điểm (tương thích với adjacency list dạng dict)"""
+        return list(self.ids)
+
+    def __iter__(self):
+        return iter(self.ids)
+
+    def __contains__(self, loc_id):
+        return loc_id in self.index
+
+    def nbytes(self):
+        """Số byte của các bộ đệm CSR"""
+        return sum(buffer.itemsize * len(buffer)
+                   for buffer in (self.offsets, self.targets, self.weights))
+
+    def shortest_path_tree(self, source, target=-1):
+        """
+        Dijkstra một nguồn theo chỉ số, dùng binary heap
+
+        Args:
+            source: Chỉ số điểm nguồn
+            target: Chỉ số điểm đích để dừng sớm (-1 = tính toàn bộ cây)
+
+        Returns:
+            tuple: (distances, previous) - list theo chỉ số; INF / -1 với
+                   điểm không tới được, previous[source] = -1
+        """
+        n = len(self.ids)
+        offsets, targets, weights = self.offsets, self.targets, self.weights
+        distances = [INF] * n
+        previous = [-1] * n
+        settled = bytearray(n)
+        distances[source] = 0
+        heap = [(0, source)]
+
+        while heap:
+            distance, current = heappop(heap)
+            if settled[current]:
+                continue
+            settled[current] = 1
+
+            if current == target:
+                break
+
+            for k in range(offsets[current], offsets[current + 1]):
+                neighbor = targets[k]
+                candidate = distance + weights[k]
+                if candidate < distances[neighbor]:
+                    distances[neighbor] = candidate
+                    previous[neighbor] = current
+                    heappush(heap, (candidate, neighbor))
+
+        return distances, previous
+
+    def astar(self, source, target, heuristic):
+        """
+        Tìm đường ngắn nhất giữa 2 điểm bằng A*
+
+        heuristic phải là cận dưới nhất quán (consistent) của khoảng cách tới
+        target: heuristic(i) <= độ dài cạnh (i, j) + heuristic(j) với mọi cạnh.
+        Khi đó mỗi điểm chỉ được chốt một lần và kết quả giống Dijkstra (sai
+        khác không quá cỡ 10^-TIE_DIGITS). heuristic của mỗi điểm chỉ được gọi
+        một lần; giữa các điểm cùng ước lượng, điểm đã đi được xa hơn (gần
+        target hơn) được mở trước.
+
+        Args:
+            source: Chỉ số điểm nguồn
+            target: Chỉ số điểm đích
+            heuristic: Hàm heuristic(i) -> cận dưới khoảng cách từ i tới target
+
+        Returns:
+            tuple: (path, distance, settled) - list chỉ số từ source tới target,
+                   độ dài và số điểm đã chốt; ([], INF, settled) nếu không tới được
+        """
+        n = len(self.ids)
+        offsets, targets, weights = self.offsets, self.targets, self.weights
+        distances = [INF] * n
+        previous = [-1] * n
+        estimates = [-1.0] * n
+        settled = bytearray(n)
+        count = 0
+        distances[source] = 0
+        heap = [(heuristic(source), 0, source)]
+
+        while heap:
+            current = heappop(heap)[2]
+            if settled[current]:
+                continue
+            settled[current] = 1
+            count += 1
+            # Lần lấy ra đầu tiên của một điểm có ước lượng nhỏ nhất, tức là
+            # khoảng cách hiện tại của nó
+            distance = distances[current]
+
+            if current == target:
+                return _trace(previous, target), distance, count
+
+            for k in range(offsets[current], offsets[current + 1]):
+                neighbor = targets[k]
+                candidate = distance + weights[k]
+                if candidate < distances[neighbor]:
+                    distances[neighbor] = candidate
+                    previous[neighbor] = current
+                    estimate = estimates[neighbor]
+                    if estimate < 0:
+                        estimate = estimates[neighbor] = heuristic(neighbor)
+                    heappush(heap, (round(candidate + estimate, TIE_DIGITS),
+                                    -candidate, neighbor))
+
+        return [], INF, count
+
+    def landmark_distances(self, count):
+        """
+        Khoảng cách từ các điểm mốc (landmark) tới mọi điểm, cho heuristic ALT
+        của astar
+
+        Mốc đầu là điểm xa điểm 0 nhất, mỗi mốc sau là điểm xa các mốc đã chọn
+        nhất, nên các mốc nằm rải ở rìa đồ thị. Với mọi mốc L, theo bất đẳng
+        thức tam giác |d(L, target) - d(L, i)| <= d(i, target) (đồ thị vô
+        hướng) và cận dưới này nhất quán.
+
+        Args:
+            count: Số mốc tối đa
+
+        Returns:
+            list: Mỗi mốc một list khoảng cách theo chỉ số (như
+                  shortest_path_tree, INF với điểm không tới được)
+        """
+        if not self.ids:
+            return []
+        tables = []
+        farthest = self.shortest_path_tree(0)[0]
+        for _ in range(count):
+            landmark = max(range(len(self.ids)),
+                           key=lambda i: farthest[i] if farthest[i] < INF else -1.0)
+            if tables and farthest[landmark] <= 0:
+                break  # Mọi điểm tới được đều đã là mốc
+            distances = self.shortest_path_tree(landmark)[0]
+            farthest = (distances if not tables
+                        else [min(a, b) for a, b in zip(farthest, distances)])
+            tables.append(distances)
+        return tables
+
+    def bidirectional_dijkstra(self, source, target):
+        """
+        Tìm đường ngắn nhất giữa 2 điểm bằng Dijkstra 2 chiều
+
+        Chạy xen kẽ một Dijkstra từ source và một từ target (đồ thị vô hướng),
+        mỗi bước mở phía có đỉnh heap nhỏ hơn. Dừng khi tổng 2 đỉnh heap không
+        nhỏ hơn đường tốt nhất đã nối được 2 phía. Không cần tọa độ.
+
+        Args:
+            source: Chỉ số điểm nguồn
+            target: Chỉ số điểm đích
+
+        Returns:
+            tuple: (path, distance, settled) như astar
+        """
+        if source == target:
+            return [source], 0, 1
+
+        offsets, targets, weights = self.offsets, self.targets, self.weights
+        distances = ({source: 0}, {target: 0})
+        previous = ({source: -1}, {target: -1})
+        settled = (set(), set())
+        heaps = ([(0, source)], [(0, target)])
+        # Cạnh nối 2 phía của đường tốt nhất: (điểm phía source, điểm phía target)
+        best, meeting = INF, None
+
+        while heaps[0] and heaps[1]:
+            if heaps[0][0][0] + heaps[1][0][0] >= best:
+                break
+            side = 0 if heaps[0][0][0] <= heaps[1][0][0] else 1
+            distance, current = heappop(heaps[side])
+            if current in settled[side]:
+                continue
+            settled[side].add(current)
+
+            own, other = distances[side], distances[1 - side]
+            parents, heap = previous[side], heaps[side]
+            for k in range(offsets[current], offsets[current + 1]):
+                neighbor = targets[k]
+                candidate = distance + weights[k]
+                through = candidate + other.get(neighbor, INF)
+                if through < best:
+                    best = through
+                    meeting = ((current, neighbor) if side == 0
+                               else (neighbor, current))
+                # Nhãn không nhỏ hơn best không thể nằm trên đường tốt hơn
+                if candidate < best and candidate < own.get(neighbor, INF):
+                    own[neighbor] = candidate
+                    parents[neighbor] = current
+                    heappush(heap, (candidate, neighbor))
+
+        explored = len(settled[0]) + len(settled[1])
+        if meeting is None:
+            return [], INF, explored
+
+        # Nửa đầu theo cây của source, nửa sau đi ngược cây của target; cộng
+        # lại độ dài theo chiều đi để khớp từng bit với Dijkstra một chiều
+        forward, backward = meeting
+        path = _trace(previous[0], forward)
+        total = distances[0][forward]
+        current = backward
+        while current != -1:
+            total += self._edge_weight(path[-1], current)
+            path.append(current)
+            current = previous[1][current]
+        return path, total, explored
+
+    def _edge_weight(self, i, j):
+        """Độ dài cạnh ngắn nhất giữa 2 điểm kề nhau"""
+        return min(self.weights[k]
+                   for k in range(self.offsets[i], self.offsets[i + 1])
+                   if self.targets[k] == j)
+
+    def admissible_scale(self, xs, ys):
+        """
+        Hệ số đổi khoảng cách tọa độ ra km lớn nhất mà heuristic vẫn đúng
+
+        Lấy nhỏ nhất của độ dài cạnh / khoảng cách tọa độ qua mọi cạnh. Với hệ
+        số này mọi đường đi dài ít nhất hệ số * khoảng cách tọa độ giữa 2 đầu
+        (bất đẳng thức tam giác), nên heuristic đường chim bay nhất quán.
+
+        Args:
+            xs, ys: Tọa độ của từng điểm theo chỉ số
+
+        Returns:
+            float: Hệ số (km / đơn vị tọa độ), 0.0 nếu không có cạnh nào dùng được
+        """
+        scale = INF
+        offsets, targets, weights = self.offsets, self.targets, self.weights
+        for i in range(len(self.ids)):
+            for k in range(offsets[i], offsets[i + 1]):
+                j = targets[k]
+                span = hypot(xs[i] - xs[j], ys[i] - ys[j])
+                if span > 0:
+                    scale = min(scale, weights[k] / span)
+        if scale == INF:
+            return 0.0
+        # Chừa sai số làm tròn để heuristic không vượt độ dài cạnh dù 1 ulp
+        return scale * (1 - 1e-9)
+
+
+def _trace(previous, target):
+    """Lần ngược previous (dict hoặc list, -1 = gốc) thành đường đi tới target"""
+    path = []
+    current = target
+    while current != -1:
+        path.append(current)
+        current = previous[current]
+    path.reverse()
+    return path
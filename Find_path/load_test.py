@@ -0,0 +1,149 @@
+"""
+Máy khách kiểm tra tải cho planning_service
+
+Mở nhiều kết nối HTTP giữ sẵn tới dịch vụ, mỗi kết nối gửi liên tục các truy
+vấn ngẫu nhiên (seed cố định) trong một khoảng thời gian rồi in số yêu cầu mỗi
+giây, số lượng theo mã HTTP và độ trễ p50/p95/p99:
+
+    python load_test.py --port 8765 --connections 16 --duration 30
+"""
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+
+from batch_cli import percentile
+from data_model import LocationData
+from data_store import open_store
+
+
+def make_queries(location_ids, count, max_stops=7, repeat_ratio=0.3, seed=0):
+    """
+    Sinh các truy vấn ngẫu nhiên
+
+    Args:
+        location_ids: Các ID địa điểm để chọn
+        count: Số truy vấn
+        max_stops: Số điểm tối đa mỗi truy vấn
+        repeat_ratio: Tỉ lệ truy vấn lặp lại một truy vấn trước đó (kiểm tra
+                      bộ nhớ đệm như người dùng thật)
+        seed: Seed của bộ sinh ngẫu nhiên
+
+    Returns:
+        list: Các object JSON truy vấn
+    """
+    rng = random.Random(seed)
+    location_ids = list(location_ids)
+    queries = []
+    for _ in range(count):
+        if queries and rng.random() < repeat_ratio:
+            queries.append(rng.choice(queries))
+            continue
+        stops = rng.sample(location_ids,
+                           rng.randint(2, min(max_stops, len(location_ids))))
+        query = {"start": stops[0], "optional": stops[1:]}
+        if rng.random() < 0.5:
+            query["limit_km"] = round(rng.uniform(5, 25), 1)
+        queries.append(query)
+    return queries
+
+
+async def _request(reader, writer, host, body):
+    """Gửi một POST /plan trên kết nối giữ sẵn, trả về mã HTTP"""
+    writer.write((f"POST /plan HTTP/1.1\r\nHost: {host}\r\n"
+                  "Content-Type: application/json\r\n"
+                  f"Content-Length: {len(body)}\r\n\r\n").encode("latin-1") + body)
+    await writer.drain()
+
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        if name.strip().lower() == "content-length":
+            length = int(value)
+    await reader.readexactly(length)
+    return status
+
+
+async def _client(host, port, queries, deadline, latencies, statuses):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        for query in queries:
+            if time.perf_counter() >= deadline:
+                break
+            body = json.dumps(query).encode("utf-8")
+            started = time.perf_counter()
+            status = await _request(reader, writer, host, body)
+            latencies.append(time.perf_counter() - started)
+            statuses[status] = statuses.get(status, 0) + 1
+    finally:
+        writer.close()
+
+
+async def run_load(host, port, connections, duration, queries):
+    """
+    Chạy kiểm tra tải
+
+    Args:
+        host, port: Địa chỉ dịch vụ
+        connections: Số kết nối gửi đồng thời
+        duration: Thời gian chạy tối đa (giây)
+        queries: Các truy vấn, được chia vòng tròn cho các kết nối
+
+    Returns:
+        dict: requests, elapsed_s, requests_per_s, statuses, p50_ms,
+              p95_ms, p99_ms
+    """
+    latencies, statuses = [], {}
+    started = time.perf_counter()
+    deadline = started + duration
+    await asyncio.gather(*(
+        _client(host, port, queries[i::connections], deadline, latencies,
+                statuses)
+        for i in range(connections)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "elapsed_s": round(elapsed, 3),
+        "requests_per_s": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        "statuses": statuses,
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 3),
+    }
+
+
+def main(argv=None):
+    """Entry point của máy khách kiểm tra tải"""
+    parser = argparse.ArgumentParser(description="Kiểm tra tải planning_service")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--connections", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=10.0,
+                        help="Thời gian chạy tối đa (giây)")
+    parser.add_argument("--requests", type=int, default=100000,
+                        help="Số yêu cầu tối đa")
+    parser.add_argument("--max-stops", type=int, default=7)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--data", metavar="FILE",
+                        help="Kho dữ liệu dịch vụ đang dùng (để lấy ID địa điểm)")
+    args = parser.parse_args(argv)
+
+    store = open_store(args.data) if args.data else None
+    queries = make_queries(LocationData(store).get_all_locations(), args.requests,
+                           args.max_stops, seed=args.seed)
+    result = asyncio.run(run_load(args.host, args.port, max(1, args.connections),
+                                  args.duration, queries))
+    print(json.dumps(result))
+    return 0 if set(result["statuses"]) <= {200} else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
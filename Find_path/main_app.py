@@ -1,13 +1,23 @@
+import queue
+import threading
 import tkinter as tk
 from tkinter import messagebox, simpledialog
 
 from data_model import LocationData, DistanceMatrix
+from parallel_search import default_workers
 from path_finder import PathFinder
+from tsp_solvers import INF, SearchMonitor
 from image_handler import ImageManager
 from map_renderer import MapRenderer
 from ui_components import TourismUI
 
 
+# "Địa điểm gần đây" (chuột phải trên bản đồ): số địa điểm tối đa và bán kính
+# tìm (pixel trên bản đồ)
+NEARBY_COUNT = 8
+NEARBY_RADIUS = 250
+
+
 class HanoiTourismApp:
     
     def __init__(self, root):
@@ -19,7 +29,8 @@ class HanoiTourismApp:
         # Khởi tạo các module
         self.location_data = LocationData()
         self.distance_matrix = DistanceMatrix()
-        self.path_finder = PathFinder(self.location_data, self.distance_matrix)
+        self.path_finder = PathFinder(self.location_data, self.distance_matrix,
+                                      workers=default_workers())
         self.image_manager = ImageManager()
         
         # State
@@ -28,6 +39,16 @@ class HanoiTourismApp:
         self.mandatory_locations = []  # Danh sách điểm BẮT BUỘC phải đi 
         self.path_result = None  # Kết quả tìm đường
         
+        # Tìm đường chạy trên luồng riêng, kết quả gửi về qua hàng đợi
+        self._solver_queue = queue.Queue()
+        self._solver_monitor = None  # SearchMonitor của lần tìm đang chạy
+        self._solver_thread = None  # Luồng tìm gần nhất (có thể vẫn đang dừng sau khi hủy)
+        self._solve_generation = 0  # Tăng mỗi lần tìm/hủy để bỏ kết quả cũ
+        self._poll_job = None
+        # (lựa chọn, CoverageFrontier) của lần tìm gần nhất: đổi giới hạn km
+        # với cùng lựa chọn chỉ là tra cứu, dùng cho phần xem trước khi gõ
+        self._frontier = None
+        
         # Khởi tạo UI
         self.ui = TourismUI(self.root, self.location_data)
         
@@ -47,6 +68,7 @@ class HanoiTourismApp:
         
         # Set callback cho map click
         self.map_renderer.on_location_click = self.handle_map_click
+        self.map_renderer.on_nearby_request = self.show_nearby_places
         
         # Load hình ảnh
         self.image_manager.load_all_images(
@@ -57,12 +79,17 @@ class HanoiTourismApp:
         self.ui.create_location_list(self.selected_locations, 
                                      self.start_location,
                                      self.mandatory_locations)
+        
+        # Dừng tìm đường trước khi đóng cửa sổ
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
     
     def _setup_callbacks(self):
         """Thiết lập các callback cho UI"""
         self.ui.on_location_toggle = self.toggle_location
         self.ui.on_district_change_callback = self.on_district_change
         self.ui.on_find_path = self.find_path
+        self.ui.on_limit_change = self.update_limit_preview
+        self.ui.on_cancel = self.cancel_solve
         self.ui.on_reset = self.reset_selection
     
     def handle_map_click(self, loc_id):
@@ -70,6 +97,9 @@ class HanoiTourismApp:
         if loc_id not in self.selected_locations:
             return
         
+        # Lựa chọn thay đổi: kết quả đang tìm không còn đúng
+        self._abort_solve()
+        
         # TRƯỜNG HỢP 1: Chưa có điểm bắt đầu
         if self.start_location is None:
             self.start_location = loc_id
@@ -100,14 +130,69 @@ class HanoiTourismApp:
         # Cập nhật UI
         self.ui.update_stats(self.selected_locations, self.start_location, 
                            self.mandatory_locations)
+        self.update_limit_preview()
         self.map_renderer.draw_map(self.selected_locations, self.path_result, 
                                    self.start_location, self.mandatory_locations)
         self.ui.create_location_list(self.selected_locations, 
                                      self.start_location,
                                      self.mandatory_locations)
     
+    def show_nearby_places(self, x, y):
+        """Hiển thị các địa điểm gần vị trí (x, y) trên bản đồ để thêm vào lựa chọn"""
+        nearby = self.location_data.get_nearest_locations(
+            x, y, NEARBY_COUNT, NEARBY_RADIUS)
+        if not nearby:
+            messagebox.showinfo("Địa Điểm Gần Đây",
+                                "Không có địa điểm nào gần vị trí này!")
+            return
+        
+        dialog = tk.Toplevel(self.root)
+        dialog.title("Địa Điểm Gần Đây")
+        dialog.geometry("400x400")
+        dialog.configure(bg="white")
+        
+        tk.Label(dialog, text="Chọn địa điểm gần đó để thêm vào lộ trình:",
+                font=("Arial", 12, "bold"),
+                bg="white").pack(pady=10)
+        
+        check_frame = tk.Frame(dialog, bg="white")
+        check_frame.pack(fill=tk.BOTH, expand=True, padx=20, pady=10)
+        
+        # Gần nhất trước; điểm đã chọn được hiện nhưng không chọn lại được
+        vars_dict = {}
+        for loc_id, _ in nearby:
+            loc_data = self.location_data.get_location(loc_id)
+            text = f"{loc_data['name']} ({loc_data['district']})"
+            var = tk.BooleanVar(value=False)
+            cb = tk.Checkbutton(check_frame, text=text, variable=var,
+                                font=("Arial", 10), bg="white")
+            if loc_id in self.selected_locations:
+                cb.config(text=text + " - đã chọn", state=tk.DISABLED)
+            else:
+                vars_dict[loc_id] = var
+            cb.pack(anchor="w", pady=2)
+        
+        def on_confirm():
+            added = [loc_id for loc_id, var in vars_dict.items() if var.get()]
+            dialog.destroy()
+            for loc_id in added:
+                self.toggle_location(loc_id)
+        
+        btn_frame = tk.Frame(dialog, bg="white")
+        btn_frame.pack(pady=10)
+        
+        tk.Button(btn_frame, text="Thêm", command=on_confirm,
+                 bg="#10b981", fg="white", font=("Arial", 10, "bold"),
+                 padx=20, pady=5).pack(side=tk.LEFT, padx=5)
+        
+        tk.Button(btn_frame, text="Đóng", command=dialog.destroy,
+                 bg="#6b7280", fg="white", font=("Arial", 10, "bold"),
+                 padx=20, pady=5).pack(side=tk.LEFT, padx=5)
+    
     def toggle_location(self, loc_id):
         """Toggle chọn/bỏ chọn địa điểm từ danh sách"""
+        self._abort_solve()
+        
         if loc_id in self.selected_locations:
             self.selected_locations.remove(loc_id)
             
@@ -128,6 +213,7 @@ class HanoiTourismApp:
         self.on_district_change()
         self.ui.update_stats(self.selected_locations, self.start_location,
                            self.mandatory_locations)
+        self.update_limit_preview()
         self.map_renderer.draw_map(self.selected_locations, self.path_result, 
                                    self.start_location, self.mandatory_locations)
     
@@ -138,7 +224,10 @@ class HanoiTourismApp:
                                      self.mandatory_locations)
     
     def find_path(self, limit_km=None):
-        """Tìm đường đi tối ưu"""
+        """Tìm đường đi tối ưu (chạy trên luồng riêng, không khóa giao diện)"""
+        if self._solver_monitor is not None:
+            return  # Đang tìm đường
+        
         # Kiểm tra điều kiện cơ bản
         if self.start_location is None:
             messagebox.showwarning("Thông báo", 
@@ -150,47 +239,185 @@ class HanoiTourismApp:
                                  "Vui lòng chọn ít nhất 1 địa điểm!")
             return
         
-        # Kiểm tra xem các điểm bắt buộc có khả thi không
-        if limit_km and self.mandatory_locations:
-            feasible, min_dist, best_order = self.path_finder.check_mandatory_feasibility(
-                self.mandatory_locations, limit_km)
+        # Lần tìm vừa bị hủy vẫn chạy trên cùng PathFinder cho tới lần kiểm
+        # tra hủy kế tiếp: chờ nó dừng hẳn, không để 2 luồng cùng sửa bảng
+        # khoảng cách / bộ nhớ đệm
+        if self._solver_thread is not None and self._solver_thread.is_alive():
+            self.ui.progress_label.config(text=" Đang dừng lần tìm trước...")
+            self.root.after(50, lambda: self.find_path(limit_km))
+            return
+        
+        self._solve_generation += 1
+        generation = self._solve_generation
+        
+        def report_progress(monitor):
+            best = monitor.best_distance if monitor.best_distance < INF else None
+            self._solver_queue.put(("progress", generation, monitor.evaluated,
+                                    best, monitor.elapsed))
+        
+        monitor = SearchMonitor(on_progress=report_progress)
+        self._solver_monitor = monitor
+        
+        # Luồng tìm đường làm việc trên bản sao của lựa chọn hiện tại
+        worker = threading.Thread(
+            target=self._solve_worker,
+            args=(generation, monitor, list(self.selected_locations),
+                  self.start_location, list(self.mandatory_locations), limit_km),
+            daemon=True)
+        worker.start()
+        self._solver_thread = worker
+        
+        self.ui.set_solving(True)
+        if self._poll_job is None:
+            self._poll_job = self.root.after(100, self._poll_solver)
+    
+    def _solve_worker(self, generation, monitor, selected_locations,
+                      start_location, mandatory_locations, limit_km):
+        """Chạy trên luồng riêng: kiểm tra điểm bắt buộc và tìm đường trong một lần giải"""
+        try:
+            # Lựa chọn đủ nhỏ: tính biên Pareto một lần (lưu đệm), mọi giới
+            # hạn km của lựa chọn này sau đó chỉ là tra cứu
+            frontier = self.path_finder.get_coverage_frontier(
+                selected_locations,
+                start_location=start_location,
+                mandatory_locations=mandatory_locations,
+                monitor=monitor
+            )
+            partial = None
+            if frontier is not None and frontier.points:
+                index = frontier.best(limit_km)
+                if frontier.complete:
+                    self._solver_queue.put(("frontier", generation, self._selection_key(
+                        selected_locations, start_location, mandatory_locations),
+                        frontier))
+                    if index is None:
+                        _, min_distance, _, order = frontier.points[0]
+                        self._solver_queue.put(("infeasible", generation, monitor,
+                                                limit_km, (min_distance, list(order)),
+                                                self.path_finder.last_stats))
+                        return
+                    self._solver_queue.put(("done", generation, monitor, limit_km,
+                                            frontier.route(limit_km),
+                                            self.path_finder.last_stats))
+                    return
+                # Bị hủy giữa chừng: lộ trình tốt nhất trong phần biên đã tính,
+                # so với lộ trình ban đầu plan_route trả về ngay bên dưới
+                if index is not None:
+                    partial = frontier.route(limit_km)
             
-            if not feasible:
-                # Các điểm bắt buộc không thể đi hết trong giới hạn
-                loc_names = [self.location_data.get_location(loc)["name"] 
-                            for loc in self.mandatory_locations]
-                
-                response = messagebox.askyesno(
-                    "Vượt Giới Hạn Km",
-                    f"⚠️ KHÔNG THỂ đi hết các điểm BẮT BUỘC trong {limit_km} km!\n\n"
-                    f"Các điểm bắt buộc:\n" + "\n".join(f"  • {name}" for name in loc_names) + 
-                    f"\n\nKhoảng cách tối thiểu: {min_dist:.2f} km\n"
-                    f"Giới hạn của bạn: {limit_km} km\n\n"
-                    f"Bạn có muốn bỏ bớt điểm bắt buộc không?",
-                    icon='warning'
-                )
-                
-                if response:
-                    # Mở dialog chọn điểm cần bỏ
-                    self._show_remove_mandatory_dialog()
+            plan = self.path_finder.plan_route(
+                selected_locations, 
+                start_location=start_location,
+                mandatory_locations=mandatory_locations,
+                limit_km=limit_km,
+                monitor=monitor
+            )
+            
+            # Các điểm bắt buộc không thể đi hết trong giới hạn
+            if limit_km and not plan.feasible and not monitor.cancelled:
+                self._solver_queue.put(("infeasible", generation, monitor,
+                                        limit_km, (plan.mandatory_distance,
+                                                   plan.mandatory_order),
+                                        self.path_finder.last_stats))
                 return
+            
+            result = (plan.path, plan.total_distance, plan.exceeded_locations)
+            if partial is not None and (not result[0] or
+                                        (len(partial[2]), partial[1]) <
+                                        (len(result[2]), result[1])):
+                result = partial
+            self._solver_queue.put(("done", generation, monitor, limit_km, result,
+                                    self.path_finder.last_stats))
+        except Exception as exc:
+            self._solver_queue.put(("error", generation, monitor, limit_km, exc))
+    
+    def _poll_solver(self):
+        """Nhận tiến độ / kết quả từ luồng tìm đường (chạy trên luồng Tk)"""
+        self._poll_job = None
+        progress = None
         
-        # Tìm đường
-        path, total_distance, exceeded_locations = self.path_finder.find_shortest_path_tsp(
-            self.selected_locations, 
-            start_location=self.start_location,
-            mandatory_locations=self.mandatory_locations,
-            limit_km=limit_km
-        )
+        while True:
+            try:
+                message = self._solver_queue.get_nowait()
+            except queue.Empty:
+                break
+            
+            if message[1] != self._solve_generation:
+                continue  # Kết quả của lần tìm đã bị hủy
+            
+            if message[0] == "progress":
+                progress = message[2:]
+            elif message[0] == "frontier":
+                self._frontier = message[2:]
+                self.update_limit_preview()
+            else:
+                self._finish_solve(*message)
+                return
+        
+        if self._solver_monitor is None:
+            return
+        
+        if progress:
+            self.ui.show_progress(*progress)
+        self._poll_job = self.root.after(100, self._poll_solver)
+    
+    def _finish_solve(self, kind, generation, monitor, limit_km, payload,
+                      solver_stats=None):
+        """Xử lý kết quả cuối cùng của luồng tìm đường"""
+        self._solver_monitor = None
+        status = " Đã hủy - hiển thị lộ trình tốt nhất tìm được" if monitor.cancelled else ""
+        self.ui.set_solving(False, status)
+        
+        if kind == "error":
+            messagebox.showerror("Lỗi", f"Lỗi khi tìm đường:\n{payload}")
+            return
+        
+        # Thống kê bộ giải chỉ hiện khi người dùng bật: cùng kết quả nếu tìm
+        # được lộ trình, ngược lại ở bảng thống kê
+        if not self.ui.show_solver_stats:
+            solver_stats = None
+        
+        if kind == "infeasible":
+            # Các điểm bắt buộc không thể đi hết trong giới hạn
+            self.ui.update_stats(self.selected_locations, self.start_location,
+                                 self.mandatory_locations, solver_stats)
+            min_dist, best_order = payload
+            # Không có thứ tự đi: bị loại sớm nhờ cận dưới, min_dist là cận dưới
+            min_text = f"{min_dist:.2f} km" if best_order else f"ít nhất {min_dist:.2f} km"
+            loc_names = [self.location_data.get_location(loc)["name"] 
+                        for loc in self.mandatory_locations]
+            
+            response = messagebox.askyesno(
+                "Vượt Giới Hạn Km",
+                f"⚠️ KHÔNG THỂ đi hết các điểm BẮT BUỘC trong {limit_km} km!\n\n"
+                f"Các điểm bắt buộc:\n" + "\n".join(f"  • {name}" for name in loc_names) + 
+                f"\n\nKhoảng cách tối thiểu: {min_text}\n"
+                f"Giới hạn của bạn: {limit_km} km\n\n"
+                f"Bạn có muốn bỏ bớt điểm bắt buộc không?",
+                icon='warning'
+            )
+            
+            if response:
+                # Mở dialog chọn điểm cần bỏ
+                self._show_remove_mandatory_dialog()
+            return
+        
+        path, total_distance, exceeded_locations = payload
         
         if not path:
-            messagebox.showinfo("Thông báo", 
-                              "Không tìm được lộ trình phù hợp!\n"
-                              "Hãy thử giảm số điểm hoặc tăng giới hạn km.")
+            self.ui.update_stats(self.selected_locations, self.start_location,
+                                 self.mandatory_locations, solver_stats)
+            if monitor.cancelled:
+                messagebox.showinfo("Thông báo", 
+                                  "Đã hủy trước khi tìm được lộ trình nào!")
+            else:
+                messagebox.showinfo("Thông báo", 
+                                  "Không tìm được lộ trình phù hợp!\n"
+                                  "Hãy thử giảm số điểm hoặc tăng giới hạn km.")
             return
         
         # Kiểm tra xem có điểm optional bị bỏ qua không
-        if exceeded_locations:
+        if exceeded_locations and not monitor.cancelled:
             loc_names = [self.location_data.get_location(loc)["name"] 
                         for loc in exceeded_locations]
             
@@ -213,10 +440,62 @@ class HanoiTourismApp:
                           exceeded_locations)
         
         self.ui.display_result(self.path_result, self.start_location, 
-                              self.mandatory_locations)
+                              self.mandatory_locations, solver_stats)
         self.map_renderer.draw_map(visited_locations, self.path_result, 
                                    self.start_location, self.mandatory_locations)
     
+    @staticmethod
+    def _selection_key(selected_locations, start_location, mandatory_locations):
+        """Khóa của một lựa chọn (để biết biên Pareto đã lưu còn dùng được không)"""
+        return (tuple(selected_locations), start_location,
+                tuple(mandatory_locations))
+    
+    def update_limit_preview(self):
+        """Xem trước theo giới hạn km đang nhập, tra trên biên Pareto đã có"""
+        text = ""
+        key = self._selection_key(self.selected_locations, self.start_location,
+                                  self.mandatory_locations)
+        try:
+            limit_km = float(self.ui.limit_var.get().strip())
+        except ValueError:
+            limit_km = None
+        
+        if limit_km and self._frontier is not None and self._frontier[0] == key:
+            frontier = self._frontier[1]
+            index = frontier.best(limit_km)
+            if index is None:
+                text = (f" Cần ít nhất {frontier.min_distance:.2f} km "
+                        f"để đi hết các điểm bắt buộc")
+            else:
+                count, distance = frontier.points[index][:2]
+                text = f" Trong {limit_km:g} km: {count} điểm tùy chọn ({distance:.2f} km)"
+                step = frontier.next_step(limit_km)
+                if step is not None:
+                    text += (f"\n Có thể đi thêm {step[0]} điểm "
+                             f"với {step[1]:.2f} km nữa")
+        self.ui.show_limit_preview(text)
+    
+    def cancel_solve(self):
+        """Dừng tìm đường, giữ lại lộ trình tốt nhất tìm được"""
+        if self._solver_monitor is not None:
+            self._solver_monitor.cancel()
+            self.ui.progress_label.config(text=" Đang hủy...")
+    
+    def _abort_solve(self):
+        """Hủy lần tìm đang chạy và bỏ qua kết quả của nó"""
+        if self._solver_monitor is None:
+            return
+        self._solver_monitor.cancel()
+        self._solver_monitor = None
+        self._solve_generation += 1
+        self.ui.set_solving(False)
+    
+    def on_close(self):
+        """Đóng cửa sổ: dừng luồng tìm đường trước"""
+        self._abort_solve()
+        self.path_finder.close()
+        self.root.destroy()
+    
     def _show_remove_mandatory_dialog(self):
         """Hiển thị dialog để chọn điểm bắt buộc cần bỏ"""
         from tkinter import Toplevel, Checkbutton, BooleanVar
@@ -263,6 +542,7 @@ class HanoiTourismApp:
             # Cập nhật UI
             self.ui.update_stats(self.selected_locations, self.start_location,
                                self.mandatory_locations)
+            self.update_limit_preview()
             self.map_renderer.draw_map(self.selected_locations, self.path_result, 
                                        self.start_location, self.mandatory_locations)
             self.ui.create_location_list(self.selected_locations, 
@@ -286,6 +566,8 @@ class HanoiTourismApp:
     
     def reset_selection(self):
         """Đặt lại toàn bộ lựa chọn"""
+        self._abort_solve()
+        
         if (not self.selected_locations and not self.path_result and 
             not self.start_location and not self.mandatory_locations):
             messagebox.showinfo("Thông Báo", "Không có gì để đặt lại!")
@@ -301,6 +583,7 @@ class HanoiTourismApp:
         self.on_district_change()
         self.ui.update_stats(self.selected_locations, self.start_location,
                            self.mandatory_locations)
+        self.update_limit_preview()
         self.map_renderer.draw_map(self.selected_locations, self.path_result,
                                    self.start_location, self.mandatory_locations)
         self.ui.reset_result_display()
@@ -3,6 +3,12 @@ Module vẽ và hiển thị bản đồ
 """
 import tkinter as tk
 
+from spatial_index import SpatialIndex
+
+
+# Bán kính (pixel) quanh tâm node được tính là click vào node
+NODE_CLICK_RADIUS = 40
+
 
 class MapRenderer:
     """Class xử lý việc vẽ bản đồ"""
@@ -24,12 +30,18 @@ class MapRenderer:
         
         # Callback khi click vào location
         self.on_location_click = None
+        # Callback khi click chuột phải lên bản đồ: on_nearby_request(x, y)
+        self.on_nearby_request = None
         
         # Bind click event
         self.canvas.bind("<Button-1>", self._handle_click)
+        self.canvas.bind("<Button-3>", self._handle_right_click)
         
         # Lưu vị trí các nodes để detect click
         self.node_positions = {}
+        # Chỉ mục không gian của node_positions, dựng lại sau khi vẽ nếu vị
+        # trí các node thay đổi (không dựng trong lúc xử lý click)
+        self._node_index = SpatialIndex({})
     
     def _handle_click(self, event):
         """
@@ -38,23 +50,17 @@ class MapRenderer:
         Args:
             event: Tkinter event object
         """
-        # Tìm node gần nhất với vị trí click
-        click_x, click_y = event.x, event.y
-        clicked_node = None
-        min_distance = float('inf')
-        
-        for loc_id, (x, y) in self.node_positions.items():
-            # Tính khoảng cách từ click đến tâm node
-            distance = ((click_x - x) ** 2 + (click_y - y) ** 2) ** 0.5
-            
-            # Nếu click trong vòng bán kính 40px của node
-            if distance <= 40 and distance < min_distance:
-                min_distance = distance
-                clicked_node = loc_id
+        # Tìm node gần nhất với vị trí click trong vòng NODE_CLICK_RADIUS
+        clicked = self._node_index.nearest(event.x, event.y, NODE_CLICK_RADIUS)
         
         # Gọi callback nếu có
-        if clicked_node and self.on_location_click:
-            self.on_location_click(clicked_node)
+        if clicked and self.on_location_click:
+            self.on_location_click(clicked[0])
+    
+    def _handle_right_click(self, event):
+        """Click chuột phải: hỏi các địa điểm gần vị trí click"""
+        if self.on_nearby_request:
+            self.on_nearby_request(event.x, event.y)
     
     def draw_map(self, selected_locations, path_result=None, start_location=None,
                  mandatory_locations=None):
@@ -63,14 +69,17 @@ class MapRenderer:
             mandatory_locations = []
         
         self.canvas.delete("all")
-        self.node_positions.clear()
+        previous_positions = self.node_positions
+        self.node_positions = {}
         
         if not selected_locations:
+            self._update_node_index(previous_positions)
             # Hiển thị hướng dẫn
             self.canvas.create_text(350, 250,
                                    text="📍 Vui lòng chọn địa điểm từ danh sách\n\n"
                                         "💡 Click điểm đầu tiên = Điểm bắt đầu\n"
-                                        "   Click các điểm khác = Điểm BẮT BUỘC",
+                                        "   Click các điểm khác = Điểm BẮT BUỘC\n"
+                                        "   Chuột phải = Địa điểm gần đó",
                                    font=("Arial", 14), fill="#6b7280",
                                    justify=tk.CENTER)
             return
@@ -100,6 +109,12 @@ class MapRenderer:
         self.draw_locations(nodes_to_display, selected_locations, 
                           intermediate_nodes, path_result, start_location,
                           mandatory_locations, exceeded_nodes)
+        self._update_node_index(previous_positions)
+    
+    def _update_node_index(self, previous_positions):
+        """Dựng lại chỉ mục không gian nếu vị trí các node khác lần vẽ trước"""
+        if self.node_positions != previous_positions:
+            self._node_index = SpatialIndex(self.node_positions)
     
     def draw_edges(self, nodes_to_display):
         """
@@ -0,0 +1,231 @@
+"""
+Module chứa bộ giải chính xác chạy song song trên nhiều tiến trình
+
+Cây tìm kiếm của branch_and_bound được chia theo bước đầu tiên (điểm ngay sau
+điểm bắt đầu, hoặc chính điểm đầu khi không cố định điểm bắt đầu). Mỗi phần
+chạy trong một tiến trình của ProcessPoolExecutor; các tiến trình công bố lời
+giải tốt nhất của mình vào một vùng shared memory nhỏ để các phần khác dùng
+làm cận cắt nhánh.
+"""
+import os
+from concurrent.futures import FIRST_COMPLETED, wait
+from multiprocessing import shared_memory
+
+from tsp_solvers import (INF, SHARED_REFRESH, SearchCancelled, branch_and_bound,
+                         greedy_orienteering)
+
+
+# Bố cục vùng nhớ chung (float64): [cờ hủy, rồi mỗi phần 3 ô:
+# số điểm tùy chọn, quãng đường, số nút đã duyệt]
+_HEADER = 1
+_SLOT = 3
+
+# Khoảng thời gian (giây) giữa 2 lần cập nhật tiến độ / kiểm tra hủy
+POLL_INTERVAL = 0.1
+
+
+def default_workers():
+    """Số tiến trình mặc định: số lõi CPU"""
+    return os.cpu_count() or 1
+
+
+class SharedBound:
+    """
+    Cận dùng chung giữa các tiến trình, đọc / ghi qua shared memory
+
+    Mỗi phần chỉ ghi vào ô của mình nên không cần khóa. Khi ghi, quãng đường
+    được đặt INF trước rồi mới ghi số điểm và quãng đường mới, nên bên đọc
+    không bao giờ thấy một cận chặt hơn thực tế.
+    """
+
+    def __init__(self, name, slot, slots, create=False):
+        """
+        Mở vùng nhớ chung
+
+        Args:
+            name: Tên vùng shared memory (None khi tạo mới)
+            slot: Ô của tiến trình này (-1 = chỉ đọc, dùng ở tiến trình chính)
+            slots: Tổng số ô
+            create: Tạo mới vùng nhớ (ở tiến trình chính)
+        """
+        size = (_HEADER + _SLOT * slots) * 8
+        if create:
+            self.memory = shared_memory.SharedMemory(create=True, size=size)
+        else:
+            self.memory = shared_memory.SharedMemory(name=name)
+        self.name = self.memory.name
+        self.values = self.memory.buf.cast('d')
+        self.slot = slot
+        self.slots = slots
+        if create:
+            self.values[0] = 0
+            for i in range(slots):
+                self._write(i, -1, INF)
+
+    def _write(self, slot, count, distance):
+        base = _HEADER + _SLOT * slot
+        self.values[base + 1] = INF
+        self.values[base] = count
+        self.values[base + 1] = distance
+
+    def best(self):
+        """
+        Lời giải tốt nhất đã công bố (số điểm tùy chọn nhiều nhất, rồi ngắn nhất)
+
+        Raises:
+            SearchCancelled: Nếu tiến trình chính đã yêu cầu hủy
+        """
+        values = self.values
+        if values[0]:
+            raise SearchCancelled()
+        if self.slot >= 0:
+            values[_HEADER + _SLOT * self.slot + 2] += 1
+        best = (-1, INF)
+        for i in range(self.slots):
+            base = _HEADER + _SLOT * i
+            count, distance = int(values[base]), values[base + 1]
+            if (count, -distance) > (best[0], -best[1]):
+                best = (count, distance)
+        return best
+
+    def offer(self, count, distance):
+        """Công bố lời giải của tiến trình này nếu tốt hơn lời giải đã công bố"""
+        base = _HEADER + _SLOT * self.slot
+        if (count, -distance) > (int(self.values[base]), -self.values[base + 1]):
+            self._write(self.slot, count, distance)
+
+    def evaluated(self):
+        """Số nút đã duyệt (xấp xỉ) của mọi phần"""
+        return SHARED_REFRESH * sum(int(self.values[_HEADER + _SLOT * i + 2])
+                                    for i in range(self.slots))
+
+    def cancel(self):
+        """Yêu cầu mọi phần dừng lại"""
+        self.values[0] = 1
+
+    def close(self, unlink=False):
+        """Đóng (và giải phóng nếu là tiến trình chính) vùng nhớ"""
+        self.values.release()
+        self.memory.close()
+        if unlink:
+            self.memory.unlink()
+
+
+def _solve_branch(problem, first_hops, name, slot, slots, incumbent):
+    """Chạy trong tiến trình con: nhánh cận trên một phần cây tìm kiếm"""
+    shared = SharedBound(name, slot, slots)
+    try:
+        return branch_and_bound(problem, first_hops=first_hops, shared=shared,
+                                incumbent=incumbent)
+    finally:
+        shared.close()
+
+
+def _better(problem, first, second):
+    """Lộ trình first tốt hơn second (nhiều điểm tùy chọn hơn, rồi ngắn hơn)"""
+    optional = set(problem.optional)
+    return ((sum(1 for node in first[0] if node in optional), -first[1])
+            > (sum(1 for node in second[0] if node in optional), -second[1]))
+
+
+def split_first_hops(problem):
+    """
+    Chia cây tìm kiếm theo bước đầu tiên, điểm gần điểm bắt đầu trước
+
+    Returns:
+        list: Mỗi phần tử là tập bước đầu của một phần
+    """
+    dist = problem.dist
+    if problem.start is None:
+        return [{node} for node in range(problem.size)]
+    row = dist[problem.start]
+    hops = sorted((node for node in range(problem.size)
+                   if node != problem.start and row[node] < INF),
+                  key=row.__getitem__)
+    return [{node} for node in hops]
+
+
+def parallel_branch_and_bound(problem, executor, monitor=None, incumbent=None):
+    """
+    Nhánh cận chính xác chạy song song, chia theo bước đầu tiên
+
+    Mỗi phần trả về lời giải tốt nhất trong phần của mình (cận chung chỉ cắt
+    các nhánh kém hẳn), rồi các kết quả được gộp theo thứ tự cố định của các
+    phần, nên kết quả không phụ thuộc tiến trình nào chạy xong trước và cùng
+    (số điểm, quãng đường) với bộ giải tuần tự.
+
+    Args:
+        problem: TourProblem
+        executor: ProcessPoolExecutor dùng để chạy các phần
+        monitor: SearchMonitor (tùy chọn); khi bị hủy trả về lời giải tốt
+                 nhất đã tìm được
+        incumbent: (order, distance) lộ trình hợp lệ đã biết, làm cận chung ban đầu
+
+    Returns:
+        tuple: (order, distance) hoặc ([], INF) nếu không có lộ trình hợp lệ
+    """
+    if problem.start is not None and problem.size == 1:
+        return [problem.start], 0
+
+    branches = split_first_hops(problem)
+    if not branches:
+        return [], INF
+
+    # Lời giải ban đầu tính một lần ở đây làm cận chung cho mọi phần
+    initial = greedy_orienteering(problem)
+    if initial[0] and (incumbent is None or not incumbent[0]
+                       or _better(problem, initial, incumbent)):
+        incumbent = initial
+
+    slots = len(branches)
+    shared = SharedBound(None, -1, slots, create=True)
+    evaluated = monitor.evaluated if monitor is not None else 0
+    cancelled = False
+    try:
+        # Đã bị hủy từ trước: các phần dừng ngay và trả về lời giải ban đầu
+        if monitor is not None:
+            try:
+                monitor.poll()
+            except SearchCancelled:
+                cancelled = True
+                shared.cancel()
+        futures = [executor.submit(_solve_branch, problem, hops, shared.name,
+                                   slot, slots, incumbent)
+                   for slot, hops in enumerate(branches)]
+        pending = set(futures)
+        while pending:
+            _, pending = wait(pending, timeout=POLL_INTERVAL,
+                              return_when=FIRST_COMPLETED)
+            if monitor is not None and not cancelled:
+                monitor.evaluated = evaluated + shared.evaluated()
+                count, distance = shared.best()
+                if count >= 0:
+                    monitor.set_best(distance)
+                try:
+                    monitor.poll()
+                except SearchCancelled:
+                    cancelled = True
+                    shared.cancel()
+
+        # Gộp theo thứ tự các phần: hòa thì phần đứng trước thắng
+        optional = set(problem.optional)
+        best_order, best_distance, best_count = [], INF, -1
+        for future in futures:
+            try:
+                order, distance = future.result()
+            except SearchCancelled:
+                continue
+            if not order:
+                continue
+            count = sum(1 for node in order if node in optional)
+            if (count, -distance) > (best_count, -best_distance):
+                best_order, best_distance, best_count = order, distance, count
+    finally:
+        shared.close(unlink=True)
+
+    # Bị hủy trước khi phần nào trả về lời giải: lời giải ban đầu
+    if not best_order and incumbent is not None and incumbent[0]:
+        best_order, best_distance = list(incumbent[0]), incumbent[1]
+    if monitor is not None and best_order:
+        monitor.set_best(best_distance)
+    return best_order, best_distance
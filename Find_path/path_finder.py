@@ -1,81 +1,830 @@
 """
 Module chứa các thuật toán tìm đường tối ưu
 """
-from itertools import permutations
+import logging
+import os
+import time
+from contextlib import nullcontext
+from heapq import heappop, heappush
+from math import hypot
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from itertools import combinations, permutations
+
+from contraction import ContractionHierarchy, HierarchyTable, graph_fingerprint
+from graph import CompactGraph
+from parallel_search import parallel_branch_and_bound
+from route_cache import RouteCache
+from solve_stats import SolveStats
+from table_file import MappedPathTable, save_table
+from tsp_solvers import (INF, SearchCancelled, SearchMonitor, TourProblem,
+                         coverage_frontier, nearest_neighbour_order,
+                         path_length, permutation_search,
+                         shortest_covering_path, solve, spanning_tree_weight,
+                         warm_start)
+
+
+logger = logging.getLogger(__name__)
+
+
+# Các bộ giải hỗ trợ bởi find_shortest_path_tsp
+# "auto": heuristic khi quá nhiều điểm, nhánh cận khi giới hạn km chặt (xem
+#         BRANCH_AND_BOUND_MAX_RATIO), Held-Karp trong các trường hợp còn lại;
+#         nhánh cận song song thay cho nhánh cận khi PathFinder có nhiều tiến
+#         trình và đủ nhiều điểm (xem PARALLEL_MIN_STOPS)
+ENGINES = ("auto", "held_karp", "branch_and_bound", "parallel", "heuristic",
+           "brute_force", "dfs")
+
+# Các bộ giải duyệt hoán vị trực tiếp trên ID địa điểm (không qua
+# tsp_solvers.solve): "brute_force" là thuật toán gốc, "dfs" cho kết quả giống
+# hệt nhưng tìm theo chiều sâu có cắt nhánh
+PERMUTATION_ENGINES = ("brute_force", "dfs")
+
+# Các bộ giải dùng được với prepare_query / solve_batch: "parallel" tự chia một
+# truy vấn cho các tiến trình của PathFinder nên không giải được như một bài
+# riêng trên luồng / tiến trình khác
+BATCH_ENGINES = tuple(engine for engine in ENGINES if engine != "parallel")
+
+# Số điểm tối đa "auto" còn giải chính xác (kể cả điểm bắt đầu): Held-Karp
+# không cắt tỉa được gì mất khoảng 0.3 giây với 16 điểm và gấp đôi mỗi điểm
+# thêm (1.3 giây với 18, khoảng 6 giây với 20)
+MAX_EXACT_STOPS = 16
+
+# "auto" chỉ chọn nhánh cận khi giới hạn km nhỏ hơn tỉ lệ này nhân với lộ
+# trình láng giềng gần nhất qua mọi điểm. Đo trên điểm ngẫu nhiên, 14-18
+# điểm: với 0.5 lần nhánh cận nhanh hơn Held-Karp 2-3.5 lần, hai bên ngang
+# nhau quanh 0.7-0.75 lần, với 0.9 lần nhánh cận chậm hơn 2.5-3 lần
+BRANCH_AND_BOUND_MAX_RATIO = 0.6
+
+# Số điểm tối đa (kể cả điểm bắt đầu) để tính biên Pareto của một lựa chọn:
+# Held-Karp trên mọi tập con, khoảng 0.1 giây với 15 điểm và gấp đôi mỗi điểm
+FRONTIER_MAX_STOPS = 15
+
+# Khởi động ấm khi truy vấn chỉ khác lần giải trước một điểm:
+# "off": không dùng; "seed": lộ trình ấm làm cận trên cho bộ giải chính xác
+# (kết quả vẫn tối ưu); "local": trả luôn lộ trình ấm sau khi cải thiện cục bộ
+WARM_START_MODES = ("off", "seed", "local")
+
+# Số điểm tối thiểu để "auto" chạy nhánh cận song song (chỉ khi đã chọn nhánh
+# cận, không giới hạn km thì Held-Karp nhanh hơn nhiều). Đo trên điểm ngẫu
+# nhiên với giới hạn 0.3-0.5 lần lộ trình qua mọi điểm: từ 12 điểm tổng thời
+# gian CPU của các phần đã không quá nhánh cận tuần tự (12 điểm 3-4 so với
+# 5 ms, 16 điểm 5-18 so với 17-27 ms), dưới 10 điểm thì gấp 1.5-4 lần
+PARALLEL_MIN_STOPS = 12
+
+# Các cách tìm đường giữa 2 điểm của PathFinder.dijkstra:
+# "dijkstra": Dijkstra một chiều; "astar": A* với heuristic lớn nhất của
+# đường chim bay theo tọa độ bản đồ và cận dưới qua các điểm mốc (xem
+# LANDMARK_COUNT; chuyển sang "bidirectional" nếu không có cả hai);
+# "bidirectional": Dijkstra 2 chiều, không cần tọa độ; "ch": truy vấn trên
+# contraction hierarchy (dựng khi cần, xem get_contraction_hierarchy)
+POINT_TO_POINT_METHODS = ("dijkstra", "astar", "bidirectional", "ch")
+
+# Số điểm mốc cho heuristic của "astar" (CompactGraph.landmark_distances),
+# dựng một lần cho đồ thị của build_graph. Chỉ đường chim bay thì trên lưới đều
+# A* chốt gần hết các điểm như Dijkstra mà mỗi bước tốn hơn. Đo với 8 mốc:
+# lưới 70x70 0.4 so với 3.4 ms, thành phố ngẫu nhiên 10000 điểm 1.7 so với
+# 8.2 ms; dựng mốc 60-150 ms
+LANDMARK_COUNT = 8
+
+
+def dijkstra_tree(graph, source, target=None):
+    """
+    Dijkstra một nguồn dùng binary heap, O((V + E) log V)
+    
+    Args:
+        graph: Đồ thị dạng adjacency list
+        source: Điểm nguồn
+        target: Nếu có, dừng ngay khi điểm này được chốt khoảng cách
+        
+    Returns:
+        tuple: (distances, previous) - chỉ chứa các điểm đã tới được;
+               khi dừng sớm, chỉ giá trị của các điểm đã chốt (trong đó có
+               target) là cuối cùng
+    """
+    distances = {source: 0}
+    previous = {source: None}
+    settled = set()
+    heap = [(0, source)]
+    
+    while heap:
+        distance, current = heappop(heap)
+        if current in settled:
+            continue
+        settled.add(current)
+        
+        if current == target:
+            break
+        
+        for neighbor, weight in graph[current]:
+            candidate = distance + weight
+            if candidate < distances.get(neighbor, INF):
+                distances[neighbor] = candidate
+                previous[neighbor] = current
+                heappush(heap, (candidate, neighbor))
+    
+    return distances, previous
+
+
+def timed_solve(problem, engine, time_budget=None):
+    """
+    tsp_solvers.solve kèm thời gian giải, đo ngay tại tiến trình chạy nó
+    (không tính thời gian chờ trong hàng đợi của executor)
+    
+    Returns:
+        tuple: (kết quả của solve, số giây)
+    """
+    started = time.perf_counter()
+    result = solve(problem, engine, time_budget)
+    return result, time.perf_counter() - started
+
+
+class ShortestPathTable:
+    """Bảng khoảng cách ngắn nhất và bước đi kế tiếp giữa mọi cặp địa điểm"""
+    
+    def __init__(self, ids, dist, successor):
+        """
+        Khởi tạo bảng
+        
+        Args:
+            ids: Danh sách ID địa điểm, vị trí trong list là chỉ số
+            dist: Ma trận khoảng cách ngắn nhất (INF nếu không tới được)
+            successor: successor[i][j] = chỉ số điểm kế tiếp trên đường từ i đến j
+                       (-1 nếu không tới được)
+        """
+        self.ids = ids
+        self.index = {loc_id: i for i, loc_id in enumerate(ids)}
+        self.dist = dist
+        self.successor = successor
+    
+    @classmethod
+    def from_graph(cls, graph):
+        """
+        Tính bảng bằng Dijkstra từ từng nguồn
+        
+        Hàng i của dist lấy từ Dijkstra với nguồn i, nên dist[i][j] được cộng
+        theo chiều i -> j như khi tìm từng đoạn i -> j (giống từng bit). Đồ
+        thị vô hướng nên cùng cây đó cho luôn bước kế tiếp từ mọi điểm i về
+        j: successor[i][j] = previous_j[i].
+        
+        Args:
+            graph: CompactGraph (chạy trực tiếp trên chỉ số) hoặc adjacency list
+        """
+        if isinstance(graph, CompactGraph):
+            return cls._from_compact_graph(graph)
+        
+        ids = list(graph.keys())
+        index = {loc_id: i for i, loc_id in enumerate(ids)}
+        n = len(ids)
+        
+        dist = [[INF] * n for _ in range(n)]
+        successor = [[-1] * n for _ in range(n)]
+        for j, source in enumerate(ids):
+            distances, previous = dijkstra_tree(graph, source)
+            row = dist[j]
+            for loc_id, distance in distances.items():
+                i = index[loc_id]
+                row[i] = distance
+                parent = previous[loc_id]
+                successor[i][j] = i if parent is None else index[parent]
+        
+        return cls(ids, dist, successor)
+    
+    @classmethod
+    def from_dense(cls, dense):
+        """
+        Tính bảng bằng Floyd-Warshall vector hóa trên DenseDistanceMatrix (NumPy)
+        
+        Args:
+            dense: DenseDistanceMatrix
+        """
+        dist, successor = dense.floyd_warshall()
+        return cls(list(dense.ids), dist.tolist(), successor.tolist())
+    
+    @classmethod
+    def _from_compact_graph(cls, graph):
+        """Như from_graph nhưng Dijkstra chạy trên chỉ số của CompactGraph"""
+        n = len(graph)
+        dist = [None] * n
+        successor = [[-1] * n for _ in range(n)]
+        for j in range(n):
+            distances, previous = graph.shortest_path_tree(j)
+            dist[j] = distances
+            for i, distance in enumerate(distances):
+                if distance < INF:
+                    parent = previous[i]
+                    successor[i][j] = i if parent == -1 else parent
+        
+        return cls(list(graph.ids), dist, successor)
+    
+    def distance(self, loc1, loc2):
+        """Khoảng cách ngắn nhất giữa 2 địa điểm (INF nếu không tới được)"""
+        return self.dist[self.index[loc1]][self.index[loc2]]
+    
+    def path(self, loc1, loc2):
+        """
+        Dựng lại đường đi ngắn nhất theo bảng bước kế tiếp, O(độ dài đường đi)
+        
+        Returns:
+            list: Các địa điểm trên đường đi ([] nếu không tới được)
+        """
+        i, j = self.index[loc1], self.index[loc2]
+        if self.successor[i][j] == -1:
+            return []
+        path = [self.ids[i]]
+        while i != j:
+            i = self.successor[i][j]
+            path.append(self.ids[i])
+        return path
+    
+    def submatrix(self, stops):
+        """Ma trận khoảng cách giữa các điểm trong stops (theo thứ tự stops)"""
+        rows = [self.dist[self.index[loc]] for loc in stops]
+        columns = [self.index[loc] for loc in stops]
+        return [[row[j] for j in columns] for row in rows]
+
+
+class PreparedQuery:
+    """Truy vấn đã chuẩn bị bởi PathFinder.prepare_query, chờ giải hoặc đã xong"""
+    
+    def __init__(self, key, version, selected_locations, optional_locations,
+                 time_budget=None):
+        self.key = key
+        self.version = version
+        self.selected_locations = selected_locations
+        self.optional_locations = optional_locations
+        self.time_budget = time_budget
+        self.engine = None
+        self.stops = None  # stops[i] là ID của chỉ số i trong problem
+        self.problem = None  # TourProblem cần giải (None nếu đã xong)
+        self.cached = False
+        self.cancelled = False
+        self.path = None
+        self.distance = None
+        self.visited = None
+    
+    @property
+    def done(self):
+        """Đã có kết quả"""
+        return self.path is not None
+
+
+class RoutePlan:
+    """Kết quả của PathFinder.plan_route"""
+    
+    def __init__(self, path, total_distance, exceeded_locations, feasible,
+                 mandatory_distance, mandatory_order):
+        """
+        Args:
+            path: Đường đi đầy đủ ([] nếu không có lộ trình)
+            total_distance: Tổng quãng đường
+            exceeded_locations: Các điểm bị bỏ qua do vượt giới hạn km
+            feasible: Đi hết các điểm bắt buộc (từ điểm bắt đầu) được trong
+                      giới hạn km
+            mandatory_distance: Quãng đường ngắn nhất chỉ qua các điểm bắt buộc
+                                (cận dưới nếu mandatory_order rỗng)
+            mandatory_order: Thứ tự đi của lộ trình chỉ qua điểm bắt buộc
+        """
+        self.path = path
+        self.total_distance = total_distance
+        self.exceeded_locations = exceeded_locations
+        self.feasible = feasible
+        self.mandatory_distance = mandatory_distance
+        self.mandatory_order = mandatory_order
+
+
+class CoverageFrontier:
+    """
+    Biên Pareto (số điểm tùy chọn đi được, quãng đường ngắn nhất) của một lựa
+    chọn, từ PathFinder.get_coverage_frontier
+    
+    Lời giải với giới hạn km bất kỳ (nhiều điểm tùy chọn nhất, rồi ngắn nhất)
+    là điểm cuối cùng của biên nằm trong giới hạn nên chỉ cần tra cứu.
+    """
+    
+    def __init__(self, selected_locations, optional_locations, points,
+                 complete=True):
+        """
+        Args:
+            selected_locations: Các địa điểm đã chọn
+            optional_locations: Các điểm tùy chọn trong số đó
+            points: Các bộ (số điểm tùy chọn, quãng đường, path, visited) theo
+                    số điểm và quãng đường tăng dần
+            complete: False nếu biên chỉ từ phần đã tính trước khi bị hủy
+                      (các lộ trình hợp lệ nhưng chưa chắc tối ưu)
+        """
+        self.selected_locations = list(selected_locations)
+        self.optional_locations = list(optional_locations)
+        self.points = points
+        self.complete = complete
+    
+    @property
+    def min_distance(self):
+        """Quãng đường ngắn nhất đi hết các điểm bắt buộc (INF nếu không có)"""
+        return self.points[0][1] if self.points else INF
+    
+    def best(self, limit_km=None):
+        """
+        Vị trí trên biên của lời giải với giới hạn km
+        
+        Returns:
+            int hoặc None nếu không đi hết được các điểm bắt buộc
+        """
+        if not self.points:
+            return None
+        if not limit_km:
+            return len(self.points) - 1
+        index = None
+        for i, point in enumerate(self.points):
+            if point[1] > limit_km:
+                break
+            index = i
+        return index
+    
+    def route(self, limit_km=None):
+        """
+        Lời giải với giới hạn km
+        
+        Returns:
+            tuple: (path, total_distance, exceeded_locations) như
+                   find_shortest_path_tsp
+        """
+        index = self.best(limit_km)
+        if index is None:
+            return [], INF, list(self.optional_locations)
+        _, distance, path, visited = self.points[index]
+        return (list(path), distance,
+                [loc for loc in self.selected_locations if loc not in visited])
+    
+    def next_step(self, limit_km):
+        """
+        Bước tiếp theo trên biên khi nới giới hạn km
+        
+        Returns:
+            tuple: (số điểm tùy chọn đi thêm được, số km cần thêm) hoặc None
+                   nếu đã đi được hết, không giới hạn hoặc chưa đi hết được
+                   các điểm bắt buộc (xem min_distance)
+        """
+        index = self.best(limit_km)
+        if not limit_km or index is None or index + 1 == len(self.points):
+            return None
+        count = self.points[index][0]
+        next_count, next_distance = self.points[index + 1][:2]
+        return next_count - count, next_distance - limit_km
 
 
 class PathFinder:
     """Class xử lý các thuật toán tìm đường"""
     
-    def __init__(self, location_data, distance_matrix):
+    def __init__(self, location_data, distance_matrix, route_cache_size=128,
+                 workers=1, track_memory=False, use_hierarchy=False,
+                 hierarchy_file=None, table_file=None):
         """
         Khởi tạo PathFinder
         
         Args:
             location_data: Instance của LocationData
             distance_matrix: Instance của DistanceMatrix
+            route_cache_size: Số kết quả tìm đường được lưu đệm (0 = tắt)
+            workers: Số tiến trình cho bộ giải song song (1 = chỉ chạy tuần tự)
+            track_memory: Đo bộ nhớ đỉnh của mỗi lần giải bằng tracemalloc
+                          (làm chậm bộ giải, chỉ nên bật khi cần tìm nguyên nhân)
+            use_hierarchy: Tính khoảng cách / đường đi giữa các điểm được chọn
+                           trên contraction hierarchy thay vì bảng mọi cặp
+                           (dành cho đồ thị đường phố hàng chục nghìn nút)
+            hierarchy_file: File lưu contraction hierarchy giữa các lần chạy
+                            (dựng lại khi dữ liệu khác với lúc lưu)
+            table_file: File lưu bảng đường đi ngắn nhất giữa các lần chạy, mở
+                        bằng mmap nên không phải tính / đọc lại (tính lại khi
+                        dữ liệu khác với lúc lưu; xem table_file)
         """
         self.location_data = location_data
         self.distance_matrix = distance_matrix
+        self.workers = workers
+        self.track_memory = track_memory
+        self.use_hierarchy = use_hierarchy
+        self.hierarchy_file = hierarchy_file
+        self.table_file = table_file
+        self._executor = None
+        
+        # Bộ nhớ đệm theo phiên bản dữ liệu
+        self._graph = None
+        self._graph_version = None
+        self._table = None
+        self._table_version = None
+        self._coordinates = None
+        self._coordinates_version = None
+        self._landmarks = None
+        self._landmarks_version = None
+        self._hierarchy = None
+        self._hierarchy_version = None
+        
+        # Kết quả find_shortest_path_tsp theo truy vấn chuẩn hóa
+        self.route_cache = RouteCache(route_cache_size)
+        
+        # Lời giải lần trước, dùng để khởi động ấm khi chỉ thêm / bỏ một điểm
+        self._last_solution = None
+        
+        # Thông tin lần giải gần nhất: engine, lower_bound, gap, optimal,
+        # cancelled, cached, warm_start
+        self.last_solve_info = {}
+        # Thông tin lần gọi solve_batch gần nhất: queries, unique, cache_hits,
+        # elapsed ({query_index: số giây chuẩn bị + giải của truy vấn đó})
+        self.last_batch_info = {}
+        
+        # Bộ đếm toàn cục; SolveStats của mỗi lần giải lấy phần chênh lệch
+        self.counters = {"dijkstra_calls": 0, "table_cache_hits": 0}
+        # SolveStats của lần find_shortest_path_tsp / check_mandatory_feasibility
+        # / plan_route / get_coverage_frontier gần nhất và các hàm nhận
+        # SolveStats sau mỗi lần giải
+        self.last_stats = None
+        self._stats_hooks = []
+    
+    def add_stats_hook(self, hook):
+        """
+        Đăng ký hàm hook(stats) được gọi với SolveStats sau mỗi lần
+        find_shortest_path_tsp / check_mandatory_feasibility / plan_route /
+        get_coverage_frontier
+        
+        Hook chạy trên luồng đang giải (luồng tìm đường của app, không phải
+        luồng giao diện); lỗi trong hook được ghi log và không làm hỏng kết quả.
+        """
+        self._stats_hooks.append(hook)
+    
+    def remove_stats_hook(self, hook):
+        """Hủy đăng ký một hook đã thêm bằng add_stats_hook"""
+        if hook in self._stats_hooks:
+            self._stats_hooks.remove(hook)
+    
+    def _collect_stats(self, kind, monitor, run):
+        """
+        Chạy run(stats) và ghi số liệu vào SolveStats mới
+        
+        Bộ đếm của SearchMonitor và của PathFinder được lấy phần chênh lệch
+        nên monitor dùng chung cho nhiều lần giải vẫn cho số liệu đúng.
+        """
+        stats = SolveStats(kind, self.track_memory)
+        monitor_counters = dict(monitor.counters)
+        evaluated = monitor.evaluated
+        counters = dict(self.counters)
+        route_cache_hits = self.route_cache.hits
+        
+        stats.start()
+        try:
+            result = run(stats)
+        finally:
+            stats.stop()
+        
+        stats.add_counters({name: amount - monitor_counters.get(name, 0)
+                            for name, amount in monitor.counters.items()})
+        stats.add_counters({name: amount - counters[name]
+                            for name, amount in self.counters.items()})
+        stats.count("route_cache_hits", self.route_cache.hits - route_cache_hits)
+        stats.evaluated = monitor.evaluated - evaluated
+        
+        self.last_stats = stats
+        for hook in list(self._stats_hooks):
+            try:
+                hook(stats)
+            except Exception:
+                logger.exception("Lỗi trong hook số liệu bộ giải")
+        return result
+    
+    def get_executor(self):
+        """ProcessPoolExecutor dùng chung cho bộ giải song song (tạo khi cần)"""
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=max(1, self.workers))
+        return self._executor
+    
+    def close(self):
+        """Dừng các tiến trình của bộ giải song song"""
+        if self._executor is not None:
+            self._executor.shutdown(cancel_futures=True)
+            self._executor = None
+    
+    def _data_version(self):
+        """Phiên bản hiện tại của dữ liệu địa điểm và khoảng cách"""
+        return (self.location_data.version, self.distance_matrix.version)
     
     def build_graph(self):
-        """Xây dựng đồ thị từ TẤT CẢ các địa điểm"""
-        locations = self.location_data.get_all_locations()
-        graph = {loc_id: [] for loc_id in locations.keys()}
+        """
+        Xây dựng đồ thị từ TẤT CẢ các địa điểm (được lưu đệm theo phiên bản dữ liệu)
         
+        Returns:
+            CompactGraph: Đồ thị CSR; vẫn hỗ trợ graph[loc_id] và graph.keys()
+                          như adjacency list cũ
+        """
+        version = self._data_version()
+        if self._graph is None or self._graph_version != version:
+            self._graph = self._build_graph()
+            self._graph_version = version
+        return self._graph
+    
+    def _build_graph(self):
+        """Dựng đồ thị CSR từ dữ liệu hiện tại"""
+        locations = self.location_data.get_all_locations()
         distances = self.distance_matrix.get_all_distances()
-        for (loc1, loc2), distance in distances.items():
-            graph[loc1].append((loc2, distance))
-            graph[loc2].append((loc1, distance))
-        
-        return graph
+        return CompactGraph.from_edges(locations.keys(), distances)
     
-    def dijkstra(self, graph, start, end):
+    def dijkstra(self, graph, start, end, method="dijkstra"):
         """
-        Thuật toán Dijkstra tìm đường đi ngắn nhất
+        Tìm đường đi ngắn nhất giữa 2 điểm
+        
+        "astar" và "bidirectional" chỉ mở các điểm gần đường đi thay vì cả
+        vùng có bán kính bằng quãng đường, cho cùng kết quả với "dijkstra"
+        (nếu có nhiều đường cùng độ dài có thể trả về đường khác).
         
         Args:
-            graph: Đồ thị dạng adjacency list
+            graph: CompactGraph hoặc đồ thị dạng adjacency list
             start: Điểm bắt đầu
             end: Điểm kết thúc
+            method: Một trong POINT_TO_POINT_METHODS; adjacency list dạng dict
+                    luôn dùng "dijkstra"
             
         Returns:
             tuple: (path, distance) - đường đi và khoảng cách
         """
-        distances = {node: float('infinity') for node in graph}
-        distances[start] = 0
-        previous = {node: None for node in graph}
-        unvisited = set(graph.keys())
+        if method not in POINT_TO_POINT_METHODS:
+            raise ValueError(f"Phương pháp tìm đường không hợp lệ: {method}")
+        if method != "dijkstra" and isinstance(graph, CompactGraph):
+            return self._point_to_point(graph, start, end, method)
         
-        while unvisited:
-            current = min(unvisited, key=lambda node: distances[node])
-            
-            if current == end or distances[current] == float('infinity'):
-                break
-            
-            unvisited.remove(current)
-            
-            for neighbor, weight in graph[current]:
-                distance = distances[current] + weight
-                if distance < distances[neighbor]:
-                    distances[neighbor] = distance
-                    previous[neighbor] = current
+        distances, previous = self.shortest_path_tree(graph, start, end)
         
-        if distances[end] == float('infinity'):
+        if end not in distances:
             return [], None
         
         # Xây dựng đường đi
         path = []
         current = end
-        while current:
+        while current is not None:
             path.append(current)
             current = previous[current]
         path.reverse()
         
         return path, distances[end]
     
+    def _point_to_point(self, graph, start, end, method):
+        """A* / Dijkstra 2 chiều / CH trên CompactGraph, trả về như dijkstra"""
+        self.counters["dijkstra_calls"] += 1
+        if method == "ch":
+            if graph is self.build_graph():
+                hierarchy = self.get_contraction_hierarchy()
+            else:
+                hierarchy = ContractionHierarchy.build(graph)
+            path, distance = hierarchy.path(start, end)
+            return (path, distance) if path else ([], None)
+        
+        source, target = graph.index_of(start), graph.index_of(end)
+        heuristic = None
+        if method == "astar":
+            heuristic = self.astar_heuristic(graph, target)
+        if heuristic is None:
+            path, distance, _ = graph.bidirectional_dijkstra(source, target)
+        else:
+            path, distance, _ = graph.astar(source, target, heuristic)
+        
+        if not path:
+            return [], None
+        return [graph.ids[i] for i in path], distance
+    
+    def coordinate_heuristic(self, graph, target):
+        """
+        Heuristic đường chim bay tới target cho CompactGraph.astar
+        
+        Khoảng cách pixel trên bản đồ được đổi ra km bằng hệ số hiệu chỉnh từ
+        chính các cạnh (CompactGraph.admissible_scale) nên luôn là cận dưới.
+        
+        Args:
+            graph: CompactGraph
+            target: Chỉ số điểm đích
+            
+        Returns:
+            function: heuristic(i) -> km, hoặc None nếu có địa điểm thiếu tọa
+                      độ / hệ số bằng 0 (heuristic vô dụng)
+        """
+        coordinates = self._get_coordinates(graph)
+        if coordinates is None:
+            return None
+        xs, ys, scale = coordinates
+        if scale <= 0:
+            return None
+        target_x, target_y = xs[target], ys[target]
+        
+        def heuristic(i):
+            return scale * hypot(xs[i] - target_x, ys[i] - target_y)
+        return heuristic
+    
+    def astar_heuristic(self, graph, target):
+        """
+        Heuristic cho CompactGraph.astar: lớn nhất của đường chim bay
+        (coordinate_heuristic) và cận dưới qua các điểm mốc
+        
+        Các mốc chỉ có với đồ thị của build_graph (xem _get_landmarks).
+        
+        Args:
+            graph: CompactGraph
+            target: Chỉ số điểm đích
+            
+        Returns:
+            function: heuristic(i) -> km, hoặc None nếu không có cả tọa độ
+                      lẫn mốc
+        """
+        coordinate = self.coordinate_heuristic(graph, target)
+        landmarks = self._get_landmarks(graph)
+        pairs = [(distances, distances[target]) for distances in landmarks or ()
+                 if distances[target] < INF]
+        if not pairs:
+            return coordinate
+        
+        def heuristic(i):
+            best = coordinate(i) if coordinate is not None else 0.0
+            for distances, to_target in pairs:
+                estimate = abs(to_target - distances[i])
+                if estimate > best:
+                    best = estimate
+            return best
+        return heuristic
+    
+    def _get_landmarks(self, graph):
+        """
+        Khoảng cách từ LANDMARK_COUNT điểm mốc (lưu đệm theo phiên bản dữ liệu)
+        
+        Returns:
+            list: Như CompactGraph.landmark_distances, hoặc None nếu graph không
+                  phải đồ thị của build_graph (dựng mốc cho mỗi truy vấn thì
+                  chậm hơn Dijkstra)
+        """
+        version = self._data_version()
+        if graph is not self._graph or self._graph_version != version:
+            return None
+        if self._landmarks_version == version:
+            return self._landmarks
+        
+        self._landmarks = graph.landmark_distances(LANDMARK_COUNT)
+        self._landmarks_version = version
+        return self._landmarks
+    
+    def _get_coordinates(self, graph):
+        """
+        Tọa độ theo chỉ số của graph và hệ số km / pixel (lưu đệm theo phiên
+        bản dữ liệu cho đồ thị của build_graph)
+        
+        Returns:
+            tuple: (xs, ys, scale) hoặc None nếu có địa điểm thiếu tọa độ
+        """
+        version = self._data_version()
+        cached = graph is self._graph and self._graph_version == version
+        if cached and self._coordinates_version == version:
+            return self._coordinates
+        
+        xs, ys = [], []
+        coordinates = None
+        for loc_id in graph.ids:
+            location = self.location_data.get_location(loc_id) or {}
+            if location.get("x") is None or location.get("y") is None:
+                break
+            xs.append(location["x"])
+            ys.append(location["y"])
+        else:
+            coordinates = (xs, ys, graph.admissible_scale(xs, ys))
+        
+        if cached:
+            self._coordinates = coordinates
+            self._coordinates_version = version
+        return coordinates
+    
+    def get_contraction_hierarchy(self):
+        """
+        Lấy contraction hierarchy của đồ thị hiện tại
+        
+        Được lưu đệm theo phiên bản dữ liệu. Nếu có hierarchy_file thì đọc từ
+        file khi dấu vân tay đồ thị khớp, ngược lại dựng mới rồi ghi đè file.
+        
+        Returns:
+            ContractionHierarchy
+        """
+        version = self._data_version()
+        if self._hierarchy is not None and self._hierarchy_version == version:
+            return self._hierarchy
+        
+        graph = self.build_graph()
+        fingerprint = graph_fingerprint(graph)
+        hierarchy = None
+        if self.hierarchy_file and os.path.exists(self.hierarchy_file):
+            try:
+                hierarchy = ContractionHierarchy.load(self.hierarchy_file)
+            except (OSError, ValueError, EOFError):
+                logger.warning("Không đọc được file contraction hierarchy %s",
+                               self.hierarchy_file, exc_info=True)
+            if hierarchy is not None and hierarchy.fingerprint != fingerprint:
+                logger.info("File contraction hierarchy %s đã cũ, dựng lại",
+                            self.hierarchy_file)
+                hierarchy = None
+        
+        if hierarchy is None:
+            hierarchy = ContractionHierarchy.build(graph)
+            if self.hierarchy_file:
+                hierarchy.save(self.hierarchy_file)
+        
+        self._hierarchy = hierarchy
+        self._hierarchy_version = version
+        return hierarchy
+    
+    def shortest_path_tree(self, graph, source, target=None):
+        """
+        Cây đường đi ngắn nhất từ một nguồn (xem dijkstra_tree)
+        
+        Args:
+            graph: CompactGraph hoặc đồ thị dạng adjacency list
+            source: Điểm nguồn
+            target: Điểm đích để dừng sớm (None = tính toàn bộ cây)
+            
+        Returns:
+            tuple: (distances, previous) - dict theo ID, chỉ chứa các điểm tới được
+        """
+        self.counters["dijkstra_calls"] += 1
+        if not isinstance(graph, CompactGraph):
+            return dijkstra_tree(graph, source, target)
+        
+        ids = graph.ids
+        target_index = -1 if target is None else graph.index_of(target)
+        distance_list, previous_list = graph.shortest_path_tree(
+            graph.index_of(source), target_index)
+        
+        distances = {}
+        previous = {}
+        for i, distance in enumerate(distance_list):
+            if distance < INF:
+                distances[ids[i]] = distance
+                parent = previous_list[i]
+                previous[ids[i]] = None if parent == -1 else ids[parent]
+        return distances, previous
+    
+    def get_shortest_path_table(self):
+        """
+        Lấy bảng đường đi ngắn nhất giữa mọi cặp địa điểm
+        
+        Bảng chỉ được tính lại khi LocationData hoặc DistanceMatrix thay đổi.
+        Với DistanceMatrix backend "numpy" bảng được tính bằng Floyd-Warshall
+        vector hóa, còn lại bằng Dijkstra từ từng nguồn trên đồ thị CSR. Với
+        use_hierarchy bảng chỉ tính các cặp được hỏi trên contraction hierarchy.
+        Với table_file bảng được mở từ file (mmap) khi dấu vân tay đồ thị khớp,
+        ngược lại tính như trên rồi ghi đè file.
+        
+        Returns:
+            ShortestPathTable, MappedPathTable hoặc HierarchyTable
+        """
+        version = self._data_version()
+        if self._table is None or self._table_version != version:
+            if self.use_hierarchy:
+                self._table = HierarchyTable(self.get_contraction_hierarchy())
+            elif self.table_file:
+                self._table = self._load_table_file()
+            else:
+                self._table = self._compute_table()
+            self._table_version = version
+        else:
+            self.counters["table_cache_hits"] += 1
+        return self._table
+    
+    def _load_table_file(self):
+        """Mở bảng từ table_file nếu còn khớp dữ liệu, ngược lại tính và ghi lại"""
+        fingerprint = graph_fingerprint(self.build_graph())
+        if os.path.exists(self.table_file):
+            try:
+                table = MappedPathTable(self.table_file)
+            except (OSError, ValueError):
+                logger.warning("Không đọc được file bảng khoảng cách %s",
+                               self.table_file, exc_info=True)
+            else:
+                if table.fingerprint == fingerprint:
+                    return table
+                logger.info("File bảng khoảng cách %s đã cũ, tính lại",
+                            self.table_file)
+                table.close()
+        
+        table = self._compute_table()
+        try:
+            save_table(table, self.table_file, fingerprint)
+        except OSError:
+            logger.warning("Không ghi được file bảng khoảng cách %s",
+                           self.table_file, exc_info=True)
+        return table
+    
+    def _compute_table(self):
+        """Tính bảng đường đi ngắn nhất giữa mọi cặp địa điểm"""
+        if self.distance_matrix.backend == "numpy":
+            locations = self.location_data.get_all_locations()
+            return ShortestPathTable.from_dense(
+                self.distance_matrix.to_dense(locations.keys()))
+        graph = self.build_graph()
+        self.counters["dijkstra_calls"] += len(graph)
+        return ShortestPathTable.from_graph(graph)
+    
     def find_shortest_path_tsp(self, selected_locations, start_location=None, 
-                               mandatory_locations=None, limit_km=None):
+                               mandatory_locations=None, limit_km=None,
+                               engine="auto", time_budget=None, monitor=None,
+                               warm_start="seed"):
         """
         Giải bài toán TSP với điểm bắt buộc và giới hạn km
         
@@ -84,17 +833,522 @@ class PathFinder:
             start_location: Điểm bắt đầu cố định
             mandatory_locations: Danh sách điểm BẮT BUỘC phải đi qua
             limit_km: Giới hạn km (None = không giới hạn)
+            engine: Bộ giải - "auto" (mặc định), "held_karp", "branch_and_bound",
+                    "parallel" (nhánh cận trên nhiều tiến trình), "heuristic",
+                    "brute_force" (duyệt hoán vị) hoặc "dfs" (như brute_force
+                    nhưng cắt nhánh, kết quả giống hệt)
+            time_budget: Thời gian tối đa (giây) cho bộ giải heuristic
+            monitor: SearchMonitor để theo dõi tiến độ / hủy (khi bị hủy trả về
+                     lộ trình tốt nhất tìm được tới lúc đó)
+            warm_start: Chế độ khởi động ấm (xem WARM_START_MODES), chỉ dùng khi
+                        truy vấn khác lần giải trước đúng một điểm
             
         Returns:
             tuple: (path, total_distance, exceeded_locations) 
                    - exceeded_locations: danh sách điểm bị bỏ qua do vượt giới hạn km
+                   Số liệu của lần giải nằm ở self.last_stats (SolveStats)
+        """
+        if engine not in ENGINES:
+            raise ValueError(f"Bộ giải không hợp lệ: {engine}")
+        if warm_start not in WARM_START_MODES:
+            raise ValueError(f"Chế độ khởi động ấm không hợp lệ: {warm_start}")
+        
+        if monitor is None:
+            monitor = SearchMonitor()
+        return self._collect_stats("route", monitor, lambda stats: self._find_route(
+            selected_locations, start_location, mandatory_locations, limit_km,
+            engine, time_budget, monitor, warm_start, stats))
+    
+    def plan_route(self, selected_locations, start_location=None,
+                   mandatory_locations=None, limit_km=None, engine="auto",
+                   time_budget=None, monitor=None, warm_start="seed"):
+        """
+        Lập lộ trình và kết luận về các điểm bắt buộc trong một lần giải
+        
+        Thay cho check_mandatory_feasibility rồi find_shortest_path_tsp (giải
+        các điểm bắt buộc 2 lần): lộ trình ngắn nhất chỉ qua các điểm bắt buộc,
+        xuất phát từ điểm bắt đầu, được giải một lần trên bảng khoảng cách dùng
+        chung. Vượt giới hạn km thì dừng luôn; ngược lại nó là lời giải ban đầu
+        của lần tìm chính, và là kết quả luôn khi không có điểm tùy chọn. Lộ
+        trình này được lưu đệm riêng nên chỉ đổi điểm tùy chọn thì không phải
+        giải lại.
+        
+        Args:
+            Giống find_shortest_path_tsp
+            
+        Returns:
+            RoutePlan - số liệu của lần giải nằm ở self.last_stats (SolveStats)
+        """
+        if engine not in ENGINES:
+            raise ValueError(f"Bộ giải không hợp lệ: {engine}")
+        if warm_start not in WARM_START_MODES:
+            raise ValueError(f"Chế độ khởi động ấm không hợp lệ: {warm_start}")
+        
+        if monitor is None:
+            monitor = SearchMonitor()
+        return self._collect_stats("plan", monitor, lambda stats: self._plan_route(
+            selected_locations, start_location, mandatory_locations, limit_km,
+            engine, time_budget, monitor, warm_start, stats))
+    
+    def _plan_route(self, selected_locations, start_location, mandatory_locations,
+                    limit_km, engine, time_budget, monitor, warm_start, stats):
+        """Phần thân của plan_route, ghi số liệu vào stats"""
+        if not selected_locations:
+            return RoutePlan([], 0, [], True, 0, [])
+        
+        mandatory, optional_locations = self._split_query(
+            selected_locations, start_location, mandatory_locations)
+        with stats.phase("table"):
+            table = self.get_shortest_path_table()
+        with stats.phase("mandatory"):
+            feasible, mandatory_distance, mandatory_order, exact = \
+                self._mandatory_route(table, start_location, mandatory, limit_km,
+                                      monitor)
+        
+        if not feasible:
+            stats.engine = "held_karp" if mandatory_order else "spanning_tree"
+            self.last_solve_info = {
+                "engine": stats.engine,
+                "lower_bound": mandatory_distance,
+                "gap": 0.0,
+                "optimal": exact,
+                "cancelled": monitor.cancelled,
+                "cached": False,
+                "warm_start": False,
+                "visited": [],
+            }
+            return RoutePlan([], INF, list(optional_locations), False,
+                             mandatory_distance, mandatory_order)
+        
+        seed = (mandatory_order, mandatory_distance, exact) if mandatory_order else None
+        path, total_distance, exceeded_locations = self._find_route(
+            selected_locations, start_location, mandatory_locations, limit_km,
+            engine, time_budget, monitor, warm_start, stats, seed)
+        return RoutePlan(path, total_distance, exceeded_locations, True,
+                         mandatory_distance, mandatory_order)
+    
+    def _mandatory_route(self, table, start_location, mandatory_locations,
+                         limit_km, monitor):
+        """
+        Lộ trình ngắn nhất chỉ qua các điểm bắt buộc, xuất phát từ điểm bắt đầu
+        (lưu đệm theo điểm bắt đầu, tập điểm bắt buộc và giới hạn km)
+        
+        Returns:
+            tuple: (feasible, distance, order, exact) - khi cây khung nhỏ nhất
+                   đã vượt giới hạn: (False, cận dưới, [], False)
+        """
+        version = self._data_version()
+        key = RouteCache.make_key(start_location, mandatory_locations, (),
+                                  limit_km, "mandatory")
+        cached = self.route_cache.get(key, version)
+        if cached is not None:
+            return cached
+        
+        stops = list(dict.fromkeys(mandatory_locations))
+        if not stops:
+            return True, 0, [], True
+        dist = table.submatrix(stops)
+        
+        # Cây khung nhỏ nhất là cận dưới của mọi đường đi qua hết các điểm
+        lower_bound = spanning_tree_weight(dist, range(len(stops)))
+        if limit_km and lower_bound > limit_km:
+            result = (False, lower_bound, [], False)
+        else:
+            problem = TourProblem(
+                dist, start=stops.index(start_location) if start_location else None,
+                mandatory=range(len(stops)))
+            exact = len(stops) <= MAX_EXACT_STOPS
+            order, distance, _ = solve(problem, "held_karp" if exact else "heuristic",
+                                       monitor=monitor)
+            if not order:
+                order, distance = [], INF
+            feasible = distance < INF and (not limit_km or distance <= limit_km)
+            result = (feasible, distance, [stops[i] for i in order],
+                      exact and not monitor.cancelled)
+        
+        if not monitor.cancelled:
+            self.route_cache.put(key, result, version)
+        return result
+    
+    def get_coverage_frontier(self, selected_locations, start_location=None,
+                              mandatory_locations=None, monitor=None):
+        """
+        Biên Pareto (số điểm tùy chọn, quãng đường ngắn nhất) của một lựa chọn
+        
+        Tính một lần cho mỗi lựa chọn (lưu đệm theo điểm bắt đầu, điểm bắt buộc
+        và tùy chọn), sau đó lời giải với giới hạn km bất kỳ chỉ là tra cứu
+        CoverageFrontier.route(limit_km), cùng kết quả với bộ giải chính xác.
+        
+        Args:
+            selected_locations: Danh sách các địa điểm đã chọn
+            start_location: Điểm bắt đầu cố định
+            mandatory_locations: Danh sách điểm BẮT BUỘC phải đi qua
+            monitor: SearchMonitor để theo dõi tiến độ / hủy
+            
+        Returns:
+            CoverageFrontier, hoặc None nếu không có điểm nào hoặc nhiều hơn
+            FRONTIER_MAX_STOPS điểm; bị hủy giữa chừng thì là biên của phần
+            đã tính (complete=False, không được lưu đệm)
+            Số liệu của lần tính nằm ở self.last_stats (SolveStats)
+        """
+        if monitor is None:
+            monitor = SearchMonitor()
+        return self._collect_stats("frontier", monitor, lambda stats:
+                                   self._coverage_frontier(selected_locations,
+                                                           start_location,
+                                                           mandatory_locations,
+                                                           monitor, stats))
+    
+    def _coverage_frontier(self, selected_locations, start_location,
+                           mandatory_locations, monitor, stats):
+        """Phần thân của get_coverage_frontier, ghi số liệu vào stats"""
+        mandatory_locations, optional_locations = self._split_query(
+            selected_locations, start_location, mandatory_locations)
+        stop_count = len(set(mandatory_locations) | set(optional_locations))
+        if not stop_count or stop_count > FRONTIER_MAX_STOPS:
+            return None
+        
+        stats.engine = "frontier"
+        version = self._data_version()
+        key = RouteCache.make_key(start_location, mandatory_locations,
+                                  optional_locations, None, "frontier")
+        cached = self.route_cache.get(key, version)
+        if cached is not None:
+            return CoverageFrontier(selected_locations, optional_locations, cached)
+        
+        with stats.phase("table"):
+            table = self.get_shortest_path_table()
+        stops, _, problem = self._build_problem(
+            table, start_location, mandatory_locations, optional_locations, None)
+        with stats.phase("solve"):
+            frontier = coverage_frontier(problem, monitor)
+        
+        points = []
+        with stats.phase("expand"):
+            for count, distance, order in frontier:
+                visited = [stops[i] for i in order]
+                points.append((count, distance,
+                               tuple(self._expand_path(table, visited)),
+                               tuple(visited)))
+        if monitor.cancelled:
+            return CoverageFrontier(selected_locations, optional_locations, points,
+                                    complete=False)
+        self.route_cache.put(key, points, version)
+        return CoverageFrontier(selected_locations, optional_locations, points)
+    
+    def _find_route(self, selected_locations, start_location, mandatory_locations,
+                    limit_km, engine, time_budget, monitor, warm_start, stats,
+                    seed=None):
+        """
+        Phần thân của find_shortest_path_tsp, ghi số liệu vào stats
+        
+        seed: (thứ tự, quãng đường, tối ưu) lộ trình chỉ qua điểm bắt buộc từ
+        plan_route, làm lời giải ban đầu cho bộ giải
         """
         if not selected_locations or len(selected_locations) < 1:
             return [], 0, []
         
-        # Build graph
-        graph = self.build_graph()
+        mandatory_locations, optional_locations = self._split_query(
+            selected_locations, start_location, mandatory_locations)
+        
+        # Truy vấn đã giải với cùng dữ liệu: trả lại kết quả đã lưu
+        version = self._data_version()
+        cache_key = RouteCache.make_key(start_location, mandatory_locations,
+                                        optional_locations, limit_km, engine)
+        cached = self.route_cache.get(cache_key, version)
+        if cached is not None:
+            best_path, best_distance, best_visited, solve_info = cached
+            self.last_solve_info = dict(solve_info, cached=True)
+            stats.engine = solve_info["engine"]
+            self._remember_solution(version, start_location, mandatory_locations,
+                                    optional_locations, limit_km, solve_info["visited"])
+            return (list(best_path), best_distance,
+                    self._exceeded_locations(selected_locations, optional_locations,
+                                             best_visited))
+        
+        with stats.phase("table"):
+            table = self.get_shortest_path_table()
+        engine = self._resolve_engine(engine, table, start_location,
+                                      mandatory_locations, optional_locations,
+                                      limit_km, allow_parallel=self.workers > 1)
+        
+        previous = None
+        if warm_start != "off" and engine not in PERMUTATION_ENGINES:
+            previous = self._warm_start_order(version, start_location,
+                                              mandatory_locations,
+                                              optional_locations, limit_km)
+        
+        warm_used = False
+        if engine in PERMUTATION_ENGINES:
+            with stats.phase("solve"):
+                best_path, best_distance, best_visited = self._solve_permutations(
+                    engine, table, start_location, mandatory_locations,
+                    optional_locations, limit_km, monitor)
+            lower_bound = best_distance
+        else:
+            (best_path, best_distance, best_visited, lower_bound,
+             warm_used) = self._solve_indexed(
+                engine, table, start_location, mandatory_locations,
+                optional_locations, limit_km, time_budget, monitor,
+                previous, warm_start == "local", stats, seed)
+            if warm_used and warm_start == "local":
+                engine = "warm_start"
+        
+        cancelled = monitor is not None and monitor.cancelled
+        self.last_solve_info = {
+            "engine": engine,
+            "lower_bound": lower_bound,
+            "gap": (best_distance - lower_bound) / lower_bound
+                   if 0 < lower_bound < INF else 0.0,
+            "optimal": engine not in ("heuristic", "warm_start") and not cancelled,
+            "cancelled": cancelled,
+            "cached": False,
+            "warm_start": warm_used,
+            "visited": list(best_visited),
+        }
+        stats.engine = engine
+        
+        if not cancelled:
+            self._remember_solution(version, start_location, mandatory_locations,
+                                    optional_locations, limit_km, best_visited)
+        
+        # Kết quả bị hủy giữa chừng hoặc chỉ cải thiện cục bộ không được lưu đệm
+        if not cancelled and engine != "warm_start":
+            self.route_cache.put(
+                cache_key,
+                (tuple(best_path), best_distance, frozenset(best_visited),
+                 self.last_solve_info),
+                version)
+        
+        return (best_path, best_distance,
+                self._exceeded_locations(selected_locations, optional_locations,
+                                         best_visited))
+    
+    def prepare_query(self, selected_locations, start_location=None,
+                      mandatory_locations=None, limit_km=None, engine="auto",
+                      time_budget=None):
+        """
+        Chuẩn bị một truy vấn để giải ở luồng / tiến trình khác
+        
+        Phần việc nhẹ (tra bộ nhớ đệm, dựng TourProblem) chạy ngay tại đây; bài
+        toán trả về được giải bằng tsp_solvers.solve(prepared.problem,
+        prepared.engine, prepared.time_budget) rồi đưa lại complete_query.
+        Truy vấn rỗng, có sẵn trong bộ nhớ đệm hoặc dùng bộ giải trong
+        PERMUTATION_ENGINES được giải xong luôn (prepared.done).
+        
+        Args:
+            Giống find_shortest_path_tsp, engine thuộc BATCH_ENGINES
+            
+        Returns:
+            PreparedQuery
+            
+        Raises:
+            ValueError: Nếu engine không thuộc BATCH_ENGINES
+        """
+        if engine not in ENGINES:
+            raise ValueError(f"Bộ giải không hợp lệ: {engine}")
+        if engine not in BATCH_ENGINES:
+            raise ValueError(f"Bộ giải {engine} không dùng được khi giải theo lô "
+                             f"(dùng branch_and_bound)")
+        
+        mandatory_locations, optional_locations = self._split_query(
+            selected_locations, start_location, mandatory_locations)
+        version = self._data_version()
+        prepared = PreparedQuery(
+            RouteCache.make_key(start_location, mandatory_locations,
+                                optional_locations, limit_km, engine),
+            version, selected_locations, optional_locations, time_budget)
+        
+        if not selected_locations:
+            prepared.path, prepared.distance, prepared.visited = (), 0, []
+            return prepared
+        
+        cached = self.route_cache.get(prepared.key, version)
+        if cached is not None:
+            prepared.path, prepared.distance, prepared.visited, solve_info = cached
+            prepared.engine = solve_info["engine"]
+            prepared.cached = True
+            return prepared
+        
+        table = self.get_shortest_path_table()
+        prepared.engine = self._resolve_engine(engine, table, start_location,
+                                               mandatory_locations,
+                                               optional_locations, limit_km,
+                                               allow_parallel=False)
+        if prepared.engine in PERMUTATION_ENGINES:
+            path, total_distance, visited = self._solve_permutations(
+                prepared.engine, table, start_location, mandatory_locations,
+                optional_locations, limit_km)
+            self._store_prepared(prepared, path, total_distance, visited,
+                                 total_distance)
+            return prepared
+        
+        prepared.stops, _, prepared.problem = self._build_problem(
+            table, start_location, mandatory_locations, optional_locations,
+            limit_km)
+        return prepared
+    
+    def complete_query(self, prepared, order, total_distance, lower_bound,
+                       cancelled=False):
+        """
+        Ghép lộ trình từ kết quả của bộ giải và lưu vào bộ nhớ đệm
+        
+        Args:
+            prepared: PreparedQuery từ prepare_query
+            order, total_distance, lower_bound: Kết quả của tsp_solvers.solve
+            cancelled: Bộ giải bị dừng giữa chừng (kết quả không được lưu đệm)
+        """
+        if not order:
+            self._store_prepared(prepared, [], INF, [], 0, cancelled)
+            return
+        visited = [prepared.stops[i] for i in order]
+        self._store_prepared(prepared,
+                             self._expand_path(self.get_shortest_path_table(),
+                                               visited),
+                             total_distance, visited, lower_bound, cancelled)
+    
+    def query_result(self, prepared, selected_locations=None):
+        """
+        Kết quả của một truy vấn đã giải xong
+        
+        Args:
+            prepared: PreparedQuery đã xong (prepared.done)
+            selected_locations: Thứ tự chọn điểm của truy vấn (mặc định: của
+                                truy vấn đã chuẩn bị); truy vấn trùng khóa chỉ
+                                khác thứ tự chọn dùng chung một lời giải
+            
+        Returns:
+            tuple: (path, total_distance, exceeded_locations)
+        """
+        if selected_locations is None:
+            selected_locations = prepared.selected_locations
+        if not selected_locations:
+            return [], 0, []
+        return (list(prepared.path), prepared.distance,
+                self._exceeded_locations(selected_locations,
+                                         prepared.optional_locations,
+                                         prepared.visited))
+    
+    def _store_prepared(self, prepared, path, total_distance, visited,
+                        lower_bound, cancelled=False):
+        """Ghi kết quả vào PreparedQuery và bộ nhớ đệm"""
+        prepared.path, prepared.distance = path, total_distance
+        prepared.visited = visited
+        prepared.cancelled = cancelled
+        if cancelled:
+            return
+        solve_info = {
+            "engine": prepared.engine,
+            "lower_bound": lower_bound,
+            "gap": (total_distance - lower_bound) / lower_bound
+                   if 0 < lower_bound < INF else 0.0,
+            "optimal": prepared.engine != "heuristic",
+            "cancelled": False,
+            "cached": False,
+            "warm_start": False,
+            "visited": list(visited),
+        }
+        self.route_cache.put(prepared.key, (tuple(path), total_distance,
+                                            frozenset(visited), solve_info),
+                             prepared.version)
+    
+    def solve_batch(self, queries):
+        """
+        Giải nhiều truy vấn dùng chung đồ thị, bảng khoảng cách và tiến trình
+        
+        Các truy vấn cùng tập điểm (cùng khóa chuẩn hóa như RouteCache) chỉ được
+        giải một lần. Kết quả được trả về dần theo thứ tự giải xong, kết quả có
+        sẵn trong bộ nhớ đệm được trả về trước. Khi PathFinder có nhiều tiến
+        trình, mỗi truy vấn được giải trọn trên một tiến trình (không chia nhỏ
+        từng truy vấn như engine "parallel").
+        
+        Args:
+            queries: Danh sách dict tham số của find_shortest_path_tsp:
+                     selected_locations, start_location, mandatory_locations,
+                     limit_km, engine (thuộc BATCH_ENGINES), time_budget
+                     
+        Yields:
+            tuple: (query_index, (path, total_distance, exceeded_locations));
+                   thời gian xử lý riêng của truy vấn có trong
+                   self.last_batch_info["elapsed"][query_index] trước khi
+                   kết quả được trả về
+        """
+        queries = list(queries)
+        
+        # Gom các truy vấn giống nhau
+        groups = {}
+        for query_index, query in enumerate(queries):
+            engine = query.get("engine", "auto")
+            if engine not in ENGINES:
+                raise ValueError(f"Bộ giải không hợp lệ: {engine}")
+            if engine not in BATCH_ENGINES:
+                raise ValueError(f"Bộ giải {engine} không dùng được khi giải "
+                                 f"theo lô (dùng branch_and_bound)")
+            selected = query.get("selected_locations") or []
+            start_location = query.get("start_location")
+            mandatory_locations, optional_locations = self._split_query(
+                selected, start_location, query.get("mandatory_locations"))
+            key = RouteCache.make_key(start_location, mandatory_locations,
+                                      optional_locations, query.get("limit_km"),
+                                      engine)
+            groups.setdefault(key, []).append(query_index)
+        
+        self.last_batch_info = {"queries": len(queries), "unique": len(groups),
+                                "cache_hits": 0, "elapsed": {}}
+        elapsed_times = self.last_batch_info["elapsed"]
+        
+        def results(prepared, members, elapsed):
+            for query_index in members:
+                selected = queries[query_index].get("selected_locations") or []
+                elapsed_times[query_index] = elapsed
+                yield query_index, self.query_result(prepared, selected)
         
+        # Trả ngay các kết quả có sẵn, chuẩn bị bài toán cho phần còn lại
+        jobs = []
+        for members in groups.values():
+            query = queries[members[0]]
+            started = time.perf_counter()
+            prepared = self.prepare_query(
+                query.get("selected_locations") or [],
+                query.get("start_location"), query.get("mandatory_locations"),
+                query.get("limit_km"), query.get("engine", "auto"),
+                query.get("time_budget"))
+            elapsed = time.perf_counter() - started
+            if prepared.cached:
+                self.last_batch_info["cache_hits"] += 1
+            if prepared.done:
+                yield from results(prepared, members, elapsed)
+            else:
+                jobs.append((prepared, members, elapsed))
+        
+        if self.workers > 1 and len(jobs) > 1:
+            executor = self.get_executor()
+            futures = {executor.submit(timed_solve, prepared.problem,
+                                       prepared.engine, prepared.time_budget):
+                       (prepared, members, elapsed)
+                       for prepared, members, elapsed in jobs}
+            solved = ((futures[future], future.result())
+                      for future in as_completed(futures))
+        else:
+            solved = (((prepared, members, elapsed),
+                       timed_solve(prepared.problem, prepared.engine,
+                                   prepared.time_budget))
+                      for prepared, members, elapsed in jobs)
+        
+        for (prepared, members, elapsed), (solution, solve_time) in solved:
+            started = time.perf_counter()
+            order, total_distance, lower_bound = solution
+            self.complete_query(prepared, order, total_distance, lower_bound)
+            elapsed += solve_time + time.perf_counter() - started
+            yield from results(prepared, members, elapsed)
+    
+    def _split_query(self, selected_locations, start_location, mandatory_locations):
+        """
+        Tách các điểm đã chọn thành điểm bắt buộc (có điểm bắt đầu) và tùy chọn
+        
+        Returns:
+            tuple: (mandatory_locations, optional_locations)
+        """
         # Xác định điểm bắt buộc
         if mandatory_locations is None:
             mandatory_locations = []
@@ -107,105 +1361,365 @@ class PathFinder:
         # Lấy các điểm tùy chọn (optional)
         optional_locations = [loc for loc in selected_locations 
                              if loc not in mandatory_locations]
+        return mandatory_locations, optional_locations
+    
+    def _resolve_engine(self, engine, table, start_location, mandatory_locations,
+                        optional_locations, limit_km, allow_parallel):
+        """Chọn bộ giải cụ thể cho engine "auto" """
+        if engine != "auto":
+            return engine
+        stop_count = len(set(mandatory_locations) | set(optional_locations))
+        if stop_count > MAX_EXACT_STOPS:
+            return "heuristic"
+        if limit_km and self._tight_limit(table, start_location,
+                                          mandatory_locations,
+                                          optional_locations, limit_km):
+            if allow_parallel and stop_count >= PARALLEL_MIN_STOPS:
+                return "parallel"
+            return "branch_and_bound"
+        return "held_karp"
+    
+    def _tight_limit(self, table, start_location, mandatory_locations,
+                     optional_locations, limit_km):
+        """
+        Giới hạn km đủ chặt để nhánh cận nhanh hơn Held-Karp
         
-        best_distance = float('infinity')
-        best_path = []
+        Held-Karp tính mọi tập con một lần bất kể giới hạn, nhánh cận chỉ
+        nhanh khi giới hạn cắt bỏ phần lớn cây tìm kiếm. Lộ trình láng giềng
+        gần nhất (O(k^2)) đủ để ước lượng độ dài khi đi hết các điểm.
+        """
+        _, _, problem = self._build_problem(
+            table, start_location, mandatory_locations, optional_locations,
+            limit_km)
+        order = nearest_neighbour_order(problem.dist, range(problem.size),
+                                        problem.start)
+        return limit_km < BRANCH_AND_BOUND_MAX_RATIO * path_length(problem.dist,
+                                                                   order)
+    
+    def _build_problem(self, table, start_location, mandatory_locations,
+                       optional_locations, limit_km):
+        """
+        Dựng TourProblem trên khoảng cách ngắn nhất giữa các điểm
+        
+        Returns:
+            tuple: (stops, index, problem) - stops[i] là ID của chỉ số i
+        """
+        # Danh sách điểm (không trùng lặp), điểm bắt buộc đứng trước
+        stops = list(dict.fromkeys(list(mandatory_locations) + optional_locations))
+        
+        dist = table.submatrix(stops)
+        
+        index = {loc: i for i, loc in enumerate(stops)}
+        problem = TourProblem(
+            dist,
+            start=index[start_location] if start_location else None,
+            mandatory=[index[loc] for loc in mandatory_locations],
+            limit=limit_km)
+        return stops, index, problem
+    
+    def _remember_solution(self, version, start_location, mandatory_locations,
+                           optional_locations, limit_km, visited_locations):
+        """Lưu lời giải vừa có để lần sau khởi động ấm"""
+        if not visited_locations:
+            self._last_solution = None
+            return
+        self._last_solution = {
+            "version": version,
+            "start": start_location,
+            "stops": frozenset(mandatory_locations) | frozenset(optional_locations),
+            "mandatory": frozenset(mandatory_locations),
+            "limit": limit_km or None,
+            "visited": list(visited_locations),
+        }
+    
+    def _warm_start_order(self, version, start_location, mandatory_locations,
+                          optional_locations, limit_km):
+        """
+        Thứ tự các điểm của lần giải trước nếu truy vấn chỉ khác đúng một điểm
+        (thêm, bỏ, hoặc đổi bắt buộc / tùy chọn) với cùng dữ liệu, điểm bắt
+        đầu và giới hạn km
+        
+        Returns:
+            list hoặc None
+        """
+        last = self._last_solution
+        if (last is None or last["version"] != version
+                or last["start"] != start_location
+                or last["limit"] != (limit_km or None)):
+            return None
+        
+        stops = frozenset(mandatory_locations) | frozenset(optional_locations)
+        changed = (last["stops"] ^ stops) | (last["mandatory"]
+                                            ^ frozenset(mandatory_locations))
+        if len(changed) > 1:
+            return None
+        return last["visited"]
+    
+    def _exceeded_locations(self, selected_locations, optional_locations,
+                            visited_locations):
+        """Tính toán các điểm bị bỏ qua"""
+        if visited_locations:
+            return [loc for loc in selected_locations 
+                    if loc not in visited_locations]
+        # Nếu không tìm được đường nào, tất cả optional đều bị bỏ
+        return optional_locations
+    
+    def _solve_indexed(self, engine, table, start_location, mandatory_locations,
+                       optional_locations, limit_km, time_budget=None,
+                       monitor=None, previous=None, warm_only=False, stats=None,
+                       seed=None):
+        """
+        Giải bằng một bộ giải của tsp_solvers trên khoảng cách ngắn nhất giữa các điểm
+        
+        Args:
+            engine: "held_karp", "branch_and_bound", "parallel" hoặc "heuristic"
+            time_budget: Thời gian tối đa cho bộ giải heuristic (giây)
+            monitor: SearchMonitor (tùy chọn)
+            previous: Thứ tự các điểm của lần giải trước để khởi động ấm
+            warm_only: Trả luôn lộ trình ấm thay vì chạy bộ giải
+            stats: SolveStats để ghi thời gian các giai đoạn (tùy chọn)
+            seed: (thứ tự ID, quãng đường, tối ưu) một lộ trình hợp lệ qua các
+                  điểm bắt buộc, dùng làm lời giải ban đầu khi không có lộ
+                  trình ấm
+        
+        Returns:
+            tuple: (path, total_distance, visited_locations, lower_bound, warm_used)
+        """
+        def phase(name):
+            return stats.phase(name) if stats is not None else nullcontext()
+        
+        stops, index, problem = self._build_problem(
+            table, start_location, mandatory_locations, optional_locations, limit_km)
+        dist = problem.dist
+        
+        # Lộ trình ấm: chèn / gỡ điểm thay đổi vào lời giải trước rồi cải thiện
+        incumbent = None
+        if previous:
+            with phase("warm_start"):
+                incumbent = warm_start(problem, [index[loc] for loc in previous
+                                                 if loc in index])
+            if not incumbent[0]:
+                incumbent = None
+        warm_used = incumbent is not None
+        
+        # Lộ trình tối ưu qua đúng mọi điểm của bài toán (không có điểm tùy
+        # chọn) thì không cần giải lại
+        solved = False
+        if incumbent is None and seed is not None:
+            incumbent = ([index[loc] for loc in seed[0]], seed[1])
+            solved = seed[2] and len(incumbent[0]) == problem.size
+        
+        with phase("solve"):
+            if warm_used and warm_only:
+                order, total_distance = incumbent
+                lower_bound = spanning_tree_weight(dist, order)
+            elif solved:
+                order, total_distance = incumbent
+                lower_bound = total_distance
+            elif engine == "parallel":
+                order, total_distance = parallel_branch_and_bound(
+                    problem, self.get_executor(), monitor, incumbent)
+                lower_bound = total_distance
+            else:
+                order, total_distance, lower_bound = solve(
+                    problem, engine, time_budget, monitor, incumbent)
+        if not order:
+            return [], INF, [], 0, warm_used
+        
+        visited = [stops[i] for i in order]
+        with phase("expand"):
+            full_path = self._expand_path(table, visited)
+        return full_path, total_distance, visited, lower_bound, warm_used
+    
+    def _expand_path(self, table, visited):
+        """Ghép các đoạn đường ngắn nhất giữa các điểm liên tiếp thành lộ trình đầy đủ"""
+        full_path = []
+        for i in range(len(visited) - 1):
+            segment_path = table.path(visited[i], visited[i + 1])
+            if i == 0:
+                full_path.extend(segment_path)
+            else:
+                full_path.extend(segment_path[1:])
+        return full_path
+    
+    def _solve_permutations(self, engine, table, start_location,
+                            mandatory_locations, optional_locations, limit_km,
+                            monitor=None):
+        """Giải bằng một bộ giải trong PERMUTATION_ENGINES"""
+        solver = self._solve_dfs if engine == "dfs" else self._solve_brute_force
+        return solver(table, start_location, mandatory_locations,
+                      optional_locations, limit_km, monitor)
+    
+    def _solve_dfs(self, table, start_location, mandatory_locations,
+                   optional_locations, limit_km, monitor=None):
+        """
+        Như _solve_brute_force (cùng thứ tự tổ hợp, cùng cách cộng quãng đường
+        và phá hòa) nhưng mỗi tổ hợp được giải bằng permutation_search
+        
+        Returns:
+            tuple: (path, total_distance, visited_locations) giống hệt
+                   _solve_brute_force
+        """
+        best_distance = INF
+        best_order = []
         best_visited = []
-        exceeded_locations = []
+        subsets = 0
+        counters = {}
         
-        # Thử các tổ hợp khác nhau của điểm optional
-        # Từ đầy đủ nhất đến ít nhất
         for num_optional in range(len(optional_locations), -1, -1):
-            from itertools import combinations
-            
-            # Thử tất cả tổ hợp num_optional điểm từ optional_locations
             for optional_combo in combinations(optional_locations, num_optional):
-                # Tạo danh sách điểm cần đi qua
+                subsets += 1
                 locations_to_visit = list(mandatory_locations) + list(optional_combo)
+                fixed_start = bool(start_location) and start_location in locations_to_visit
+                if fixed_start:
+                    stops = [start_location] + [loc for loc in locations_to_visit
+                                                if loc != start_location]
+                else:
+                    stops = locations_to_visit
                 
-                # Nếu có start_location, tách riêng
-                if start_location and start_location in locations_to_visit:
-                    other_locs = [loc for loc in locations_to_visit if loc != start_location]
+                dist = [[table.distance(loc1, loc2) for loc2 in stops]
+                        for loc1 in stops]
+                order, distance = permutation_search(
+                    dist, fixed_start, limit_km, best_distance, monitor, counters)
+                if order is not None:
+                    best_distance = distance
+                    best_order = [stops[i] for i in order]
+                    best_visited = locations_to_visit
+                if monitor is not None and monitor.cancelled:
+                    break
+            
+            # Giống brute_force: dừng khi đã có đường đi (ít nhất 2 điểm)
+            if len(best_order) > 1 or (monitor is not None and monitor.cancelled):
+                break
+        
+        if monitor is not None:
+            monitor.record(subsets=subsets, **counters)
+        
+        best_path = []
+        for i in range(len(best_order) - 1):
+            segment_path = table.path(best_order[i], best_order[i + 1])
+            best_path.extend(segment_path if i == 0 else segment_path[1:])
+        return best_path, best_distance, list(best_visited)
+    
+    def _solve_brute_force(self, table, start_location, mandatory_locations,
+                           optional_locations, limit_km, monitor=None):
+        """
+        Duyệt toàn bộ tổ hợp điểm optional và hoán vị (thuật toán gốc)
+        
+        Args:
+            monitor: SearchMonitor (tùy chọn); khi bị hủy trả về lời giải tốt nhất
+        
+        Returns:
+            tuple: (path, total_distance, visited_locations)
+        """
+        best_distance = float('infinity')
+        best_path = []
+        best_visited = []
+        subsets = over_limit = 0
+        evaluated = monitor.evaluated if monitor is not None else 0
+        
+        try:
+            # Thử các tổ hợp khác nhau của điểm optional
+            # Từ đầy đủ nhất đến ít nhất
+            for num_optional in range(len(optional_locations), -1, -1):
+                # Thử tất cả tổ hợp num_optional điểm từ optional_locations
+                for optional_combo in combinations(optional_locations, num_optional):
+                    subsets += 1
+                    # Tạo danh sách điểm cần đi qua
+                    locations_to_visit = list(mandatory_locations) + list(optional_combo)
                     
-                    # Thử tất cả hoán vị của các điểm còn lại
-                    for perm in permutations(other_locs):
-                        full_perm = (start_location,) + perm
-                        
-                        full_path = []
-                        total_distance = 0
-                        valid = True
+                    # Nếu có start_location, tách riêng
+                    if start_location and start_location in locations_to_visit:
+                        other_locs = [loc for loc in locations_to_visit if loc != start_location]
                         
-                        for i in range(len(full_perm) - 1):
-                            segment_path, segment_dist = self.dijkstra(
-                                graph, full_perm[i], full_perm[i + 1])
+                        # Thử tất cả hoán vị của các điểm còn lại
+                        for perm in permutations(other_locs):
+                            if monitor is not None:
+                                monitor.tick()
+                            full_perm = (start_location,) + perm
                             
-                            if not segment_path:
-                                valid = False
-                                break
+                            full_path = []
+                            total_distance = 0
+                            valid = True
                             
-                            if i == 0:
-                                full_path.extend(segment_path)
-                            else:
-                                full_path.extend(segment_path[1:])
+                            for i in range(len(full_perm) - 1):
+                                segment_path = table.path(full_perm[i], full_perm[i + 1])
+                                segment_dist = table.distance(full_perm[i], full_perm[i + 1])
+                                
+                                if not segment_path:
+                                    valid = False
+                                    break
+                                
+                                if i == 0:
+                                    full_path.extend(segment_path)
+                                else:
+                                    full_path.extend(segment_path[1:])
+                                
+                                total_distance += segment_dist
+                                
+                                # Kiểm tra giới hạn km
+                                if limit_km and total_distance > limit_km:
+                                    over_limit += 1
+                                    valid = False
+                                    break
                             
-                            total_distance += segment_dist
+                            if valid:
+                                if total_distance < best_distance:
+                                    best_distance = total_distance
+                                    best_path = full_path
+                                    best_visited = list(locations_to_visit)
+                                    if monitor is not None:
+                                        monitor.set_best(best_distance)
+                    else:
+                        # Không có start_location
+                        for perm in permutations(locations_to_visit):
+                            if monitor is not None:
+                                monitor.tick()
+                            full_path = []
+                            total_distance = 0
+                            valid = True
                             
-                            # Kiểm tra giới hạn km
-                            if limit_km and total_distance > limit_km:
-                                valid = False
-                                break
-                        
-                        if valid:
-                            if total_distance < best_distance:
-                                best_distance = total_distance
-                                best_path = full_path
-                                best_visited = list(locations_to_visit)
-                else:
-                    # Không có start_location
-                    for perm in permutations(locations_to_visit):
-                        full_path = []
-                        total_distance = 0
-                        valid = True
-                        
-                        for i in range(len(perm) - 1):
-                            segment_path, segment_dist = self.dijkstra(
-                                graph, perm[i], perm[i + 1])
-                            
-                            if not segment_path:
-                                valid = False
-                                break
-                            
-                            if i == 0:
-                                full_path.extend(segment_path)
-                            else:
-                                full_path.extend(segment_path[1:])
-                            
-                            total_distance += segment_dist
+                            for i in range(len(perm) - 1):
+                                segment_path = table.path(perm[i], perm[i + 1])
+                                segment_dist = table.distance(perm[i], perm[i + 1])
+                                
+                                if not segment_path:
+                                    valid = False
+                                    break
+                                
+                                if i == 0:
+                                    full_path.extend(segment_path)
+                                else:
+                                    full_path.extend(segment_path[1:])
+                                
+                                total_distance += segment_dist
+                                
+                                # Kiểm tra giới hạn km
+                                if limit_km and total_distance > limit_km:
+                                    over_limit += 1
+                                    valid = False
+                                    break
                             
-                            # Kiểm tra giới hạn km
-                            if limit_km and total_distance > limit_km:
-                                valid = False
-                                break
-                        
-                        if valid:
-                            if total_distance < best_distance:
-                                best_distance = total_distance
-                                best_path = full_path
-                                best_visited = list(locations_to_visit)
-            
-            # Nếu đã tìm được đường đi hợp lệ, dừng
-            if best_path:
-                break
-        
-        # Tính toán các điểm bị bỏ qua
-        if best_visited:
-            exceeded_locations = [loc for loc in selected_locations 
-                                 if loc not in best_visited]
-        else:
-            # Nếu không tìm được đường nào, tất cả optional đều bị bỏ
-            exceeded_locations = optional_locations
+                            if valid:
+                                if total_distance < best_distance:
+                                    best_distance = total_distance
+                                    best_path = full_path
+                                    best_visited = list(locations_to_visit)
+                                    if monitor is not None:
+                                        monitor.set_best(best_distance)
+                
+                # Nếu đã tìm được đường đi hợp lệ, dừng
+                if best_path:
+                    break
+        except SearchCancelled:
+            # Bị hủy: giữ lại lộ trình tốt nhất tìm được tới lúc này
+            pass
         
-        return best_path, best_distance, exceeded_locations
+        if monitor is not None:
+            # Mỗi hoán vị được đếm bằng monitor.tick
+            monitor.record(subsets=subsets, pruned_limit=over_limit,
+                           permutations=monitor.evaluated - evaluated)
+        return best_path, best_distance, best_visited
     
     def find_intermediate_points(self, path, selected_locations):
         """
@@ -243,41 +1757,56 @@ class PathFinder:
                 total += dist
         return total
     
-    def check_mandatory_feasibility(self, mandatory_locations, limit_km):
+    def check_mandatory_feasibility(self, mandatory_locations, limit_km,
+                                    monitor=None):
         """
         Kiểm tra xem các điểm bắt buộc có thể đi hết trong giới hạn km không
         
         Args:
             mandatory_locations: Danh sách điểm bắt buộc
             limit_km: Giới hạn km
+            monitor: SearchMonitor (tùy chọn); khi bị hủy trả về kết quả tốt
+                     nhất tìm được tới lúc đó
             
         Returns:
             tuple: (feasible, min_distance, best_order)
+                   - khi cận dưới đã vượt giới hạn, trả về ngay
+                     (False, cận dưới, []) mà không cần tìm thứ tự đi
+                   Số liệu của lần kiểm tra nằm ở self.last_stats (SolveStats)
         """
+        if monitor is None:
+            monitor = SearchMonitor()
+        return self._collect_stats("feasibility", monitor, lambda stats:
+                                   self._check_feasibility(mandatory_locations,
+                                                           limit_km, monitor,
+                                                           stats))
+    
+    def _check_feasibility(self, mandatory_locations, limit_km, monitor, stats):
+        """Phần thân của check_mandatory_feasibility, ghi số liệu vào stats"""
         if not mandatory_locations or len(mandatory_locations) < 2:
             return True, 0, mandatory_locations
         
-        graph = self.build_graph()
-        best_distance = float('infinity')
-        best_order = []
+        with stats.phase("table"):
+            table = self.get_shortest_path_table()
+        stops = list(dict.fromkeys(mandatory_locations))
+        dist = table.submatrix(stops)
         
-        # Thử tất cả hoán vị
-        for perm in permutations(mandatory_locations):
-            total_distance = 0
-            valid = True
-            
-            for i in range(len(perm) - 1):
-                _, segment_dist = self.dijkstra(graph, perm[i], perm[i + 1])
-                
-                if segment_dist is None:
-                    valid = False
-                    break
-                
-                total_distance += segment_dist
-            
-            if valid and total_distance < best_distance:
-                best_distance = total_distance
-                best_order = list(perm)
+        # Mọi đường đi qua hết các điểm là một cây khung nên cây khung nhỏ nhất
+        # là cận dưới: vượt giới hạn thì chắc chắn không khả thi
+        stats.engine = "spanning_tree"
+        with stats.phase("bound"):
+            lower_bound = spanning_tree_weight(dist, range(len(stops)))
+        if lower_bound == INF:
+            return not limit_km, INF, []
+        if limit_km and lower_bound > limit_km:
+            stats.count("pruned_limit")
+            return False, lower_bound, []
+        
+        # Tìm chính xác, dùng cận dưới để cắt nhánh
+        stats.engine = "shortest_covering_path"
+        with stats.phase("search"):
+            order, best_distance = shortest_covering_path(dist, monitor)
+        best_order = [stops[i] for i in order]
         
         feasible = best_distance <= limit_km if limit_km else True
         
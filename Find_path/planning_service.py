@@ -0,0 +1,367 @@
+"""
+Dịch vụ HTTP/JSON lập lộ trình chạy trên asyncio (không cần giao diện Tk)
+
+LocationData, DistanceMatrix, đồ thị, bảng khoảng cách và bộ nhớ đệm kết quả
+được giữ sẵn trong bộ nhớ suốt thời gian chạy. Việc nhẹ (tra bộ nhớ đệm, dựng
+bài toán, ghép lộ trình) chạy ngay trên event loop; phần giải nặng được giao
+cho ProcessPoolExecutor của PathFinder nên event loop không bao giờ bị chặn.
+
+Các endpoint:
+    POST /plan     Truy vấn JSON như một dòng của batch_cli
+    GET  /health   Trạng thái dịch vụ
+    GET  /stats    Bộ đếm yêu cầu và thống kê bộ nhớ đệm
+
+    python planning_service.py --port 8765 --workers 4
+"""
+import argparse
+import asyncio
+import json
+import threading
+import time
+
+from batch_cli import query_from_record
+from data_model import LocationData, DistanceMatrix
+from data_store import open_store
+from parallel_search import default_workers
+from path_finder import PERMUTATION_ENGINES, PathFinder
+from tsp_solvers import DEFAULT_TIME_BUDGET, INF, SearchMonitor, solve
+
+
+# Kích thước tối đa của thân yêu cầu (byte)
+MAX_BODY_SIZE = 64 * 1024
+
+# Thời gian chờ tối đa khi đọc một yêu cầu từ kết nối đang mở (giây)
+READ_TIMEOUT = 30.0
+
+_REASONS = {
+    200: "OK",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    413: "Payload Too Large",
+    500: "Internal Server Error",
+    503: "Service Unavailable",
+    504: "Gateway Timeout",
+}
+
+
+def _solve_within(problem, engine, time_budget):
+    """
+    Chạy trong tiến trình con: giải trong giới hạn time_budget giây
+
+    Bộ giải heuristic tự dừng theo time_budget; bộ giải chính xác bị hủy khi
+    hết giờ và trả về lời giải tốt nhất đã tìm được.
+
+    Returns:
+        tuple: (order, distance, lower_bound, cancelled)
+    """
+    monitor = SearchMonitor()
+    timer = threading.Timer(time_budget, monitor.cancel)
+    timer.start()
+    try:
+        order, distance, lower_bound = solve(problem, engine, time_budget, monitor)
+    finally:
+        timer.cancel()
+    return order, distance, lower_bound, monitor.cancelled
+
+
+class PlanningService:
+    """Xử lý truy vấn lập lộ trình với bộ nhớ đệm giữ sẵn và giới hạn tải"""
+
+    def __init__(self, path_finder, max_concurrent=None, max_pending=64,
+                 request_timeout=10.0, max_time_budget=5.0):
+        """
+        Khởi tạo dịch vụ
+
+        Args:
+            path_finder: PathFinder dùng chung (giữ bảng khoảng cách, bộ nhớ
+                         đệm và các tiến trình giải)
+            max_concurrent: Số bài toán giải cùng lúc (mặc định: số tiến trình)
+            max_pending: Số truy vấn tối đa đang chờ + đang giải; vượt quá thì
+                         trả 503 thay vì xếp hàng thêm
+            request_timeout: Thời gian tối đa cho một truy vấn kể cả chờ (giây);
+                             quá thời gian trả 504
+            max_time_budget: Thời gian giải tối đa cho một bài toán (giây);
+                             time_budget của truy vấn bị giới hạn trong mức này
+        """
+        self.path_finder = path_finder
+        self.max_concurrent = max_concurrent or max(1, path_finder.workers)
+        self.max_pending = max_pending
+        self.request_timeout = request_timeout
+        self.max_time_budget = max_time_budget
+        self._semaphore = None
+        # Truy vấn trùng khóa đang giải dùng chung một task
+        self._inflight = {}
+        self.pending = 0
+        self.counters = {"requests": 0, "completed": 0, "cached": 0,
+                         "rejected": 0, "timeouts": 0, "errors": 0}
+
+    def warm_up(self):
+        """Dựng trước đồ thị, bảng khoảng cách và các tiến trình giải"""
+        self.path_finder.get_shortest_path_table()
+        self.path_finder.get_executor()
+
+    async def plan(self, record):
+        """
+        Xử lý một truy vấn lập lộ trình
+
+        Args:
+            record: Object JSON của truy vấn (start, mandatory, optional,
+                    limit_km, engine, time_budget)
+
+        Returns:
+            tuple: (mã HTTP, object JSON trả về)
+        """
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrent)
+        self.counters["requests"] += 1
+
+        try:
+            query_id, query = query_from_record(record, None,
+                                                self.path_finder.location_data)
+        except (TypeError, ValueError) as error:
+            # TypeError: trường có kiểu mà query_from_record chưa kiểm tra
+            self.counters["errors"] += 1
+            return 400, {"error": f"Truy vấn không hợp lệ: {error}"
+                         if isinstance(error, TypeError) else str(error)}
+        if query["engine"] in PERMUTATION_ENGINES:
+            self.counters["errors"] += 1
+            return 400, {"error": "Dịch vụ không hỗ trợ bộ giải "
+                                  f"{query['engine']}"}
+
+        if self.pending >= self.max_pending:
+            self.counters["rejected"] += 1
+            return 503, {"id": query_id, "error": "Dịch vụ đang quá tải"}
+
+        started = time.perf_counter()
+        self.pending += 1
+        try:
+            prepared = await asyncio.wait_for(self._solve(query),
+                                              self.request_timeout)
+        except asyncio.TimeoutError:
+            self.counters["timeouts"] += 1
+            return 504, {"id": query_id, "error": "Hết thời gian xử lý"}
+        except Exception as error:  # lỗi trong tiến trình giải
+            self.counters["errors"] += 1
+            return 500, {"id": query_id, "error": f"Lỗi bộ giải: {error}"}
+        finally:
+            self.pending -= 1
+
+        self.counters["completed"] += 1
+        if prepared.cached:
+            self.counters["cached"] += 1
+        path, total_distance, exceeded = self.path_finder.query_result(
+            prepared, query["selected_locations"])
+        return 200, {
+            "id": query_id,
+            "path": path,
+            "distance_km": round(total_distance, 3)
+                           if total_distance < INF else None,
+            "exceeded": exceeded,
+            "engine": prepared.engine,
+            "optimal": prepared.engine != "heuristic" and not prepared.cancelled,
+            "cached": prepared.cached,
+            "elapsed_ms": round((time.perf_counter() - started) * 1000, 3),
+        }
+
+    async def _solve(self, query):
+        """Chuẩn bị trên event loop, giải trên tiến trình con"""
+        time_budget = min(query["time_budget"] or DEFAULT_TIME_BUDGET,
+                          self.max_time_budget)
+        prepared = self.path_finder.prepare_query(
+            query["selected_locations"], query["start_location"],
+            query["mandatory_locations"], query["limit_km"], query["engine"],
+            time_budget)
+        if prepared.done:
+            return prepared
+
+        task = self._inflight.get(prepared.key)
+        if task is None:
+            task = asyncio.ensure_future(self._run(prepared, time_budget))
+            self._inflight[prepared.key] = task
+            task.add_done_callback(
+                lambda _, key=prepared.key: self._inflight.pop(key, None))
+        # shield: truy vấn hết giờ không hủy lời giải mà truy vấn khác đang chờ
+        return await asyncio.shield(task)
+
+    async def _run(self, prepared, time_budget):
+        async with self._semaphore:
+            future = self.path_finder.get_executor().submit(
+                _solve_within, prepared.problem, prepared.engine, time_budget)
+            order, total_distance, lower_bound, cancelled = \
+                await asyncio.wrap_future(future)
+        self.path_finder.complete_query(prepared, order, total_distance,
+                                        lower_bound, cancelled)
+        return prepared
+
+    def stats(self):
+        """Bộ đếm yêu cầu, số truy vấn đang xử lý và thống kê bộ nhớ đệm"""
+        return dict(self.counters, pending=self.pending,
+                    route_cache=self.path_finder.route_cache.stats())
+
+    async def handle(self, method, path, body):
+        """
+        Định tuyến một yêu cầu HTTP
+
+        Returns:
+            tuple: (mã HTTP, object JSON trả về)
+        """
+        if path == "/plan":
+            if method != "POST":
+                return 405, {"error": "Dùng POST /plan"}
+            try:
+                record = json.loads(body or b"null")
+            except (json.JSONDecodeError, UnicodeDecodeError):
+                self.counters["requests"] += 1
+                self.counters["errors"] += 1
+                return 400, {"error": "Thân yêu cầu không phải JSON hợp lệ"}
+            return await self.plan(record)
+        if path == "/health" and method == "GET":
+            return 200, {"status": "ok",
+                         "locations": len(self.path_finder.location_data
+                                          .get_all_locations()),
+                         "workers": self.path_finder.workers}
+        if path == "/stats" and method == "GET":
+            return 200, self.stats()
+        return 404, {"error": f"Không có endpoint {method} {path}"}
+
+    async def serve_connection(self, reader, writer):
+        """Phục vụ một kết nối HTTP/1.1 (giữ kết nối cho nhiều yêu cầu)"""
+        try:
+            while True:
+                try:
+                    request = await asyncio.wait_for(_read_request(reader),
+                                                     READ_TIMEOUT)
+                except (asyncio.TimeoutError, asyncio.IncompleteReadError,
+                        ConnectionError):
+                    break
+                if request is None:
+                    break
+                method, path, headers, body = request
+                if body is _TOO_LARGE:
+                    status, payload = 413, {"error": "Thân yêu cầu quá lớn"}
+                    keep_alive = False
+                elif body is _BAD_LENGTH:
+                    # Không biết thân yêu cầu dài bao nhiêu: không đọc tiếp được
+                    status, payload = 400, {"error": "Content-Length không hợp lệ"}
+                    keep_alive = False
+                else:
+                    status, payload = await self.handle(method, path, body)
+                    keep_alive = headers.get("connection", "").lower() != "close"
+                _write_response(writer, status, payload, keep_alive)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+
+_TOO_LARGE = object()
+_BAD_LENGTH = object()
+
+
+async def _read_request(reader):
+    """
+    Đọc một yêu cầu HTTP
+
+    Returns:
+        tuple: (method, path, headers, body) hoặc None nếu kết nối đã đóng;
+               body là _TOO_LARGE nếu vượt MAX_BODY_SIZE, _BAD_LENGTH nếu
+               Content-Length không phải số nguyên không âm
+    """
+    request_line = await reader.readline()
+    if not request_line.strip():
+        return None
+    try:
+        method, target, _ = request_line.decode("latin-1").split(" ", 2)
+    except ValueError:
+        return None
+
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+
+    try:
+        length = int(headers.get("content-length", 0) or 0)
+    except ValueError:
+        length = -1
+    if length < 0:
+        return method, target, headers, _BAD_LENGTH
+    if length > MAX_BODY_SIZE:
+        return method, target, headers, _TOO_LARGE
+    body = await reader.readexactly(length) if length else b""
+    return method.upper(), target.split("?", 1)[0], headers, body
+
+
+def _write_response(writer, status, payload, keep_alive):
+    body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+    head = (f"HTTP/1.1 {status} {_REASONS.get(status, '')}\r\n"
+            "Content-Type: application/json; charset=utf-8\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+    writer.write(head.encode("latin-1") + body)
+
+
+async def serve(service, host="127.0.0.1", port=8765):
+    """Chạy máy chủ HTTP tới khi bị dừng"""
+    server = await asyncio.start_server(service.serve_connection, host, port)
+    addresses = ", ".join(str(sock.getsockname()) for sock in server.sockets)
+    print(f"Dịch vụ lập lộ trình đang chạy tại {addresses}", flush=True)
+    async with server:
+        await server.serve_forever()
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        description="Dịch vụ HTTP/JSON lập lộ trình du lịch Hà Nội")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--workers", type=int, default=0,
+                        help="Số tiến trình giải (0 = số lõi CPU)")
+    parser.add_argument("--max-concurrent", type=int, default=None,
+                        help="Số bài toán giải cùng lúc (mặc định: số tiến trình)")
+    parser.add_argument("--max-pending", type=int, default=64,
+                        help="Số truy vấn tối đa đang xử lý trước khi trả 503")
+    parser.add_argument("--request-timeout", type=float, default=10.0,
+                        help="Thời gian tối đa cho một truy vấn (giây)")
+    parser.add_argument("--max-time-budget", type=float, default=5.0,
+                        help="Thời gian giải tối đa cho một bài toán (giây)")
+    parser.add_argument("--backend", choices=DistanceMatrix.BACKENDS,
+                        default="dict", help="Backend ma trận khoảng cách")
+    parser.add_argument("--data", metavar="FILE",
+                        help="Kho dữ liệu địa điểm / khoảng cách (.json, "
+                             ".sqlite, .db, .fpds - xem data_store), mặc định "
+                             "bộ dữ liệu Hà Nội")
+    parser.add_argument("--table", metavar="FILE",
+                        help="Mở bảng khoảng cách lưu ở FILE bằng mmap (tính và "
+                             "ghi nếu chưa có hoặc đã cũ); nhiều tiến trình dùng "
+                             "chung một file")
+    return parser
+
+
+def main(argv=None):
+    """Entry point của dịch vụ"""
+    args = build_parser().parse_args(argv)
+    workers = args.workers if args.workers > 0 else default_workers()
+    store = open_store(args.data) if args.data else None
+    path_finder = PathFinder(LocationData(store), DistanceMatrix(args.backend, store),
+                             workers=workers, table_file=args.table)
+    service = PlanningService(path_finder, args.max_concurrent, args.max_pending,
+                              args.request_timeout, args.max_time_budget)
+    service.warm_up()
+    try:
+        asyncio.run(serve(service, args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        path_finder.close()
+
+
+if __name__ == "__main__":
+    main()
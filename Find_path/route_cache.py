@@ -0,0 +1,110 @@
+"""
+Module chứa bộ nhớ đệm LRU cho kết quả tìm đường
+"""
+import threading
+from collections import OrderedDict
+
+
+class RouteCache:
+    """Bộ nhớ đệm LRU kết quả tìm đường, tự xóa khi dữ liệu thay đổi"""
+
+    def __init__(self, max_size=128):
+        """
+        Khởi tạo bộ nhớ đệm
+
+        Args:
+            max_size: Số kết quả tối đa được giữ (0 = tắt bộ nhớ đệm)
+        """
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._version = None
+        # find_shortest_path_tsp có thể chạy trên luồng tìm đường của app
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(start_location, mandatory_locations, optional_locations,
+                 limit_km, engine="auto"):
+        """
+        Tạo khóa chuẩn hóa cho một truy vấn
+
+        Thứ tự chọn điểm không ảnh hưởng tới khóa; giới hạn km rỗng/0 được
+        coi như không giới hạn (giống find_shortest_path_tsp).
+
+        Returns:
+            tuple: (start, frozenset mandatory, frozenset optional, limit_km, engine)
+        """
+        return (start_location,
+                frozenset(mandatory_locations),
+                frozenset(optional_locations),
+                limit_km or None,
+                engine)
+
+    def get(self, key, version):
+        """
+        Lấy kết quả đã lưu
+
+        Args:
+            key: Khóa từ make_key
+            version: Phiên bản dữ liệu hiện tại; khác phiên bản đã lưu thì
+                     toàn bộ bộ nhớ đệm bị xóa
+
+        Returns:
+            Giá trị đã lưu hoặc None nếu không có
+        """
+        with self._lock:
+            if version != self._version:
+                self._entries.clear()
+                self._version = version
+
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value, version):
+        """Lưu kết quả, loại bỏ kết quả ít dùng nhất khi vượt kích thước"""
+        if self.max_size <= 0:
+            return
+
+        with self._lock:
+            if version != self._version:
+                self._entries.clear()
+                self._version = version
+
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        """Xóa toàn bộ kết quả và bộ đếm"""
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        """
+        Thống kê bộ nhớ đệm
+
+        Returns:
+            dict: size, max_size, hits, misses, hit_rate
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+    def __len__(self):
+        return len(self._entries)
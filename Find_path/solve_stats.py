@@ -0,0 +1,120 @@
+"""
+Module chứa số liệu đo của một lần tìm đường / kiểm tra điểm bắt buộc
+"""
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+
+class SolveStats:
+    """
+    Số liệu của một lần giải
+
+    Bộ đếm (counters):
+        dijkstra_calls: Số lần chạy Dijkstra (kể cả khi dựng bảng khoảng cách)
+        permutations: Số lộ trình hoàn chỉnh đã đánh giá
+        subsets: Số tập con / trạng thái (tập điểm đã đi, điểm hiện tại) đã mở
+        pruned_bound: Số nhánh / trạng thái bị cắt theo cận (không thể tốt hơn)
+        pruned_limit: Số nhánh / trạng thái bị cắt vì vượt giới hạn km
+        pruned_dominated: Số trạng thái bị bỏ vì đã gặp với quãng đường ngắn hơn
+        route_cache_hits: 1 nếu kết quả lấy từ bộ nhớ đệm kết quả
+        table_cache_hits: 1 nếu bảng khoảng cách đã có sẵn
+    """
+
+    COUNTERS = ("dijkstra_calls", "permutations", "subsets", "pruned_bound",
+                "pruned_limit", "pruned_dominated", "route_cache_hits",
+                "table_cache_hits")
+
+    def __init__(self, kind, track_memory=False):
+        """
+        Args:
+            kind: "route" (find_shortest_path_tsp), "feasibility"
+                  (check_mandatory_feasibility), "plan" (plan_route) hoặc
+                  "frontier" (get_coverage_frontier)
+            track_memory: Đo bộ nhớ đỉnh bằng tracemalloc (làm chậm bộ giải)
+        """
+        self.kind = kind
+        self.engine = None
+        self.counters = dict.fromkeys(self.COUNTERS, 0)
+        self.evaluated = 0  # Số ứng viên SearchMonitor đã đếm
+        self.phases = {}  # tên giai đoạn -> giây
+        self.wall_time = 0.0
+        self.peak_memory = None  # byte, chỉ khi track_memory
+        self._track_memory = track_memory
+        self._started_tracing = False
+        self._started = None
+
+    def start(self):
+        """Bắt đầu tính giờ (và đo bộ nhớ nếu bật)"""
+        self._started = time.perf_counter()
+        if self._track_memory:
+            if tracemalloc.is_tracing():
+                tracemalloc.reset_peak()
+            else:
+                tracemalloc.start()
+                self._started_tracing = True
+
+    def stop(self):
+        """Kết thúc tính giờ, ghi lại bộ nhớ đỉnh"""
+        self.wall_time = time.perf_counter() - self._started
+        if self._track_memory:
+            self.peak_memory = tracemalloc.get_traced_memory()[1]
+            if self._started_tracing:
+                tracemalloc.stop()
+                self._started_tracing = False
+
+    @contextmanager
+    def phase(self, name):
+        """Cộng thời gian của khối lệnh vào giai đoạn name"""
+        started = time.perf_counter()
+        try:
+            yield self
+        finally:
+            self.phases[name] = (self.phases.get(name, 0.0)
+                                 + time.perf_counter() - started)
+
+    def count(self, name, amount=1):
+        """Cộng amount vào bộ đếm name"""
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    def add_counters(self, counters):
+        """Cộng dồn một dict bộ đếm (vd. phần chênh lệch của SearchMonitor)"""
+        for name, amount in counters.items():
+            self.count(name, amount)
+
+    def as_dict(self):
+        """
+        Dạng dict (dùng để ghi log / gửi sang hệ thống giám sát)
+
+        Returns:
+            dict: kind, engine, wall_time, phases, counters, evaluated, peak_memory
+        """
+        return {
+            "kind": self.kind,
+            "engine": self.engine,
+            "wall_time": self.wall_time,
+            "phases": dict(self.phases),
+            "counters": dict(self.counters),
+            "evaluated": self.evaluated,
+            "peak_memory": self.peak_memory,
+        }
+
+    def summary_lines(self):
+        """Các dòng mô tả ngắn gọn để hiển thị trên giao diện"""
+        counters = self.counters
+        lines = [f"Bộ giải: {self.engine or '-'} - {self.wall_time * 1000:.1f} ms"]
+        if self.phases:
+            lines.append("Giai đoạn: " + ", ".join(
+                f"{name} {seconds * 1000:.1f} ms"
+                for name, seconds in self.phases.items()))
+        lines.append(f"Dijkstra: {counters['dijkstra_calls']}, "
+                     f"tập con: {counters['subsets']}, "
+                     f"lộ trình: {counters['permutations']}")
+        lines.append(f"Cắt nhánh: cận {counters['pruned_bound']}, "
+                     f"giới hạn km {counters['pruned_limit']}, "
+                     f"trùng {counters['pruned_dominated']}")
+        lines.append(f"Bộ nhớ đệm: kết quả {counters['route_cache_hits']}, "
+                     f"bảng khoảng cách {counters['table_cache_hits']}")
+        if self.peak_memory is not None:
+            lines.append(f"Bộ nhớ đỉnh: {self.peak_memory / 1024:.0f} KB")
+        return lines
@@ -0,0 +1,150 @@
+"""
+Module chứa chỉ mục không gian (KD-tree) trên tọa độ x/y của các địa điểm
+
+Cây được lưu ngầm trong 3 mảng theo thứ tự đã chia: phần tử giữa của mỗi đoạn
+[lo, hi) là nút, nửa trái / phải là 2 cây con, trục chia xen kẽ x / y theo độ
+sâu. Dựng một lần O(n log² n) khi dữ liệu thay đổi; điểm gần nhất / k điểm gần
+nhất trung bình O(log n), truy vấn theo bán kính / khung chỉ duyệt các nhánh
+giao với vùng hỏi.
+"""
+from array import array
+from heapq import heappush, heappushpop
+from math import hypot
+
+
+class SpatialIndex:
+    """KD-tree tĩnh trên các điểm {ID: (x, y)}"""
+
+    def __init__(self, points):
+        """
+        Dựng cây
+
+        Args:
+            points: Dict {ID: (x, y)} hoặc iterable các bộ (ID, x, y)
+        """
+        if isinstance(points, dict):
+            points = ((loc_id, x, y) for loc_id, (x, y) in points.items())
+        items = [(float(x), float(y), loc_id) for loc_id, x, y in points]
+
+        # Sắp xếp đoạn theo trục của độ sâu rồi chia đôi, dùng ngăn xếp
+        # thay cho đệ quy để không chạm giới hạn đệ quy với dữ liệu lớn
+        stack = [(0, len(items), 0)]
+        while stack:
+            lo, hi, axis = stack.pop()
+            if hi - lo <= 1:
+                continue
+            items[lo:hi] = sorted(items[lo:hi], key=lambda item: item[axis])
+            mid = (lo + hi) // 2
+            stack.append((lo, mid, 1 - axis))
+            stack.append((mid + 1, hi, 1 - axis))
+
+        self.xs = array('d', (item[0] for item in items))
+        self.ys = array('d', (item[1] for item in items))
+        self.ids = [item[2] for item in items]
+
+    def __len__(self):
+        return len(self.ids)
+
+    def nearest(self, x, y, max_distance=None):
+        """
+        Điểm gần (x, y) nhất
+
+        Args:
+            max_distance: Chỉ xét các điểm cách không quá giá trị này
+
+        Returns:
+            tuple: (ID, khoảng cách) hoặc None nếu không có điểm nào
+        """
+        found = self.k_nearest(x, y, 1, max_distance)
+        return found[0] if found else None
+
+    def k_nearest(self, x, y, k, max_distance=None):
+        """
+        k điểm gần (x, y) nhất
+
+        Returns:
+            list: Các bộ (ID, khoảng cách) theo khoảng cách tăng dần
+        """
+        if k <= 0:
+            return []
+        xs, ys = self.xs, self.ys
+        # Max-heap (khoảng cách âm) của k điểm tốt nhất; radius = cận hiện tại
+        best = []
+        radius = float('inf') if max_distance is None else max_distance
+        # Mỗi nhánh kèm khoảng cách từ (x, y) tới mặt phẳng chia của nó, xét
+        # lại khi lấy ra vì bán kính có thể đã nhỏ đi
+        stack = [(0, len(self.ids), 0, 0.0)]
+        while stack:
+            lo, hi, axis, gap = stack.pop()
+            if lo >= hi or gap > radius:
+                continue
+            mid = (lo + hi) // 2
+            distance = hypot(xs[mid] - x, ys[mid] - y)
+            if distance <= radius:
+                if len(best) < k:
+                    heappush(best, (-distance, mid))
+                else:
+                    heappushpop(best, (-distance, mid))
+                if len(best) == k:
+                    radius = min(radius, -best[0][0])
+            delta = (x - xs[mid]) if axis == 0 else (y - ys[mid])
+            near, far = (((lo, mid), (mid + 1, hi)) if delta < 0
+                         else ((mid + 1, hi), (lo, mid)))
+            # Đẩy nhánh xa trước để nhánh gần được duyệt trước
+            stack.append((far[0], far[1], 1 - axis, abs(delta)))
+            stack.append((near[0], near[1], 1 - axis, 0.0))
+        return [(self.ids[i], -negative)
+                for negative, i in sorted(best, key=lambda item: (-item[0], item[1]))]
+
+    def within_radius(self, x, y, radius):
+        """
+        Các điểm cách (x, y) không quá radius
+
+        Returns:
+            list: Các bộ (ID, khoảng cách) theo khoảng cách tăng dần
+        """
+        xs, ys = self.xs, self.ys
+        found = []
+        stack = [(0, len(self.ids), 0)]
+        while stack:
+            lo, hi, axis = stack.pop()
+            if lo >= hi:
+                continue
+            mid = (lo + hi) // 2
+            distance = hypot(xs[mid] - x, ys[mid] - y)
+            if distance <= radius:
+                found.append((distance, mid))
+            delta = (x - xs[mid]) if axis == 0 else (y - ys[mid])
+            if delta >= -radius:
+                stack.append((mid + 1, hi, 1 - axis))
+            if delta <= radius:
+                stack.append((lo, mid, 1 - axis))
+        found.sort()
+        return [(self.ids[i], distance) for distance, i in found]
+
+    def in_box(self, x1, y1, x2, y2):
+        """
+        Các điểm nằm trong khung chữ nhật (kể cả trên cạnh)
+
+        Returns:
+            list: ID các điểm (không theo thứ tự cụ thể)
+        """
+        low = (min(x1, x2), min(y1, y2))
+        high = (max(x1, x2), max(y1, y2))
+        xs, ys = self.xs, self.ys
+        found = []
+        stack = [(0, len(self.ids), 0)]
+        while stack:
+            lo, hi, axis = stack.pop()
+            if lo >= hi:
+                continue
+            mid = (lo + hi) // 2
+            x, y = xs[mid], ys[mid]
+            if low[0] <= x <= high[0] and low[1] <= y <= high[1]:
+                found.append(self.ids[mid])
+            value = x if axis == 0 else y
+            if value <= high[axis]:
+                stack.append((mid + 1, hi, 1 - axis))
+            if value >= low[axis]:
+                stack.append((lo, mid, 1 - axis))
+        return found
@@ -0,0 +1,138 @@
+"""
+Module chứa định dạng file nhị phân của bảng đường đi ngắn nhất
+
+File được mở bằng mmap (chỉ đọc): ma trận khoảng cách và ma trận bước kế tiếp
+được đọc thẳng từ các trang của file khi truy vấn tới, không phải phân tích
+hay sao chép. Nhiều tiến trình mở cùng một file dùng chung các trang đó trong
+page cache của hệ điều hành, nên khởi động với bảng lớn gần như tức thì.
+
+Định dạng: header (magic, phiên bản định dạng, số điểm, độ dài danh sách ID,
+dấu vân tay đồ thị nguồn), danh sách ID dạng JSON, đệm tới bội số 8 byte rồi
+ma trận khoảng cách n x n ('d', theo hàng) và ma trận bước kế tiếp n x n ('i').
+Dấu vân tay (contraction.graph_fingerprint) cho biết file đã cũ so với
+DistanceMatrix hiện tại.
+"""
+import json
+import mmap
+import os
+import struct
+from array import array
+
+
+MAGIC = b"FPST"
+# Phiên bản 2: khoảng cách cộng theo chiều đi (ShortestPathTable.from_graph),
+# file cũ có thể lệch vài ulp nên được tính lại
+FORMAT_VERSION = 2
+_HEADER = struct.Struct("<4sIIII")
+
+
+def _data_offset(ids_length):
+    """Vị trí bắt đầu ma trận khoảng cách (căn theo 8 byte)"""
+    return (_HEADER.size + ids_length + 7) // 8 * 8
+
+
+def save_table(table, path, fingerprint):
+    """
+    Ghi ShortestPathTable ra file
+
+    Ghi vào file tạm rồi đổi tên nên tiến trình khác đang mở file cũ vẫn đọc
+    được bản cũ cho tới khi mở lại.
+
+    Args:
+        table: ShortestPathTable (dist / successor dạng list of list)
+        path: File đích
+        fingerprint: Dấu vân tay đồ thị nguồn (contraction.graph_fingerprint)
+    """
+    ids = json.dumps(list(table.ids), ensure_ascii=False).encode("utf-8")
+    offset = _data_offset(len(ids))
+    temporary = f"{path}.{os.getpid()}.tmp"
+    with open(temporary, "wb") as f:
+        f.write(_HEADER.pack(MAGIC, FORMAT_VERSION, len(table.ids), len(ids),
+                             fingerprint))
+        f.write(ids)
+        f.write(bytes(offset - _HEADER.size - len(ids)))
+        for row in table.dist:
+            array('d', row).tofile(f)
+        for row in table.successor:
+            array('i', row).tofile(f)
+    os.replace(temporary, path)
+
+
+class MappedPathTable:
+    """
+    Bảng đường đi ngắn nhất đọc từ file qua mmap, cùng giao diện tra cứu với
+    ShortestPathTable (distance / path / submatrix)
+
+    dist và successor là memoryview phẳng: phần tử (i, j) ở vị trí i * n + j.
+    """
+
+    def __init__(self, path):
+        """
+        Mở file do save_table ghi
+
+        Raises:
+            ValueError: File không đúng định dạng, khác phiên bản hoặc bị cắt cụt
+        """
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            self._open(path)
+        except ValueError:
+            self._mmap.close()
+            raise
+
+    def _open(self, path):
+        buffer = self._mmap
+        if len(buffer) < _HEADER.size:
+            raise ValueError(f"File bảng khoảng cách không hợp lệ: {path}")
+        magic, version, n, ids_length, fingerprint = _HEADER.unpack_from(buffer)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise ValueError(f"File bảng khoảng cách không hợp lệ: {path}")
+        offset = _data_offset(ids_length)
+        middle = offset + 8 * n * n
+        if len(buffer) != middle + 4 * n * n:
+            raise ValueError(f"File bảng khoảng cách bị cắt cụt: {path}")
+
+        self.filename = path
+        self.fingerprint = fingerprint
+        self.size = n
+        self.ids = json.loads(buffer[_HEADER.size:_HEADER.size + ids_length]
+                              .decode("utf-8"))
+        self.index = {loc_id: i for i, loc_id in enumerate(self.ids)}
+        view = memoryview(buffer)
+        self.dist = view[offset:middle].cast('d')
+        self.successor = view[middle:].cast('i')
+
+    def close(self):
+        """Giải phóng ánh xạ bộ nhớ (bảng không dùng được nữa)"""
+        self.dist.release()
+        self.successor.release()
+        self._mmap.close()
+
+    def distance(self, loc1, loc2):
+        """Khoảng cách ngắn nhất giữa 2 địa điểm (INF nếu không tới được)"""
+        return self.dist[self.index[loc1] * self.size + self.index[loc2]]
+
+    def path(self, loc1, loc2):
+        """
+        Dựng lại đường đi ngắn nhất theo bảng bước kế tiếp
+
+        Returns:
+            list: Các địa điểm trên đường đi ([] nếu không tới được)
+        """
+        n, successor = self.size, self.successor
+        i, j = self.index[loc1], self.index[loc2]
+        if successor[i * n + j] == -1:
+            return []
+        path = [self.ids[i]]
+        while i != j:
+            i = successor[i * n + j]
+            path.append(self.ids[i])
+        return path
+
+    def submatrix(self, stops):
+        """Ma trận khoảng cách giữa các điểm trong stops (theo thứ tự stops)"""
+        n, dist = self.size, self.dist
+        columns = [self.index[loc] for loc in stops]
+        return [[dist[i * n + j] for j in columns] for i in columns]
+
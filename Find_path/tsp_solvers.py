@@ -0,0 +1,1409 @@
+"""
+Module chứa các bộ giải bài toán lộ trình trên ma trận khoảng cách đã chỉ số hóa
+"""
+import math
+import random
+import threading
+import time
+from operator import add
+
+INF = float('inf')
+
+# Thời gian tìm kiếm mặc định (giây) của bộ giải heuristic
+DEFAULT_TIME_BUDGET = 2.0
+
+# Số nút duyệt giữa 2 lần đọc cận dùng chung khi tìm song song
+SHARED_REFRESH = 64
+
+# Thời gian tối đa (giây) cho bước cải thiện cục bộ khi khởi động ấm
+WARM_START_BUDGET = 0.05
+
+
+class SearchCancelled(Exception):
+    """Tìm kiếm bị hủy giữa chừng"""
+
+
+class SearchMonitor:
+    """Theo dõi tiến độ và nhận yêu cầu hủy của một lần tìm kiếm"""
+
+    # Số ứng viên giữa hai lần kiểm tra hủy / báo tiến độ
+    CHECK_EVERY = 256
+
+    def __init__(self, on_progress=None, interval=0.2):
+        """
+        Khởi tạo monitor
+
+        Args:
+            on_progress: Hàm gọi định kỳ on_progress(monitor), chạy trên luồng
+                         đang giải (không phải luồng giao diện)
+            interval: Khoảng cách tối thiểu giữa hai lần báo tiến độ (giây)
+        """
+        self.on_progress = on_progress
+        self.interval = interval
+        self.cancel_event = threading.Event()
+        self.evaluated = 0
+        self.best_distance = INF
+        self.cancelled = False
+        # Bộ đếm của bộ giải (xem solve_stats.SolveStats), cộng dồn qua record
+        self.counters = {}
+        self.started = time.perf_counter()
+        self._countdown = self.CHECK_EVERY
+        self._next_report = self.started + interval
+
+    @property
+    def elapsed(self):
+        """Thời gian đã chạy (giây)"""
+        return time.perf_counter() - self.started
+
+    def cancel(self):
+        """Yêu cầu dừng tìm kiếm (gọi được từ luồng khác)"""
+        self.cancel_event.set()
+
+    def set_best(self, distance):
+        """Ghi nhận quãng đường của lời giải tốt nhất hiện tại"""
+        self.best_distance = distance
+
+    def record(self, **counts):
+        """Cộng các bộ đếm của bộ giải (gọi một lần khi bộ giải kết thúc)"""
+        for name, amount in counts.items():
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def tick(self, count=1):
+        """Đếm thêm ứng viên đã xét, thỉnh thoảng kiểm tra hủy và báo tiến độ"""
+        self.evaluated += count
+        self._countdown -= count
+        if self._countdown <= 0:
+            self._countdown = self.CHECK_EVERY
+            self.poll()
+
+    def poll(self):
+        """
+        Kiểm tra hủy và báo tiến độ nếu tới lúc
+
+        Raises:
+            SearchCancelled: Nếu đã có yêu cầu hủy
+        """
+        if self.cancel_event.is_set():
+            self.cancelled = True
+            raise SearchCancelled()
+        if self.on_progress is not None:
+            now = time.perf_counter()
+            if now >= self._next_report:
+                self._next_report = now + self.interval
+                self.on_progress(self)
+
+
+class TourProblem:
+    """Mô tả một bài toán lộ trình (đường đi mở, không quay về điểm đầu)"""
+
+    def __init__(self, dist, start=None, mandatory=(), limit=None):
+        """
+        Khởi tạo bài toán
+
+        Args:
+            dist: Ma trận khoảng cách k x k (list of list), INF nếu không tới được
+            start: Chỉ số điểm bắt đầu cố định (None = tự do)
+            mandatory: Các chỉ số BẮT BUỘC phải đi qua
+            limit: Giới hạn km (None hoặc 0 = không giới hạn)
+        """
+        self.dist = dist
+        self.size = len(dist)
+        self.start = start
+        self.mandatory = set(mandatory)
+        if start is not None:
+            self.mandatory.add(start)
+        self.limit = limit
+        self.optional = [i for i in range(self.size) if i not in self.mandatory]
+
+    def is_better(self, count, distance, best_count, best_distance):
+        """So sánh (số điểm tùy chọn nhiều hơn, rồi quãng đường ngắn hơn)"""
+        if count != best_count:
+            return count > best_count
+        return distance < best_distance
+
+    def within_limit(self, distance):
+        """Kiểm tra quãng đường có nằm trong giới hạn km không"""
+        return distance < INF and (not self.limit or distance <= self.limit)
+
+
+def path_length(dist, order):
+    """Tính tổng quãng đường theo thứ tự các chỉ số"""
+    total = 0
+    for i in range(len(order) - 1):
+        total += dist[order[i]][order[i + 1]]
+    return total
+
+
+def nearest_neighbour_order(dist, nodes, start=None):
+    """
+    Dựng lộ trình tham lam: luôn đi tới điểm gần nhất chưa thăm
+
+    Args:
+        dist: Ma trận khoảng cách
+        nodes: Các chỉ số cần đi qua
+        start: Chỉ số điểm bắt đầu (None = bắt đầu từ điểm đầu tiên của nodes)
+
+    Returns:
+        list: Thứ tự các chỉ số
+    """
+    remaining = [node for node in nodes if node != start]
+    if start is None:
+        if not remaining:
+            return []
+        start = remaining.pop(0)
+    order = [start]
+    while remaining:
+        current = order[-1]
+        nearest = min(remaining, key=lambda node: dist[current][node])
+        remaining.remove(nearest)
+        order.append(nearest)
+    return order
+
+
+def two_opt(dist, order, fixed_start=True, deadline=None):
+    """
+    Cải thiện đường đi mở bằng cách đảo ngược các đoạn (2-opt)
+
+    Args:
+        dist: Ma trận khoảng cách (đối xứng)
+        order: Thứ tự ban đầu (không bị sửa)
+        fixed_start: Giữ nguyên điểm đầu tiên
+        deadline: Mốc time.perf_counter() phải dừng (None = chạy tới hội tụ)
+
+    Returns:
+        list: Thứ tự đã cải thiện
+    """
+    order = list(order)
+    n = len(order)
+    first = 1 if fixed_start else 0
+    improved = True
+    while improved:
+        improved = False
+        for i in range(first, n - 1):
+            if deadline is not None and time.perf_counter() >= deadline:
+                return order
+            for k in range(i + 1, n):
+                # Cạnh bị thay: (order[i-1], order[i]) và (order[k], order[k+1])
+                before = after = 0
+                if i > 0:
+                    before += dist[order[i - 1]][order[i]]
+                    after += dist[order[i - 1]][order[k]]
+                if k < n - 1:
+                    before += dist[order[k]][order[k + 1]]
+                    after += dist[order[i]][order[k + 1]]
+                if after < before - 1e-12:
+                    order[i:k + 1] = reversed(order[i:k + 1])
+                    improved = True
+    return order
+
+
+def or_opt(dist, order, fixed_start=True, deadline=None):
+    """
+    Cải thiện đường đi mở bằng cách chuyển các đoạn 1-3 điểm sang vị trí khác
+
+    Args:
+        dist: Ma trận khoảng cách (đối xứng)
+        order: Thứ tự ban đầu (không bị sửa)
+        fixed_start: Giữ nguyên điểm đầu tiên
+        deadline: Mốc time.perf_counter() phải dừng (None = chạy tới hội tụ)
+
+    Returns:
+        list: Thứ tự đã cải thiện
+    """
+    def edge(u, v):
+        return 0 if u is None or v is None else dist[u][v]
+
+    order = list(order)
+    first = 1 if fixed_start else 0
+    improved = True
+    while improved:
+        improved = False
+        for length in (1, 2, 3):
+            i = first
+            while i + length <= len(order):
+                if deadline is not None and time.perf_counter() >= deadline:
+                    return order
+                n = len(order)
+                head, tail = order[i], order[i + length - 1]
+                before = order[i - 1] if i > 0 else None
+                after = order[i + length] if i + length < n else None
+                # Lợi ích khi gỡ đoạn ra khỏi vị trí hiện tại
+                gain = edge(before, head) + edge(tail, after) - edge(before, after)
+                rest = order[:i] + order[i + length:]
+                best = None
+                best_cost = gain - 1e-12
+                for pos in range(first, len(rest) + 1):
+                    if pos == i:
+                        continue
+                    x = rest[pos - 1] if pos > 0 else None
+                    y = rest[pos] if pos < len(rest) else None
+                    for reverse in (False, True):
+                        h, t = (tail, head) if reverse else (head, tail)
+                        cost = edge(x, h) + edge(t, y) - edge(x, y)
+                        if cost < best_cost:
+                            best, best_cost = (pos, reverse), cost
+                if best is not None:
+                    pos, reverse = best
+                    segment = order[i:i + length]
+                    if reverse:
+                        segment.reverse()
+                    order = rest[:pos] + segment + rest[pos:]
+                    improved = True
+                i += 1
+    return order
+
+
+def improve_order(dist, order, fixed_start=True, deadline=None):
+    """Kết hợp 2-opt và Or-opt cho tới khi không cải thiện được nữa (hoặc hết giờ)"""
+    best = list(order)
+    best_distance = path_length(dist, best)
+    while True:
+        candidate = or_opt(dist, two_opt(dist, best, fixed_start, deadline),
+                           fixed_start, deadline)
+        candidate_distance = path_length(dist, candidate)
+        if candidate_distance >= best_distance - 1e-12:
+            return best
+        best, best_distance = candidate, candidate_distance
+        if deadline is not None and time.perf_counter() >= deadline:
+            return best
+
+
+def insertion_order(dist, nodes, start=None):
+    """
+    Dựng lộ trình bằng phép chèn, O(k^2)
+
+    Mỗi bước lấy điểm gần lộ trình hiện tại nhất và chèn vào vị trí làm
+    quãng đường tăng ít nhất.
+
+    Args:
+        dist: Ma trận khoảng cách
+        nodes: Các chỉ số cần đi qua
+        start: Chỉ số điểm bắt đầu (None = bắt đầu từ điểm đầu tiên của nodes)
+
+    Returns:
+        list: Thứ tự các chỉ số
+    """
+    remaining = [node for node in nodes if node != start]
+    if start is None:
+        if not remaining:
+            return []
+        start = remaining.pop(0)
+    order = [start]
+    closest = {node: dist[start][node] for node in remaining}
+    first = 1 if start is not None else 0
+    while closest:
+        node = min(closest, key=closest.get)
+        del closest[node]
+        best_cost, best_pos = INF, len(order)
+        for pos in range(first, len(order) + 1):
+            before = dist[order[pos - 1]][node] if pos > 0 else 0
+            after = dist[node][order[pos]] if pos < len(order) else 0
+            removed = dist[order[pos - 1]][order[pos]] if 0 < pos < len(order) else 0
+            if before + after - removed < best_cost:
+                best_cost, best_pos = before + after - removed, pos
+        order.insert(best_pos, node)
+        row = dist[node]
+        for other in closest:
+            if row[other] < closest[other]:
+                closest[other] = row[other]
+    return order
+
+
+def initial_tour(dist, nodes, start=None):
+    """
+    Lộ trình ban đầu tốt nhất từ nhiều lần dựng tham lam + cải thiện cục bộ
+
+    Với điểm bắt đầu cố định, thử lần lượt từng điểm làm bước đi đầu tiên;
+    nếu không, thử lần lượt từng điểm làm điểm xuất phát.
+
+    Args:
+        dist: Ma trận khoảng cách
+        nodes: Các chỉ số cần đi qua (bao gồm start nếu có)
+        start: Chỉ số điểm bắt đầu cố định
+
+    Returns:
+        list: Thứ tự các chỉ số
+    """
+    others = [node for node in nodes if node != start]
+    best = []
+    best_distance = INF
+    for first in others or [None]:
+        if start is None:
+            order = nearest_neighbour_order(
+                dist, [first] + [node for node in others if node != first])
+        elif first is None:
+            order = [start]
+        else:
+            order = [start] + nearest_neighbour_order(dist, others, first)
+        order = improve_order(dist, order, fixed_start=start is not None)
+        distance = path_length(dist, order)
+        if not best or distance < best_distance:
+            best, best_distance = order, distance
+    return best
+
+
+def held_karp(problem, monitor=None, incumbent=None):
+    """
+    Quy hoạch động trên tập con (Held-Karp) cho đường đi mở
+
+    Một lần DP cho ra quãng đường ngắn nhất của MỌI tập con chứa các điểm
+    bắt buộc, nên trường hợp có giới hạn km chỉ cần chọn tập con có nhiều
+    điểm tùy chọn nhất nằm trong giới hạn (hòa thì lấy quãng đường ngắn hơn).
+    Nếu bị hủy giữa chừng, trả về lộ trình heuristic ban đầu.
+
+    Args:
+        problem: TourProblem
+        monitor: SearchMonitor (tùy chọn)
+        incumbent: (order, distance) một lộ trình hợp lệ đã biết (vd. từ
+                   warm_start), dùng làm cận trên nếu tốt hơn lộ trình ban đầu
+
+    Returns:
+        tuple: (order, distance) - thứ tự các chỉ số và tổng quãng đường,
+               ([], INF) nếu không có lộ trình hợp lệ
+    """
+    dist = problem.dist
+    start = problem.start
+
+    # Các điểm tham gia DP (điểm bắt đầu cố định nằm ngoài bitmask)
+    nodes = [i for i in range(problem.size) if i != start]
+    m = len(nodes)
+    if m == 0:
+        return ([start], 0) if start is not None else ([], INF)
+
+    required = 0
+    optional_mask = 0
+    for j, node in enumerate(nodes):
+        if node in problem.mandatory:
+            required |= 1 << j
+        else:
+            optional_mask |= 1 << j
+
+    # col[j][i] = khoảng cách từ nodes[i] đến nodes[j]
+    col = [[dist[nodes[i]][nodes[j]] for i in range(m)] for j in range(m)]
+
+    # Ngưỡng cắt tỉa trạng thái: nếu đi được hết mọi điểm trong giới hạn thì
+    # bài toán chỉ còn là tìm đường ngắn nhất qua tất cả, dùng một lộ trình
+    # heuristic làm cận trên; ngược lại chỉ cắt theo giới hạn km.
+    everything = ([start] if start is not None else []) + nodes
+    tour = initial_tour(dist, everything, start)
+    upper = path_length(dist, tour)
+    if incumbent is not None and len(incumbent[0]) == problem.size \
+            and incumbent[1] < upper:
+        tour, upper = list(incumbent[0]), incumbent[1]
+    full = 1 << m
+    remaining_bound = [0] * full
+    exit_bound = [0] * m
+    if monitor is not None and problem.within_limit(upper):
+        monitor.set_best(upper)
+    if problem.within_limit(upper):
+        threshold = upper + 1e-9
+        # Cận dưới cho phần còn lại: mỗi cạnh chạm hai đầu mút, mỗi điểm chưa
+        # thăm có hai cạnh (trừ điểm cuối) nên tổng ít nhất bằng nửa tổng hai
+        # cạnh ngắn nhất của chúng, cộng nửa cạnh ngắn nhất rời điểm hiện tại.
+        # Điểm bắt đầu đã đi qua nên không thể kề với điểm chưa thăm.
+        nearest = []
+        for u in nodes:
+            edges = sorted(dist[u][v] for v in nodes if v != u)
+            edges += [0, 0]
+            nearest.append((edges[0], edges[1]))
+        exit_bound = [a1 / 2 for a1, _ in nearest]
+        pair_sum = [a1 + a2 for a1, a2 in nearest]
+        second = [a2 for _, a2 in nearest]
+        largest_second = [0] * full
+        for mask in range(1, full):
+            low = mask & -mask
+            j = low.bit_length() - 1
+            largest_second[mask] = max(largest_second[mask ^ low], second[j])
+        unvisited_sum = [0] * full
+        unvisited_sum[0] = sum(pair_sum)
+        for mask in range(1, full):
+            low = mask & -mask
+            unvisited_sum[mask] = (unvisited_sum[mask ^ low]
+                                   - pair_sum[low.bit_length() - 1])
+        for mask in range(full):
+            unvisited = full - 1 - mask
+            if unvisited:
+                remaining_bound[mask] = (unvisited_sum[mask]
+                                         - largest_second[unvisited]) / 2
+    else:
+        threshold = problem.limit if problem.limit else INF
+    # Trạng thái bị cắt theo cận trên heuristic hay theo giới hạn km
+    prune_counter = "pruned_bound" if problem.within_limit(upper) else "pruned_limit"
+    expanded = pruned = 0
+
+    # dp[mask][j]: quãng đường ngắn nhất đi qua đúng các điểm trong mask và
+    # kết thúc tại nodes[j]; None nếu mọi trạng thái của mask đã bị cắt tỉa
+    dp = [None] * full
+    # reachable[mask]: mask có ít nhất một tập con trực tiếp còn sống
+    reachable = bytearray(full)
+    for j in range(m):
+        reachable[1 << j] = 1
+    try:
+        for mask in range(1, full):
+            if not reachable[mask]:
+                continue
+            if monitor is not None:
+                monitor.tick()
+            expanded += 1
+            row = [INF] * m
+            bound = threshold - remaining_bound[mask]
+            alive = False
+            bits = mask
+            while bits:
+                low = bits & -bits
+                j = low.bit_length() - 1
+                prev = mask ^ low
+                if prev:
+                    prev_row = dp[prev]
+                    value = INF if prev_row is None else min(map(add, prev_row, col[j]))
+                elif start is not None:
+                    value = dist[start][nodes[j]]
+                else:
+                    value = 0
+                if value + (exit_bound[j] if mask != full - 1 else 0) <= bound:
+                    row[j] = value
+                    alive = True
+                else:
+                    pruned += 1
+                bits ^= low
+            if alive:
+                dp[mask] = row
+                unvisited = full - 1 - mask
+                while unvisited:
+                    low = unvisited & -unvisited
+                    reachable[mask | low] = 1
+                    unvisited ^= low
+    except SearchCancelled:
+        if problem.within_limit(upper):
+            return tour, upper
+        return greedy_orienteering(problem)
+    finally:
+        if monitor is not None:
+            monitor.record(subsets=expanded, **{prune_counter: pruned})
+
+    # Chọn tập con tốt nhất chứa đủ điểm bắt buộc
+    best_mask = None
+    best_count = -1
+    best_distance = INF
+    for mask in range(full):
+        if mask & required != required:
+            continue
+        if mask == 0:
+            if start is None:
+                continue
+            distance = 0
+        elif dp[mask] is None:
+            continue
+        else:
+            distance = min(dp[mask])
+        if not problem.within_limit(distance):
+            continue
+        count = bin(mask & optional_mask).count("1")
+        if problem.is_better(count, distance, best_count, best_distance):
+            best_mask, best_count, best_distance = mask, count, distance
+
+    if best_mask is None:
+        return [], INF
+
+    return _trace_subset(dp, col, nodes, best_mask, start), best_distance
+
+
+def _trace_subset(dp, col, nodes, mask, start):
+    """Truy vết ngược thứ tự các điểm của tập con mask trong bảng DP Held-Karp"""
+    order = []
+    if mask:
+        m = len(nodes)
+        row = dp[mask]
+        j = min(range(m), key=row.__getitem__)
+        while True:
+            order.append(nodes[j])
+            prev = mask ^ (1 << j)
+            if not prev:
+                break
+            target = dp[mask][j]
+            prev_row = dp[prev]
+            col_j = col[j]
+            j = next(i for i in range(m) if prev_row[i] + col_j[i] == target)
+            mask = prev
+    if start is not None:
+        order.append(start)
+    order.reverse()
+    return order
+
+
+def coverage_frontier(problem, monitor=None):
+    """
+    Biên Pareto giữa số điểm tùy chọn đi được và quãng đường ngắn nhất
+
+    Chạy Held-Karp trên MỌI tập con (không cắt tỉa, bỏ qua problem.limit) rồi
+    lấy với mỗi số điểm tùy chọn k tập con chứa đủ điểm bắt buộc có quãng
+    đường ngắn nhất. Điểm nào không ngắn hơn mọi điểm có k lớn hơn thì bị bỏ,
+    nên với giới hạn km bất kỳ, lời giải tối ưu (nhiều điểm tùy chọn nhất,
+    rồi ngắn nhất - như held_karp) là điểm cuối cùng của biên nằm trong giới
+    hạn. Chi phí O(2^n * n^2) bất kể giới hạn, chỉ nên dùng với ít điểm.
+
+    Các tập con được tính theo thứ tự tăng dần và mỗi tập chỉ phụ thuộc các
+    tập nhỏ hơn nó, nên nếu bị hủy giữa chừng (monitor.cancelled) thì biên
+    trả về lấy từ các tập con đã tính xong: mỗi điểm vẫn là một lộ trình hợp
+    lệ, tốt nhất trong phần đã xét nhưng chưa chắc tối ưu.
+
+    Args:
+        problem: TourProblem
+        monitor: SearchMonitor (tùy chọn)
+
+    Returns:
+        list: Các bộ (số điểm tùy chọn, quãng đường, order) theo số điểm và
+              quãng đường tăng dần; [] nếu không có lộ trình nào
+    """
+    dist = problem.dist
+    start = problem.start
+
+    nodes = [i for i in range(problem.size) if i != start]
+    m = len(nodes)
+    if m == 0:
+        return [(0, 0, [start])] if start is not None else []
+
+    required = 0
+    optional_mask = 0
+    for j, node in enumerate(nodes):
+        if node in problem.mandatory:
+            required |= 1 << j
+        else:
+            optional_mask |= 1 << j
+
+    col = [[dist[nodes[i]][nodes[j]] for i in range(m)] for j in range(m)]
+    full = 1 << m
+    dp = [None] * full
+    # Các tập con 0..computed-1 đã có trong dp
+    computed = full
+    try:
+        for mask in range(1, full):
+            if monitor is not None:
+                monitor.tick()
+            row = [INF] * m
+            bits = mask
+            while bits:
+                low = bits & -bits
+                j = low.bit_length() - 1
+                prev = mask ^ low
+                if prev:
+                    row[j] = min(map(add, dp[prev], col[j]))
+                elif start is not None:
+                    row[j] = dist[start][nodes[j]]
+                else:
+                    row[j] = 0
+                bits ^= low
+            dp[mask] = row
+    except SearchCancelled:
+        computed = mask
+    finally:
+        if monitor is not None:
+            monitor.record(subsets=computed - 1)
+
+    # best[k] = (quãng đường, mask) ngắn nhất với k điểm tùy chọn
+    best = {}
+    for mask in range(computed):
+        if mask & required != required:
+            continue
+        if mask == 0:
+            if start is None:
+                continue
+            distance = 0
+        else:
+            distance = min(dp[mask])
+        if distance == INF:
+            continue
+        count = bin(mask & optional_mask).count("1")
+        if count not in best or distance < best[count][0]:
+            best[count] = (distance, mask)
+
+    frontier = []
+    shortest = INF
+    for count in sorted(best, reverse=True):
+        distance, mask = best[count]
+        if distance < shortest:
+            shortest = distance
+            frontier.append((count, distance,
+                             _trace_subset(dp, col, nodes, mask, start)))
+    frontier.reverse()
+    return frontier
+
+
+def spanning_tree_weight(dist, nodes):
+    """
+    Trọng số cây khung nhỏ nhất (Prim, O(k^2)) trên các điểm cho trước
+
+    Mọi đường đi qua hết các điểm đều là một cây khung nên đây là cận dưới
+    cho quãng đường đi qua chúng.
+
+    Args:
+        dist: Ma trận khoảng cách
+        nodes: Các chỉ số
+
+    Returns:
+        float: Tổng trọng số (INF nếu các điểm không liên thông)
+    """
+    nodes = list(nodes)
+    if len(nodes) < 2:
+        return 0
+    first = nodes[0]
+    remaining = {node: dist[first][node] for node in nodes[1:]}
+    total = 0
+    while remaining:
+        node = min(remaining, key=remaining.get)
+        total += remaining.pop(node)
+        if total == INF:
+            return INF
+        row = dist[node]
+        for other in remaining:
+            if row[other] < remaining[other]:
+                remaining[other] = row[other]
+    return total
+
+
+def shortest_covering_path(dist, monitor=None):
+    """
+    Đường đi ngắn nhất qua tất cả các điểm, không cố định điểm đầu
+
+    Duyệt sâu, điểm gần trước, xuất phát từ lời giải của initial_tour. Một
+    nhánh bị cắt khi quãng đường + cây khung nhỏ nhất qua điểm hiện tại và các
+    điểm còn lại không ngắn hơn lời giải tốt nhất, hoặc khi cùng tập điểm đã đi
+    và cùng điểm hiện tại đã từng gặp với quãng đường ngắn hơn.
+    Nếu bị hủy giữa chừng, trả về lời giải tốt nhất đã tìm được.
+
+    Args:
+        dist: Ma trận khoảng cách
+        monitor: SearchMonitor (tùy chọn)
+
+    Returns:
+        tuple: (order, distance) hoặc ([], INF) nếu các điểm không liên thông
+    """
+    size = len(dist)
+    everything = list(range(size))
+    if size < 2:
+        return everything, 0
+
+    best_order = initial_tour(dist, everything)
+    best_distance = path_length(dist, best_order)
+    if best_distance == INF:
+        best_order = []
+    elif monitor is not None:
+        monitor.set_best(best_distance)
+
+    neighbours = [sorted((j for j in range(size) if j != i and dist[i][j] < INF),
+                         key=dist[i].__getitem__)
+                  for i in range(size)]
+    full = (1 << size) - 1
+    seen = {}
+    path = []
+    expanded = complete = bounded = dominated = 0
+
+    def search(current, mask, distance):
+        nonlocal best_order, best_distance, expanded, complete, bounded, dominated
+
+        if mask == full:
+            complete += 1
+            if distance < best_distance:
+                best_order, best_distance = list(path), distance
+                if monitor is not None:
+                    monitor.set_best(distance)
+            return
+
+        key = (mask, current)
+        if seen.get(key, INF) <= distance:
+            dominated += 1
+            return
+        seen[key] = distance
+        if monitor is not None:
+            monitor.tick()
+        expanded += 1
+
+        remaining = [node for node in everything if not mask >> node & 1]
+        if distance + spanning_tree_weight(dist, [current] + remaining) >= best_distance:
+            bounded += 1
+            return
+
+        row = dist[current]
+        for node in neighbours[current]:
+            if mask >> node & 1:
+                continue
+            if distance + row[node] >= best_distance:
+                bounded += 1
+                continue
+            path.append(node)
+            search(node, mask | 1 << node, distance + row[node])
+            path.pop()
+
+    try:
+        for root in everything:
+            path[:] = [root]
+            search(root, 1 << root, 0)
+    except SearchCancelled:
+        pass
+    if monitor is not None:
+        monitor.record(subsets=expanded, permutations=complete,
+                       pruned_bound=bounded, pruned_dominated=dominated)
+
+    if not best_order:
+        return [], INF
+    return best_order, best_distance
+
+
+def greedy_orienteering(problem):
+    """
+    Lộ trình khả thi ban đầu cho bài toán có giới hạn km
+
+    Đi qua các điểm bắt buộc theo initial_tour, sau đó chèn dần điểm tùy chọn
+    vào vị trí rẻ nhất chừng nào còn nằm trong giới hạn.
+
+    Returns:
+        tuple: (order, distance) hoặc ([], INF) nếu điểm bắt buộc đã vượt giới hạn
+    """
+    dist = problem.dist
+    mandatory = sorted(problem.mandatory)
+    if mandatory:
+        order = initial_tour(dist, mandatory, problem.start)
+    else:
+        order = []
+    distance = path_length(dist, order)
+    if order and not problem.within_limit(distance):
+        return [], INF
+
+    fixed_start = problem.start is not None
+    remaining = list(problem.optional)
+    while remaining:
+        best = None
+        for node in remaining:
+            if not order:
+                cost, pos = 0, 0
+            else:
+                cost, pos = INF, None
+                for i in range(1 if fixed_start else 0, len(order) + 1):
+                    before = dist[order[i - 1]][node] if i > 0 else 0
+                    after = dist[node][order[i]] if i < len(order) else 0
+                    removed = (dist[order[i - 1]][order[i]]
+                               if 0 < i < len(order) else 0)
+                    if before + after - removed < cost:
+                        cost, pos = before + after - removed, i
+            if pos is not None and problem.within_limit(distance + cost):
+                if best is None or cost < best[0]:
+                    best = (cost, pos, node)
+        if best is None:
+            break
+        cost, pos, node = best
+        order.insert(pos, node)
+        remaining.remove(node)
+        distance = path_length(dist, order)
+    if not order:
+        return [], INF
+    return order, distance
+
+
+def branch_and_bound(problem, monitor=None, first_hops=None, shared=None,
+                     incumbent=None):
+    """
+    Nhánh cận cho bài toán có giới hạn km (orienteering)
+
+    Tối đa số điểm tùy chọn đi qua trong giới hạn, luôn đi đủ điểm bắt buộc,
+    hòa thì lấy quãng đường ngắn nhất. Một nhánh bị cắt khi:
+      - quãng đường + cây khung nhỏ nhất qua các điểm bắt buộc còn lại vượt giới hạn
+      - số điểm tùy chọn tối đa còn có thể thêm không vượt được lời giải tốt nhất
+      - cùng tập điểm đã đi và cùng điểm hiện tại đã từng gặp với quãng đường ngắn hơn
+    Nếu bị hủy giữa chừng, trả về lời giải tốt nhất đã tìm được.
+
+    Khi tìm song song (xem parallel_search), mỗi tiến trình chỉ duyệt một phần
+    cây tìm kiếm và dùng chung cận với các tiến trình khác:
+      - first_hops: chỉ duyệt các lộ trình có bước đầu nằm trong tập này (điểm
+        ngay sau điểm bắt đầu, hoặc chính điểm đầu nếu không cố định điểm bắt đầu)
+      - shared: đối tượng có best() -> (count, distance) trả về lời giải tốt
+        nhất đã biết ở nơi khác và offer(count, distance) để công bố lời giải
+        của mình. Nhánh chỉ bị cắt theo cận chung khi kém hẳn (không cắt khi
+        hòa) nên kết quả của mỗi phần không phụ thuộc thứ tự chạy.
+
+    Args:
+        problem: TourProblem
+        monitor: SearchMonitor (tùy chọn)
+        first_hops: Tập bước đầu được duyệt (None = tất cả)
+        shared: Cận dùng chung (tùy chọn)
+        incumbent: (order, distance) một lộ trình hợp lệ đã biết, dùng làm lời
+                   giải ban đầu nếu tốt hơn lời giải tham lam
+
+    Returns:
+        tuple: (order, distance) hoặc ([], INF) nếu không có lộ trình hợp lệ
+    """
+    dist = problem.dist
+    size = problem.size
+    limit = problem.limit if problem.limit else INF
+    fixed_start = problem.start is not None
+    partial = first_hops is not None or shared is not None
+
+    # Ngân sách rộng: đi hết mọi điểm vẫn nằm trong giới hạn thì chỉ còn là
+    # tìm đường ngắn nhất qua tất cả, Held-Karp làm nhanh hơn (khi chỉ duyệt
+    # một phần thì việc chọn bộ giải đã làm ở tiến trình chính)
+    if not partial:
+        tour = initial_tour(dist, list(range(size)), problem.start)
+        if problem.within_limit(path_length(dist, tour)):
+            return held_karp(problem, monitor, incumbent)
+
+    optional = set(problem.optional)
+    mandatory = problem.mandatory
+
+    # Lời giải ban đầu; khi chỉ duyệt một phần, nó có thể nằm ngoài phần được
+    # giao nên chỉ dùng làm cận chung (tiến trình chính đã tính sẵn và truyền
+    # vào qua incumbent thì không tính lại ở mỗi phần)
+    if partial and incumbent is not None and incumbent[0]:
+        best_order, best_distance = [], INF
+    else:
+        best_order, best_distance = greedy_orienteering(problem)
+    best_count = (sum(1 for node in best_order if node in optional)
+                  if best_order else -1)
+    if incumbent is not None and incumbent[0]:
+        count = sum(1 for node in incumbent[0] if node in optional)
+        if (count, -incumbent[1]) > (best_count, -best_distance):
+            best_order, best_distance = list(incumbent[0]), incumbent[1]
+            best_count = count
+    outside = (-1, INF)
+    if partial:
+        if best_order:
+            outside = (best_count, best_distance)
+            if shared is not None:
+                shared.offer(*outside)
+        best_order, best_distance, best_count = [], INF, -1
+    if monitor is not None and best_order:
+        monitor.set_best(best_distance)
+
+    # Cận dùng để cắt nhánh: lời giải của chính mình (cắt cả khi hòa) hoặc cận
+    # bên ngoài (quãng đường cộng thêm sai số làm tròn để không cắt khi hòa)
+    cut_count, cut_distance = best_count, best_distance
+    refresh = [0]
+
+    def update_cut():
+        nonlocal cut_count, cut_distance, outside
+        if shared is not None:
+            refresh[0] = 0
+            outside = max(outside, shared.best(), key=lambda b: (b[0], -b[1]))
+        count, distance = outside
+        if (count, -distance) > (best_count, -best_distance):
+            cut_count, cut_distance = count, distance + 1e-9
+        else:
+            cut_count, cut_distance = best_count, best_distance
+
+    # Thứ tự duyệt con: gần trước
+    neighbours = [sorted((j for j in range(size) if j != i and dist[i][j] < INF),
+                         key=dist[i].__getitem__)
+                  for i in range(size)]
+    # Chi phí tối thiểu để đi vào mỗi điểm (cạnh ngắn nhất tới nó)
+    entry = [min([dist[j][i] for j in range(size) if j != i] or [0])
+             for i in range(size)]
+    seen = {}
+    path = []
+    # Bộ đếm: trạng thái đã mở, lộ trình đủ điểm bắt buộc, cắt theo cận /
+    # theo giới hạn km / vì trùng trạng thái
+    counts = [0, 0, 0, 0, 0]
+
+    def search(current, mask, distance, count):
+        nonlocal best_order, best_distance, best_count
+
+        key = (mask, current)
+        if seen.get(key, INF) <= distance:
+            counts[4] += 1
+            return
+        seen[key] = distance
+        if monitor is not None:
+            monitor.tick()
+        counts[0] += 1
+        if shared is not None:
+            refresh[0] += 1
+            if refresh[0] >= SHARED_REFRESH:
+                update_cut()
+
+        missing = [node for node in mandatory if not mask >> node & 1]
+        if not missing:
+            counts[1] += 1
+        if not missing and (count, -distance) > (best_count, -best_distance):
+            best_order, best_distance, best_count = list(path), distance, count
+            if monitor is not None:
+                monitor.set_best(distance)
+            if shared is not None:
+                shared.offer(count, distance)
+            update_cut()
+
+        budget = limit - distance
+        row = dist[current]
+        reachable = [node for node in neighbours[current]
+                     if not mask >> node & 1 and node in optional
+                     and row[node] <= budget]
+        if not missing and not reachable:
+            return
+
+        # Số điểm tùy chọn tối đa còn thêm được: mỗi điểm thêm vào tốn ít nhất
+        # chi phí đi vào nó, sau khi đã chừa chi phí cho các điểm bắt buộc
+        spare = budget - sum(entry[node] for node in missing)
+        extra = 0
+        for cost in sorted(entry[node] for node in reachable):
+            if cost > spare:
+                break
+            spare -= cost
+            extra += 1
+        if count + extra < cut_count:
+            counts[2] += 1
+            return
+        if count + extra == cut_count and extra < len(reachable):
+            if budget - spare >= cut_distance - distance:
+                counts[2] += 1
+                return
+        elif count + len(reachable) == cut_count:
+            # Chỉ hòa được số điểm khi đi hết các điểm còn với tới, nên nhánh
+            # chỉ có ích nếu quãng đường tối thiểu còn ngắn hơn lời giải tốt nhất
+            needed = spanning_tree_weight(dist, [current] + missing + reachable)
+            if needed > budget:
+                counts[3] += 1
+                return
+            if distance + needed >= cut_distance:
+                counts[2] += 1
+                return
+        elif missing:
+            if spanning_tree_weight(dist, [current] + missing) > budget:
+                counts[3] += 1
+                return
+
+        for node in neighbours[current]:
+            if mask >> node & 1:
+                continue
+            if row[node] > budget:
+                counts[3] += 1
+                continue
+            if first_hops is not None and fixed_start and len(path) == 1 \
+                    and node not in first_hops:
+                continue
+            path.append(node)
+            search(node, mask | 1 << node, distance + row[node],
+                   count + (node in optional))
+            path.pop()
+
+    if fixed_start:
+        roots = [problem.start]
+    else:
+        roots = [root for root in range(size)
+                 if first_hops is None or root in first_hops]
+    # shared.best() báo hủy bằng SearchCancelled, kể cả lần đọc cận đầu tiên
+    try:
+        if partial:
+            update_cut()
+        for root in roots:
+            path[:] = [root]
+            search(root, 1 << root, 0, 1 if root in optional else 0)
+    except SearchCancelled:
+        pass
+    if monitor is not None:
+        monitor.record(subsets=counts[0], permutations=counts[1],
+                       pruned_bound=counts[2], pruned_limit=counts[3],
+                       pruned_dominated=counts[4])
+
+    if not best_order:
+        return [], INF
+    return best_order, best_distance
+
+
+def permutation_search(dist, fixed_start=False, limit=None, bound=INF,
+                       monitor=None, counters=None):
+    """
+    Tìm theo chiều sâu thứ tự ngắn nhất đi qua mọi điểm 0..n-1
+
+    Cho kết quả giống hệt từng bit việc duyệt itertools.permutations(range(n))
+    rồi cộng quãng đường từ trái sang phải và chỉ nhận lộ trình ngắn hơn hẳn
+    (bộ giải brute_force): cùng quãng đường thì thứ tự đứng trước theo thứ tự
+    từ điển thắng. Nhưng chỉ mở một phần nhỏ cây hoán vị:
+      - con gần nhất được mở trước nên sớm có lời giải tốt để cắt nhánh
+      - nhánh bị cắt khi quãng đường + tổng cạnh ngắn nhất đi vào các điểm còn
+        lại đã dài hơn hẳn lời giải tốt nhất (cộng sai số làm tròn)
+      - không cố định điểm đầu thì chỉ duyệt lộ trình có điểm đầu < điểm cuối,
+        chiều ngược lại được tính lại quãng đường riêng (cộng theo chiều của
+        nó, vì dist[i][j] và dist[j][i] có thể lệch nhau 1 ulp)
+
+    Args:
+        dist: Ma trận khoảng cách n x n (INF nếu không tới được)
+        fixed_start: Điểm 0 luôn đi đầu
+        limit: Giới hạn km (None hoặc 0 = không giới hạn)
+        bound: Chỉ nhận lộ trình ngắn hơn hẳn bound (lời giải đã có từ trước)
+        monitor: SearchMonitor (tùy chọn); mỗi nút được mở là một lần tick
+        counters: Dict (tùy chọn) cộng dồn "permutations" (lộ trình hoàn chỉnh
+                  đã xét), "pruned_bound" và "pruned_limit"
+
+    Returns:
+        tuple: (order, distance) hoặc (None, bound) nếu không có lộ trình hợp
+               lệ nào ngắn hơn bound. Nếu bị hủy giữa chừng trả về lời giải
+               tốt nhất tới lúc đó (monitor.cancelled được bật)
+    """
+    n = len(dist)
+    counts = [0, 0, 0]  # lộ trình hoàn chỉnh, cắt theo cận, cắt theo giới hạn km
+    if n <= 1:
+        if counters is not None:
+            counters["permutations"] = counters.get("permutations", 0) + 1
+        return (tuple(range(n)), 0) if 0 < bound else (None, bound)
+
+    symmetric = not fixed_start
+    # Sai số cho phép khi so sánh quãng đường cộng theo 2 chiều khác nhau
+    slack = 1e-9
+    limit_cut = INF
+    if limit:
+        limit_cut = limit + slack * max(1.0, limit) if symmetric else limit
+
+    children = [sorted((j for j in range(n) if j != i), key=lambda j: (row[j], j))
+                for i, row in enumerate(dist)]
+    # Chi phí tối thiểu để đi vào mỗi điểm; điểm không tới được tính 0 (lộ
+    # trình qua nó đằng nào cũng bị loại) để cận không thành INF - INF
+    entry = [min(dist[j][i] for j in range(n) if j != i) for i in range(n)]
+    entry = [cost if cost < INF else 0 for cost in entry]
+
+    best_order, best_distance = None, bound
+    cut = bound + slack * max(1.0, bound)
+    path = []
+    used = bytearray(n)
+
+    def offer(order, distance):
+        nonlocal best_order, best_distance, cut
+        if limit and distance > limit:
+            counts[2] += 1
+            return
+        if distance < best_distance or (distance == best_distance
+                                        and best_order is not None
+                                        and order < best_order):
+            best_order, best_distance = order, distance
+            cut = distance + slack * max(1.0, distance)
+            if monitor is not None:
+                monitor.set_best(distance)
+
+    def search(current, distance, remaining):
+        if monitor is not None:
+            monitor.tick()
+        if len(path) == n:
+            counts[0] += 1
+            offer(tuple(path), distance)
+            if symmetric:
+                reverse = tuple(reversed(path))
+                total = 0
+                for u, v in zip(reverse, reverse[1:]):
+                    total += dist[u][v]
+                counts[0] += 1
+                offer(reverse, total)
+            return
+
+        first = path[0]
+        if symmetric and not any(not used[j] for j in range(first + 1, n)):
+            return  # điểm cuối phải lớn hơn điểm đầu
+        row = dist[current]
+        for node in children[current]:
+            if used[node]:
+                continue
+            if symmetric and len(path) == n - 1 and node < first:
+                continue
+            candidate = distance + row[node]
+            if candidate == INF:
+                continue
+            if candidate > limit_cut:
+                counts[2] += 1
+                continue
+            if candidate + remaining - entry[node] > cut:
+                counts[1] += 1
+                continue
+            used[node] = 1
+            path.append(node)
+            search(node, candidate, remaining - entry[node])
+            path.pop()
+            used[node] = 0
+
+    total_entry = sum(entry)
+    try:
+        # Không cố định điểm đầu: điểm cuối lớn hơn điểm đầu nên điểm n-1
+        # không bao giờ đứng đầu
+        for root in ([0] if fixed_start else range(n - 1)):
+            used[root] = 1
+            path[:] = [root]
+            search(root, 0, total_entry - entry[root])
+            used[root] = 0
+    except SearchCancelled:
+        pass
+
+    if counters is not None:
+        for name, amount in zip(("permutations", "pruned_bound", "pruned_limit"),
+                                counts):
+            counters[name] = counters.get(name, 0) + amount
+    return best_order, best_distance
+
+
+def _edge(dist, u, v):
+    """Độ dài cạnh, 0 nếu một đầu không tồn tại (đầu/cuối đường đi mở)"""
+    return 0 if u is None or v is None else dist[u][v]
+
+
+def _drop_to_limit(problem, order):
+    """
+    Bỏ dần điểm tùy chọn tiết kiệm nhiều km nhất cho tới khi nằm trong giới hạn
+
+    Returns:
+        list: Thứ tự còn lại (có thể vẫn vượt giới hạn nếu chỉ còn điểm bắt buộc)
+    """
+    dist = problem.dist
+    optional = set(problem.optional)
+    distance = path_length(dist, order)
+    while not problem.within_limit(distance):
+        best_gain, best_pos = -INF, None
+        for pos, node in enumerate(order):
+            if node not in optional:
+                continue
+            before = order[pos - 1] if pos > 0 else None
+            after = order[pos + 1] if pos + 1 < len(order) else None
+            gain = (_edge(dist, before, node) + _edge(dist, node, after)
+                    - _edge(dist, before, after))
+            if gain > best_gain or best_pos is None:
+                best_gain, best_pos = gain, pos
+        if best_pos is None:
+            break
+        order.pop(best_pos)
+        distance = path_length(dist, order)
+    return order
+
+
+def _cheapest_position(dist, order, node, fixed_start):
+    """
+    Vị trí chèn node vào order làm tăng quãng đường ít nhất
+
+    Returns:
+        tuple: (chi phí tăng thêm, vị trí) - (INF, None) nếu không chèn được
+    """
+    best_cost, best_pos = INF, None
+    for pos in range(1 if fixed_start else 0, len(order) + 1):
+        before = order[pos - 1] if pos > 0 else None
+        after = order[pos] if pos < len(order) else None
+        cost = (_edge(dist, before, node) + _edge(dist, node, after)
+                - _edge(dist, before, after))
+        if cost < best_cost:
+            best_cost, best_pos = cost, pos
+    return best_cost, best_pos
+
+
+def _fill_within_limit(problem, order, fixed_start):
+    """Chèn thêm các điểm tùy chọn chưa đi vào vị trí rẻ nhất nếu còn trong giới hạn"""
+    dist = problem.dist
+    visited = set(order)
+    distance = path_length(dist, order)
+    added = True
+    while added:
+        added = False
+        for node in problem.optional:
+            if node in visited:
+                continue
+            best_cost, best_pos = _cheapest_position(dist, order, node, fixed_start)
+            if best_pos is not None and problem.within_limit(distance + best_cost):
+                order.insert(best_pos, node)
+                visited.add(node)
+                distance = path_length(dist, order)
+                added = True
+    return order
+
+
+def warm_start(problem, previous, time_budget=WARM_START_BUDGET):
+    """
+    Dựng lại lộ trình từ lời giải trước sau khi thêm / bỏ một điểm
+
+    Giữ thứ tự của lời giải trước (điểm đã bị bỏ tự rơi ra), chèn các điểm
+    bắt buộc còn thiếu vào vị trí rẻ nhất, cải thiện cục bộ trong thời gian
+    cho phép, rồi bỏ / chèn điểm tùy chọn cho vừa giới hạn km.
+
+    Args:
+        problem: TourProblem
+        previous: Thứ tự các chỉ số (của problem) trong lời giải trước
+        time_budget: Thời gian tối đa cho bước cải thiện (giây)
+
+    Returns:
+        tuple: (order, distance) hoặc ([], INF) nếu không dựng được lộ trình
+               hợp lệ
+    """
+    deadline = time.perf_counter() + time_budget
+    dist = problem.dist
+    start = problem.start
+    fixed_start = start is not None
+
+    order = [node for node in dict.fromkeys(previous)
+             if 0 <= node < problem.size and node != start]
+    if fixed_start:
+        order.insert(0, start)
+    for node in sorted(problem.mandatory):
+        if node not in order:
+            _, pos = _cheapest_position(dist, order, node, fixed_start)
+            order.insert(pos, node)
+    order = improve_order(dist, order, fixed_start, deadline)
+
+    if not problem.within_limit(path_length(dist, order)):
+        order = improve_order(dist, _drop_to_limit(problem, order),
+                              fixed_start, deadline)
+        if not order or not problem.within_limit(path_length(dist, order)):
+            return [], INF
+    order = _fill_within_limit(problem, order, fixed_start)
+    order = improve_order(dist, order, fixed_start, deadline)
+
+    distance = path_length(dist, order)
+    if not problem.within_limit(distance):
+        return [], INF
+    return order, distance
+
+
+def heuristic_search(problem, time_budget=DEFAULT_TIME_BUDGET,
+                     construction="nearest_neighbour", seed=None, monitor=None):
+    """
+    Bộ giải heuristic có giới hạn thời gian cho các lựa chọn lớn (50-200 điểm)
+
+    Dựng lộ trình ban đầu (láng giềng gần nhất hoặc chèn), cải thiện bằng
+    2-opt và Or-opt, rồi luyện kim mô phỏng (đảo đoạn, dời điểm) cho tới khi
+    hết thời gian. Với giới hạn km, bỏ bớt điểm tùy chọn cho tới khi vừa
+    giới hạn và chèn lại mỗi khi lộ trình ngắn đi.
+
+    Args:
+        problem: TourProblem
+        time_budget: Thời gian tối đa (giây)
+        construction: "nearest_neighbour" hoặc "cheapest_insertion"
+        seed: Hạt giống ngẫu nhiên (để tái lập kết quả)
+        monitor: SearchMonitor (tùy chọn); khi bị hủy trả về lộ trình tốt nhất
+
+    Returns:
+        tuple: (order, distance, lower_bound) - lower_bound là trọng số cây
+               khung nhỏ nhất qua các điểm của lộ trình; ([], INF, 0) nếu
+               không tìm được lộ trình hợp lệ
+    """
+    deadline = time.perf_counter() + time_budget
+    rng = random.Random(seed)
+    dist = problem.dist
+    start = problem.start
+    fixed_start = start is not None
+    first = 1 if fixed_start else 0
+
+    everything = list(range(problem.size))
+    if construction == "cheapest_insertion":
+        order = insertion_order(dist, everything, start)
+    elif construction == "nearest_neighbour":
+        order = nearest_neighbour_order(dist, everything, start)
+    else:
+        raise ValueError(f"Cách dựng lộ trình không hợp lệ: {construction}")
+    order = improve_order(dist, order, fixed_start, deadline)
+
+    if not problem.within_limit(path_length(dist, order)):
+        order = improve_order(dist, _drop_to_limit(problem, order),
+                              fixed_start, deadline)
+        if not order or not problem.within_limit(path_length(dist, order)):
+            return [], INF, 0
+        order = _fill_within_limit(problem, order, fixed_start)
+
+    optional = set(problem.optional)
+    current = order
+    current_distance = path_length(dist, current)
+    best, best_distance = list(current), current_distance
+    best_count = sum(1 for node in best if node in optional)
+    if monitor is not None:
+        monitor.set_best(best_distance)
+
+    # Luyện kim mô phỏng: nhiệt độ giảm hình học theo thời gian đã dùng
+    start_temperature = 0.3 * current_distance / max(1, len(current) - 1)
+    temperature = start_temperature
+    iteration = 0
+    while len(current) - first >= 2:
+        iteration += 1
+        if iteration & 255 == 0:
+            if monitor is not None:
+                try:
+                    monitor.tick(256)
+                except SearchCancelled:
+                    break
+            now = time.perf_counter()
+            if now >= deadline:
+                break
+            used = 1 - (deadline - now) / time_budget if time_budget > 0 else 1
+            temperature = start_temperature * 0.001 ** used
+
+        n = len(current)
+        if rng.random() < 0.5:
+            # Đảo ngược đoạn current[i..k]
+            i = rng.randrange(first, n - 1)
+            k = rng.randrange(i + 1, n)
+            before = current[i - 1] if i > 0 else None
+            after = current[k + 1] if k + 1 < n else None
+            delta = (_edge(dist, before, current[k]) + _edge(dist, current[i], after)
+                     - _edge(dist, before, current[i]) - _edge(dist, current[k], after))
+            move = ("reverse", i, k)
+        else:
+            # Dời điểm current[i] sang vị trí j (tính trên danh sách đã gỡ điểm)
+            i = rng.randrange(first, n)
+            j = rng.randrange(first, n)
+            if i == j:
+                continue
+            node = current[i]
+            before = current[i - 1] if i > 0 else None
+            after = current[i + 1] if i + 1 < n else None
+            gain = (_edge(dist, before, node) + _edge(dist, node, after)
+                    - _edge(dist, before, after))
+            x = (current[j - 1] if j - 1 < i else current[j]) if j > 0 else None
+            y = (current[j] if j < i else current[j + 1]) if j < n - 1 else None
+            cost = _edge(dist, x, node) + _edge(dist, node, y) - _edge(dist, x, y)
+            delta = cost - gain
+            move = ("relocate", i, j)
+
+        if not problem.within_limit(current_distance + delta):
+            continue
+        if delta > 0 and rng.random() >= math.exp(-delta / max(temperature, 1e-12)):
+            continue
+
+        if move[0] == "reverse":
+            current[i:k + 1] = reversed(current[i:k + 1])
+        else:
+            current.insert(j, current.pop(i))
+        current_distance += delta
+
+        if current_distance < best_distance - 1e-9:
+            current_distance = path_length(dist, current)
+            if optional:
+                current = _fill_within_limit(problem, current, fixed_start)
+                current_distance = path_length(dist, current)
+            count = sum(1 for node in current if node in optional)
+            if (count, -current_distance) > (best_count, -best_distance):
+                best, best_distance, best_count = list(current), current_distance, count
+                if monitor is not None:
+                    monitor.set_best(best_distance)
+
+    # Đánh bóng lần cuối
+    if monitor is None or not monitor.cancelled:
+        polished = improve_order(dist, best, fixed_start,
+                                 deadline + 0.1 * time_budget)
+        polished_distance = path_length(dist, polished)
+        if polished_distance < best_distance:
+            best, best_distance = polished, polished_distance
+
+    return best, best_distance, spanning_tree_weight(dist, best)
+
+
+def solve(problem, engine="held_karp", time_budget=None, monitor=None,
+          incumbent=None):
+    """
+    Gọi bộ giải theo tên, dùng chung cho mọi nơi cần giải TourProblem
+
+    Args:
+        problem: TourProblem
+        engine: "held_karp", "branch_and_bound" hoặc "heuristic"
+        time_budget: Thời gian tối đa cho bộ giải heuristic (giây)
+        monitor: SearchMonitor (tùy chọn)
+        incumbent: (order, distance) lộ trình hợp lệ đã biết, làm cận trên ban
+                   đầu cho bộ giải chính xác
+
+    Returns:
+        tuple: (order, distance, lower_bound) - với bộ giải chính xác
+               lower_bound bằng chính distance
+    """
+    if engine == "heuristic":
+        return heuristic_search(problem, time_budget or DEFAULT_TIME_BUDGET,
+                                monitor=monitor)
+    if engine == "branch_and_bound":
+        order, distance = branch_and_bound(problem, monitor, incumbent=incumbent)
+    elif engine == "held_karp":
+        order, distance = held_karp(problem, monitor, incumbent)
+    else:
+        raise ValueError(f"Bộ giải không hợp lệ: {engine}")
+    return order, distance, distance
@@ -23,11 +23,19 @@ class TourismUI:
         self.map_canvas = None
         self.limit_var = None
         self.limit_entry = None
+        self.limit_preview_label = None
+        self.show_solver_stats_var = None
+        self.find_btn = None
+        self.cancel_btn = None
+        self.reset_btn = None
+        self.progress_label = None
         
         # Callbacks
         self.on_location_toggle = None
         self.on_district_change_callback = None
         self.on_find_path = None
+        self.on_limit_change = None
+        self.on_cancel = None
         self.on_reset = None
     
     def create_ui(self):
@@ -138,7 +146,7 @@ class TourismUI:
         self.location_canvas = canvas
     
     def _create_control_panel(self, parent):
-        """Tạo bảng điều khiển với ô nhập giới hạn và 2 nút bấm"""
+        """Tạo bảng điều khiển với ô nhập giới hạn và các nút bấm"""
         control_frame = tk.LabelFrame(parent, text="YÊU CẦU", font=("Arial", 12, "bold"),
                                     bg="#f8fafc", fg="#0369a1", padx=10, pady=10)
         control_frame.pack(fill=tk.X, padx=10, pady=5)
@@ -154,8 +162,23 @@ class TourismUI:
         self.limit_entry = tk.Entry(input_frame, textvariable=self.limit_var, 
                                     font=("Arial", 10), width=15)
         self.limit_entry.pack(side=tk.LEFT, padx=10)
-        
-        # --- HÀNG 2: Hai nút bấm Tìm đường và Đặt lại ---
+        self.limit_var.trace_add("write", self._on_limit_change)
+        
+        # Hiện số liệu của bộ giải (số lần Dijkstra, nhánh bị cắt, thời gian...)
+        self.show_solver_stats_var = tk.BooleanVar(value=False)
+        tk.Checkbutton(input_frame, text="Thống kê bộ giải",
+                       variable=self.show_solver_stats_var,
+                       font=("Arial", 9), bg="#f8fafc",
+                       activebackground="#f8fafc").pack(side=tk.LEFT)
+        
+        # Xem trước theo giới hạn đang gõ (số điểm đi thêm được nếu nới giới hạn)
+        self.limit_preview_label = tk.Label(control_frame, text="",
+                                            font=("Arial", 9),
+                                            bg="#f8fafc", fg="#059669",
+                                            justify=tk.LEFT, anchor="w")
+        self.limit_preview_label.pack(fill=tk.X, pady=(0, 5))
+        
+        # --- HÀNG 2: Các nút bấm Tìm đường, Hủy và Đặt lại ---
         button_row = tk.Frame(control_frame, bg="#f8fafc")
         button_row.pack(fill=tk.X)
         
@@ -168,6 +191,17 @@ class TourismUI:
                                 command=self._on_find_path_click)
         self.find_btn.pack(side=tk.LEFT, expand=True, fill=tk.X, padx=(0, 5))
         
+        # Nút Hủy (chỉ bật khi đang tìm đường)
+        self.cancel_btn = tk.Button(button_row, text="HỦY", 
+                                font=("Arial", 10, "bold"),
+                                bg="#f59e0b", fg="white", 
+                                activebackground="#d97706",
+                                disabledforeground="#fde68a",
+                                cursor="hand2", bd=0, padx=15, pady=8,
+                                state=tk.DISABLED,
+                                command=self._on_cancel_click)
+        self.cancel_btn.pack(side=tk.LEFT, expand=True, fill=tk.X, padx=5)
+        
         # Nút Đặt Lại
         self.reset_btn = tk.Button(button_row, text="ĐẶT LẠI", 
                                 font=("Arial", 10, "bold"),
@@ -176,6 +210,13 @@ class TourismUI:
                                 cursor="hand2", bd=0, padx=15, pady=8,
                                 command=self._on_reset_click)
         self.reset_btn.pack(side=tk.LEFT, expand=True, fill=tk.X, padx=(5, 0))
+        
+        # Tiến độ tìm đường
+        self.progress_label = tk.Label(control_frame, text="",
+                                       font=("Arial", 9),
+                                       bg="#f8fafc", fg="#0369a1",
+                                       justify=tk.LEFT, anchor="w")
+        self.progress_label.pack(fill=tk.X, pady=(5, 0))
         # Thống kê
         stats_frame = tk.Frame(control_frame, bg="white")
         stats_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=(5, 10))
@@ -202,6 +243,40 @@ class TourismUI:
                 except ValueError:
                     messagebox.showerror("Lỗi", "Vui lòng nhập số km hợp lệ!")
     
+    def _on_limit_change(self, *_):
+        """Xử lý khi nội dung ô giới hạn thay đổi"""
+        if self.on_limit_change:
+            self.on_limit_change()
+    
+    def show_limit_preview(self, text):
+        """Hiển thị phần xem trước của giới hạn km đang nhập"""
+        if self.limit_preview_label is not None:
+            self.limit_preview_label.config(text=text)
+    
+    def _on_cancel_click(self):
+        """Xử lý khi click nút hủy"""
+        if self.on_cancel:
+            self.on_cancel()
+    
+    def set_solving(self, solving, status=""):
+        """Bật/tắt các nút theo trạng thái đang tìm đường"""
+        self.find_btn.config(state=tk.DISABLED if solving else tk.NORMAL)
+        self.cancel_btn.config(state=tk.NORMAL if solving else tk.DISABLED)
+        if solving:
+            self.progress_label.config(text=" Đang tìm đường...")
+        else:
+            self.progress_label.config(text=status)
+    
+    def show_progress(self, evaluated, best_distance, elapsed):
+        """Hiển thị tiến độ tìm đường đang chạy"""
+        text = f" Đang tìm đường... {elapsed:.1f}s\n"
+        text += f" Đã xét: {evaluated:,} phương án\n"
+        if best_distance is not None:
+            text += f" Tốt nhất hiện tại: {best_distance:.2f} km"
+        else:
+            text += " Tốt nhất hiện tại: chưa có"
+        self.progress_label.config(text=text)
+    
     def _create_right_panel(self, parent):
         """Tạo panel bên phải (kết quả + bản đồ)"""
         right_panel = tk.Frame(parent, bg="white")
@@ -387,8 +462,18 @@ class TourismUI:
                        command=lambda: self._on_location_toggle(loc_id))
         btn.pack(fill=tk.X, pady=(5, 0))
     
+    @property
+    def show_solver_stats(self):
+        """Người dùng có bật hiển thị thống kê bộ giải không"""
+        return bool(self.show_solver_stats_var and self.show_solver_stats_var.get())
+    
+    def _format_solver_stats(self, solver_stats):
+        """Các dòng thống kê bộ giải (SolveStats) để nối vào nội dung hiển thị"""
+        return "\n Thống kê bộ giải:\n" + "".join(
+            f"  {line}\n" for line in solver_stats.summary_lines())
+    
     def update_stats(self, selected_locations, start_location=None, 
-                    mandatory_locations=None):
+                    mandatory_locations=None, solver_stats=None):
         
         if not selected_locations:
             self.stats_label.config(
@@ -408,9 +493,12 @@ class TourismUI:
         
         optional_count = len(selected_locations) - len(mandatory_locations)
         
+        if solver_stats is not None:
+            stats_text += self._format_solver_stats(solver_stats)
+        
         self.stats_label.config(text=stats_text, fg="#1f2937")
     def display_result(self, path_result, start_location=None, 
-                      mandatory_locations=None):
+                      mandatory_locations=None, solver_stats=None):
         
         if not path_result:
             return
@@ -462,6 +550,9 @@ class TourismUI:
                 loc_name = locations[loc_id]["name"]
                 result_text += f"  • {loc_name}\n"
         
+        if solver_stats is not None:
+            result_text += self._format_solver_stats(solver_stats)
+        
         self.result_label.config(text=result_text, fg="#16a34a")
     
     def reset_result_display(self):